@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor  # Used to download avatars in the background while TTS runs.
+from collections import OrderedDict  # Used to keep the most recently used fitted avatars.
+from PIL import Image  # Python Imaging Library, used for image manipulation.
+from httpcache import CachingAdapter  # Custom module for caching and recording Reddit responses.
+import requests  # Used for making HTTP requests, typically for API interactions.
+import threading  # Provides support for threading.
+import hashlib  # Used to derive cache file names from avatar URLs.
+import json  # Used to persist the cache index.
+import time  # Provides various time-related functions.
+import io  # Provides in-memory binary streams.
+import os  # Provides functions for interacting with the operating system.
+
+# Avatar used when a user has no profile picture or has been deleted
+DEFAULT_AVATAR_URL = "https://www.redditstatic.com/avatars/defaults/v2/avatar_default_3.png"
+# Reddit's default avatars never change, so they are never revalidated once cached
+DEFAULT_AVATAR_PREFIX = "https://www.redditstatic.com/avatars/defaults/"
+
+
+class AvatarCache:
+    def __init__(self, cache_dir: str = "cache/avatars", max_age: int = 24 * 60 * 60, workers: int = 4, max_fitted: int = 256):
+        """
+        Initialize the AvatarCache object.
+
+        Avatars are stored on disk keyed by URL together with their ETag and Last-Modified
+        headers, and revalidated with conditional GETs once they are older than max_age.
+        Fitted bitmaps of the most recently rendered authors are kept in memory for up to
+        max_age. Downloads are only shared while they are in flight.
+
+        Args:
+            cache_dir (str): The directory the avatar files and index are stored in.
+            max_age (int): Seconds a cached avatar is used without revalidating it.
+            workers (int): The number of background download threads.
+            max_fitted (int): The number of fitted bitmaps kept in memory.
+        """
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.max_fitted = max_fitted
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Load the index of cached avatars
+        try:
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.index = {}
+
+        # Avatars hosted on reddit.com count against the budget of unauthenticated requests, CDN hosts are not limited.
+        # Downloads are recorded and replayed with the other responses, but never reused from the response cache.
+        self.session = requests.Session()
+        self.session.mount("https://", CachingAdapter(pool_maxsize=workers))
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatar")
+        self.__lock = threading.Lock()
+        # In-flight downloads keyed by URL, the next request after one finishes goes through the index again
+        self.__futures = {}
+        # Masked and fitted bitmaps keyed by (URL, width) as (fitted_at, image), least recently used first
+        self.__fitted = OrderedDict()
+
+    def __path(self, url: str):
+        """
+        Get the file path an avatar URL is cached at.
+        """
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".img")
+
+    def __save_index(self):
+        """
+        Write the cache index to disk.
+
+        Worker processes share the index file, so each writes its own temporary file. The index
+        is best-effort, a failed write only costs a revalidation later.
+        """
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error saving the profile picture index: {e}\n")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def __download(self, url: str):
+        """
+        Download an avatar, revalidating any cached copy with a conditional GET.
+
+        Args:
+            url (str): The avatar URL.
+
+        Returns:
+            Image: The decoded avatar, or None if it could not be downloaded.
+        """
+        path = self.__path(url)
+        with self.__lock:
+            entry = dict(self.index.get(url, {}))
+        cached = entry and os.path.exists(path)
+
+        # Short-circuit default avatars and avatars checked recently
+        fresh = cached and (url.startswith(DEFAULT_AVATAR_PREFIX) or time.time() - entry.get("checked", 0) < self.max_age)
+        if not fresh:
+            headers = {}
+            if cached and entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if cached and entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            try:
+                response = self.session.get(url, headers=headers, timeout=15)
+                if response.status_code == 200:
+                    with open(path, "wb") as f:
+                        f.write(response.content)
+                    entry = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    cached = True
+                elif response.status_code != 304:
+                    print(f"\033[1m(#)\033[0m Failed to download the profile picture ({response.status_code}), using default.\n")
+                entry["checked"] = time.time()
+                with self.__lock:
+                    if cached:
+                        self.index[url] = entry
+                        self.__save_index()
+            except requests.RequestException as e:
+                print(f"\033[1m(#)\033[0m Failed to download the profile picture: {e}\n")
+
+        if not cached:
+            return None
+        with open(path, "rb") as f:
+            image = Image.open(io.BytesIO(f.read()))
+            image.load()
+        return image
+
+    def prefetch(self, url: str):
+        """
+        Start downloading an avatar in the background.
+
+        Args:
+            url (str): The avatar URL.
+
+        Returns:
+            Future: A future resolving to the decoded avatar, or None.
+        """
+        url = url or DEFAULT_AVATAR_URL
+        with self.__lock:
+            future = self.__futures.get(url)
+            if future is not None:
+                return future
+            future = self.__futures[url] = self.__executor.submit(self.__download, url)
+        # Added outside the lock, the callback runs right away if the download already finished
+        future.add_done_callback(lambda done: self.__forget(url, done))
+        return future
+
+    def __forget(self, url: str, future):
+        """
+        Drop a finished download, so the next request of the avatar retries a failure and lets the index decide freshness.
+        """
+        with self.__lock:
+            if self.__futures.get(url) is future:
+                del self.__futures[url]
+
+    def get(self, url: str):
+        """
+        Get a decoded avatar, downloading it if it has not been prefetched.
+
+        Args:
+            url (str): The avatar URL.
+
+        Returns:
+            Image: The decoded avatar, or None if it could not be downloaded.
+        """
+        return self.prefetch(url).result()
+
+    def fitted(self, url: str, renderer, width: int = None):
+        """
+        Get an avatar fitted and masked for a mockup width, ready to paste.
+
+        Args:
+            url (str): The avatar URL.
+            renderer (MockupRenderer): The renderer whose mask the avatar is fitted to.
+            width (int, optional): The target width of the mockup.
+
+        Returns:
+            Image: The masked avatar, or None if it could not be downloaded.
+        """
+        url = url or DEFAULT_AVATAR_URL
+        key = (url, width)
+        with self.__lock:
+            cached = self.__fitted.get(key)
+            if cached and time.time() - cached[0] < self.max_age:
+                self.__fitted.move_to_end(key)
+                return cached[1]
+        avatar = self.get(url)
+        if avatar is None:
+            return None
+        avatar = renderer.fit_avatar(avatar, width)
+        with self.__lock:
+            self.__fitted[key] = (time.time(), avatar)
+            self.__fitted.move_to_end(key)
+            while len(self.__fitted) > self.max_fitted:
+                self.__fitted.popitem(last=False)
+        return avatar
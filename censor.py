@@ -0,0 +1,80 @@
+import re  # Provides support for regular expressions (regex).
+
+# Phrases rewritten for better TTS, as (text, replacement)
+PHRASES = (
+    ("\n", ". "),
+    ('."', '". '),
+    ("UPDATE:", ". UPDATE:. "),
+    ("AITA", "Am I the asshole"),
+)
+
+# Ages written as M25 or F25
+AGE_PATTERN = r"\b(?P<sex>[MF])(?P<age>\d{1,3})\b"
+AGE_WORDS = {"M": "Male", "F": "Female"}
+
+
+def censor_word(word: str):
+    """
+    Censor a word by keeping its first and last letter.
+
+    Args:
+        word (str): The word to censor.
+
+    Returns:
+        str: The censored word, for example "d**n".
+    """
+    if len(word) <= 2:
+        return word
+    return word[0] + '*' * (len(word) - 2) + word[-1]
+
+
+class CensorEngine:
+    def __init__(self, words=(), phrases=PHRASES):
+        """
+        Initialize the CensorEngine object.
+
+        The filter words, TTS phrase rewrites and age rewrites are compiled once into a
+        single alternation regex, so filtering a post is one pass over the text regardless
+        of how many words are filtered.
+
+        Args:
+            words (iterable): The words to censor. Matched case-insensitively on word boundaries.
+            phrases (iterable): (text, replacement) pairs matched literally.
+        """
+        self.words = sorted({word for word in words if word}, key=len, reverse=True)
+        self.phrases = dict(phrases)
+
+        if self.words:
+            # Replacements are emitted as they are, so censor any filter words they contain up front
+            word_pattern = re.compile(r"(?<!\w)(?i:" + "|".join(re.escape(word) for word in self.words) + r")(?!\w)")
+            self.phrases = {phrase: word_pattern.sub(lambda match: censor_word(match.group(0)), replacement)
+                            for phrase, replacement in self.phrases.items()}
+
+        alternatives = []
+        if self.phrases:
+            # Longest phrases first so overlapping phrases match the longer one
+            alternatives.append("(?P<phrase>" + "|".join(
+                re.escape(phrase) for phrase in sorted(self.phrases, key=len, reverse=True)) + ")")
+        if self.words:
+            alternatives.append(r"(?P<word>(?<!\w)(?i:" + "|".join(re.escape(word) for word in self.words) + r")(?!\w))")
+        alternatives.append(AGE_PATTERN)
+        self.pattern = re.compile("|".join(alternatives))
+
+    def __replace(self, match):
+        if match.lastgroup == "phrase":
+            return self.phrases[match.group("phrase")]
+        if match.lastgroup == "word":
+            return censor_word(match.group("word"))
+        return f"{AGE_WORDS[match.group('sex')]} {match.group('age')}"
+
+    def filter(self, text: str):
+        """
+        Apply the phrase rewrites, censoring and age rewrites to a text in one pass.
+
+        Args:
+            text (str): The text to filter.
+
+        Returns:
+            str: The filtered text.
+        """
+        return self.pattern.sub(self.__replace, text)
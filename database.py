@@ -0,0 +1,540 @@
+import sqlite3  # Provides a lightweight disk-based database that doesn’t require a separate server process.
+import threading  # Provides support for threading.
+import hashlib  # Used to hash post content for change detection.
+from similarity import TitleIndex  # Custom module for matching update posts to their originals.
+from fingerprint import FingerprintIndex  # Custom module for detecting reposted stories.
+import time  # Provides various time-related functions.
+from collections import namedtuple  # Used to build the typed row objects.
+import functools  # Used to cache the row types of each query shape.
+import os  # Used to tell forked worker processes apart.
+
+# Default location of the database
+DATABASE_PATH = 'database.db'
+
+# Connection settings applied to every connection:
+# - WAL lets readers run alongside a writer and turns each commit into an append instead of a rewrite.
+# - NORMAL only syncs at checkpoints in WAL mode, which is still safe against application crashes.
+# - A 16MB page cache and in-memory temp tables keep discovery batches off the disk.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),
+    ("temp_store", "MEMORY"),
+)
+
+
+def connect(path: str = DATABASE_PATH, timeout: float = 30.0, check_same_thread: bool = True):
+    """
+    Open a connection to the database with the tuned connection settings applied.
+
+    Args:
+        path (str): The path to the SQLite database file.
+        timeout (float): Seconds to wait for a lock held by another connection.
+        check_same_thread (bool): Whether using the connection from another thread raises an error.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=check_same_thread)
+    conn.row_factory = row_factory
+    # Wait for locks held by other threads and processes instead of failing with "database is locked"
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+@functools.lru_cache(maxsize=256)
+def row_type(columns: tuple):
+    """
+    Get the named tuple type for a set of result columns.
+
+    Args:
+        columns (tuple): The column names of a query.
+
+    Returns:
+        type: A named tuple type, columns that are not valid identifiers (such as COUNT(*)) are renamed to _<index>.
+    """
+    return namedtuple("Row", columns, rename=True)
+
+
+def row_factory(cursor, row):
+    """
+    Return every row as a named tuple, so columns can be read by name and rows still unpack like tuples.
+    """
+    return row_type(tuple(column[0] for column in cursor.description))(*row)
+
+
+class ConnectionPool:
+    def __init__(self, path: str = DATABASE_PATH, timeout: float = 30.0):
+        """
+        Initialize the ConnectionPool object, which hands every thread its own connection.
+
+        SQLite connections must not be shared between threads, so each thread (and each
+        forked process) lazily opens one connection and keeps it for its lifetime. With WAL
+        enabled, readers on any thread run alongside a single writer, and writers wait up to
+        the busy timeout for each other. The connections of threads that have ended are
+        closed whenever another one is opened, so short-lived stage, heartbeat and task
+        threads do not leak file descriptors.
+
+        Args:
+            path (str): The path to the SQLite database file.
+            timeout (float): Seconds to wait for a lock held by another connection.
+        """
+        self.path = path
+        self.timeout = timeout
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__connections = []
+
+    def connection(self):
+        """
+        Get the current thread's connection, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: The connection owned by the current thread.
+        """
+        conn = getattr(self.__local, "conn", None)
+        # A forked process must not reuse its parent's connection
+        if conn is None or self.__local.pid != os.getpid():
+            # Only ever used by this thread, but closed by whichever thread notices it has ended
+            conn = connect(self.path, self.timeout, check_same_thread=False)
+            self.__local.conn = conn
+            self.__local.pid = os.getpid()
+            with self.__lock:
+                self.__reap()
+                self.__connections.append((threading.current_thread(), os.getpid(), conn))
+        return conn
+
+    def __reap(self):
+        """
+        Close the connections of threads that have ended, must be called with the lock held.
+        """
+        pid = os.getpid()
+        live = []
+        for thread, owner_pid, conn in self.__connections:
+            if owner_pid != pid:
+                # Inherited from the parent process, which still owns it
+                continue
+            if thread.is_alive():
+                live.append((thread, owner_pid, conn))
+            else:
+                conn.close()
+        self.__connections = live
+
+    def open_connections(self):
+        """
+        Count the connections this process holds open.
+
+        Returns:
+            int: The number of open connections.
+        """
+        with self.__lock:
+            self.__reap()
+            return len(self.__connections)
+
+    def close(self):
+        """
+        Close every connection opened by this process.
+        """
+        with self.__lock:
+            connections, self.__connections = self.__connections, []
+        for _, owner_pid, conn in connections:
+            if owner_pid == os.getpid():
+                conn.close()
+        self.__local = threading.local()
+
+    def release(self):
+        """
+        Close the current thread's connection, for short-lived threads such as those of an HTTP server.
+        """
+        conn = getattr(self.__local, "conn", None)
+        if conn is None:
+            return
+        self.__local.conn = None
+        with self.__lock:
+            self.__connections = [entry for entry in self.__connections if entry[2] is not conn]
+        conn.close()
+
+
+# Render states stored in posts.video_made
+VIDEO_PENDING = 0
+VIDEO_MADE = 1
+VIDEO_FAILED = 3
+# Reposts of a story that has already been rendered, never rendered themselves
+VIDEO_DUPLICATE = 4
+# Posts whose estimated voice over is longer than every background or the platform limit
+VIDEO_TOO_LONG = 5
+
+
+def content_hash(text: str):
+    """
+    Hash post content so edits can be detected without comparing full bodies.
+
+    Args:
+        text (str): The post content.
+
+    Returns:
+        str: The hex digest of the content, or None if there is no content.
+    """
+    if text is None:
+        return None
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def column_exists(conn, table: str, column: str):
+    """
+    Check whether a table has a column.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        table (str): The table name.
+        column (str): The column name.
+
+    Returns:
+        bool: True if the column exists.
+    """
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def add_column(conn, table: str, column: str, definition: str):
+    """
+    Add a column to a table unless it already exists.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        table (str): The table name.
+        column (str): The column name.
+        definition (str): The column type and constraints.
+    """
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _create_base_tables(conn):
+    # Create posts table if not exists
+    conn.execute('''CREATE TABLE IF NOT EXISTS posts
+                      (id TEXT PRIMARY KEY,
+                       subreddit TEXT,
+                       title TEXT,
+                       content TEXT,
+                       likes INTEGER,
+                       author TEXT,
+                       created_utc INTEGER,
+                       url TEXT)''')
+
+    # Create 'subreddits' table
+    conn.execute('''CREATE TABLE IF NOT EXISTS subreddits (
+                        id INTEGER PRIMARY KEY,
+                        name TEXT UNIQUE,
+                        enabled INTEGER DEFAULT 1
+                    )''')
+
+    # Create 'filters' table
+    conn.execute('''CREATE TABLE IF NOT EXISTS filters (
+                        id INTEGER PRIMARY KEY,
+                        word TEXT UNIQUE
+                    )''')
+
+
+def _add_job_state(conn):
+    # Render state of each post, older databases may already have video_made added by hand
+    add_column(conn, "posts", "video_made", f"INTEGER NOT NULL DEFAULT {VIDEO_PENDING}")
+    add_column(conn, "posts", "discovered_at", "INTEGER")
+    add_column(conn, "posts", "state_updated_at", "INTEGER")
+    add_column(conn, "posts", "video_made_at", "INTEGER")
+
+    # Covering indexes for the render queue and the update-post lookups
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_state ON posts (video_made, id, url)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_author_title ON posts (author, title)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_subreddit ON posts (subreddit)")
+
+
+def _add_content_hash(conn):
+    # Content hash and edited timestamp used by discovery to detect changes
+    add_column(conn, "posts", "content_hash", "TEXT")
+    add_column(conn, "posts", "edited", "REAL NOT NULL DEFAULT 0")
+    conn.create_function("content_hash", 1, content_hash, deterministic=True)
+    conn.execute("UPDATE posts SET content_hash = content_hash(content)")
+
+
+def _add_discovery_cursors(conn):
+    # Per-subreddit high-water marks for incremental discovery
+    conn.execute('''CREATE TABLE IF NOT EXISTS subreddit_cursors (
+                        subreddit TEXT NOT NULL,
+                        mode TEXT NOT NULL,
+                        last_fullname TEXT,
+                        last_created_utc REAL,
+                        updated_at INTEGER,
+                        PRIMARY KEY (subreddit, mode)
+                    )''')
+    # When each post's score was last refreshed from Reddit
+    add_column(conn, "posts", "score_refreshed_at", "INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_score_refreshed ON posts (score_refreshed_at)")
+
+
+def _add_title_index(conn):
+    # Inverted index from normalized title tokens to posts, used to find update posts
+    conn.execute('''CREATE TABLE IF NOT EXISTS title_tokens (
+                        token TEXT NOT NULL,
+                        post_id TEXT NOT NULL,
+                        author TEXT,
+                        PRIMARY KEY (token, post_id)
+                    ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_title_tokens_author ON title_tokens (author, token)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_title_tokens_post ON title_tokens (post_id)")
+    # Number of tokens in each indexed title
+    add_column(conn, "posts", "title_tokens", "INTEGER")
+    TitleIndex(conn).rebuild()
+
+
+def _add_author_checks(conn):
+    # Per-author feed validators and polling cadence
+    conn.execute('''CREATE TABLE IF NOT EXISTS author_checks (
+                        author TEXT PRIMARY KEY,
+                        etag TEXT,
+                        last_modified TEXT,
+                        last_checked REAL,
+                        last_activity REAL,
+                        interval INTEGER,
+                        next_check REAL
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_author_checks_next ON author_checks (next_check)")
+
+
+def _add_post_versions(conn):
+    # Every distinct filtered text of a post and when it was rendered
+    conn.execute('''CREATE TABLE IF NOT EXISTS post_versions (
+                        post_id TEXT NOT NULL,
+                        content_hash TEXT NOT NULL,
+                        content TEXT,
+                        created_at INTEGER,
+                        rendered_at INTEGER,
+                        PRIMARY KEY (post_id, content_hash)
+                    )''')
+    # Hash of the current filtered text, existing posts adopt theirs on their next fetch and are only
+    # rendered again if their raw content changed since
+    add_column(conn, "posts", "version_hash", "TEXT")
+
+
+def _add_render_fields(conn):
+    # Fields needed to render a post from its stored row
+    add_column(conn, "posts", "num_comments", "INTEGER")
+    add_column(conn, "posts", "author_fullname", "TEXT")
+    add_column(conn, "posts", "avatar_url", "TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_author_fullname ON posts (author_fullname)")
+
+
+def _add_full_text_index(conn):
+    # Full-text index over titles and content, kept in sync with posts by triggers
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, content, content='posts', content_rowid='rowid')")
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+                        INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+                        INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+                        INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.rowid, old.title, old.content);
+                        INSERT INTO posts_fts (rowid, title, content) VALUES (new.rowid, new.title, new.content);
+                    END''')
+    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    # Used to order and filter candidates by score
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_likes ON posts (likes)")
+
+
+def _add_fingerprints(conn):
+    # Banded index of content fingerprints, used to find reposts of stories already rendered
+    conn.execute('''CREATE TABLE IF NOT EXISTS simhash_bands (
+                        band INTEGER NOT NULL,
+                        value INTEGER NOT NULL,
+                        post_id TEXT NOT NULL,
+                        PRIMARY KEY (band, value, post_id)
+                    ) WITHOUT ROWID''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_simhash_bands_post ON simhash_bands (post_id)")
+    add_column(conn, "posts", "simhash", "INTEGER")
+    # The rendered post a duplicate was matched to
+    add_column(conn, "posts", "duplicate_of", "TEXT")
+    FingerprintIndex(conn).rebuild()
+
+
+def _add_jobs(conn):
+    # Durable render queue, see jobqueue.py
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        post_id TEXT NOT NULL,
+                        url TEXT,
+                        stage TEXT,
+                        priority REAL NOT NULL DEFAULT 0,
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        max_attempts INTEGER NOT NULL,
+                        available_at REAL NOT NULL,
+                        lease_owner TEXT,
+                        lease_expires REAL,
+                        heartbeat_at REAL,
+                        last_error TEXT,
+                        created_at REAL,
+                        updated_at REAL,
+                        finished_at REAL
+                    )''')
+    # At most one active job per post
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_post ON jobs (post_id) WHERE status IN ('queued', 'leased')")
+    # Claims and lease reclaims
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, available_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires)")
+
+
+
+def _add_job_results(conn):
+    # Stage timings and output of every job, reported by local and farm workers
+    add_column(conn, "jobs", "timings", "TEXT")
+    add_column(conn, "jobs", "output_path", "TEXT")
+
+
+
+def _add_job_checkpoints(conn):
+    # Completed stages of every job and the artifacts they left, as JSON
+    add_column(conn, "jobs", "checkpoints", "TEXT")
+
+
+
+def _add_duration_samples(conn):
+    # Lengths of synthesized sentences, see duration.py
+    conn.execute('''CREATE TABLE IF NOT EXISTS tts_samples (
+                        voice TEXT NOT NULL,
+                        speed REAL NOT NULL,
+                        chars INTEGER NOT NULL,
+                        seconds REAL NOT NULL,
+                        created_at REAL
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tts_samples_voice ON tts_samples (voice, speed)")
+    # Background chosen for a job when it was admitted to the queue
+    add_column(conn, "jobs", "background", "TEXT")
+
+
+def _add_job_versions(conn):
+    # Version of the post content a job renders, taken when it is claimed
+    add_column(conn, "jobs", "version_hash", "TEXT")
+
+
+# Ordered schema migrations as (version, description, function), never edit or reorder applied entries
+MIGRATIONS = [
+    (1, "Create posts, subreddits and filters tables", _create_base_tables),
+    (2, "Add job state columns and indexes", _add_job_state),
+    (3, "Add content hash and edited timestamp to posts", _add_content_hash),
+    (4, "Add subreddit discovery cursors", _add_discovery_cursors),
+    (5, "Add title similarity index", _add_title_index),
+    (6, "Add author feed check schedule", _add_author_checks),
+    (7, "Add post versions", _add_post_versions),
+    (8, "Add render fields to posts", _add_render_fields),
+    (9, "Add full-text index over posts", _add_full_text_index),
+    (10, "Add content fingerprints for duplicate detection", _add_fingerprints),
+    (11, "Add render job queue", _add_jobs),
+    (12, "Add job timings and outputs", _add_job_results),
+    (13, "Add job checkpoints", _add_job_checkpoints),
+    (14, "Add voice over samples and job backgrounds", _add_duration_samples),
+    (15, "Add rendered content versions to jobs", _add_job_versions),
+]
+
+
+def migrate(conn):
+    """
+    Apply every migration newer than the database's schema version.
+
+    Each migration runs in its own transaction together with the version bump, so a
+    failed migration leaves the database at the previous version.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    version = row[0] or 0
+
+    for migration_version, description, apply in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        try:
+            conn.execute("BEGIN")
+            apply(conn)
+            conn.execute("INSERT INTO schema_version (version) VALUES (?)", (migration_version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"\033[1m(#)\033[0m Database migrated to version {migration_version}: {description}.\n")
+        version = migration_version
+    return version
+
+
+class WriteStats:
+    def __init__(self):
+        """
+        Initialize the WriteStats object, which tracks database write throughput.
+
+        Attributes:
+            rows (int): The number of rows written.
+            transactions (int): The number of committed transactions.
+            seconds (float): The time spent inside write transactions.
+        """
+        self.rows = 0
+        self.transactions = 0
+        self.seconds = 0.0
+        self.__lock = threading.Lock()
+
+    def record(self, rows: int, seconds: float):
+        """
+        Record a committed write transaction.
+
+        Args:
+            rows (int): The number of rows written in the transaction.
+            seconds (float): How long the transaction took.
+        """
+        with self.__lock:
+            self.rows += rows
+            self.transactions += 1
+            self.seconds += seconds
+
+    def timed(self):
+        """
+        Get a context manager that times a write transaction.
+
+        Usage:
+            with stats.timed() as batch:
+                ...
+                batch.rows = len(rows)
+
+        Returns:
+            _TimedWrite: The context manager.
+        """
+        return _TimedWrite(self)
+
+    @property
+    def rows_per_second(self):
+        """
+        The average number of rows written per second spent in transactions.
+        """
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows in {self.transactions} transactions, "
+                f"{self.seconds:.3f}s ({self.rows_per_second:.0f} rows/s)")
+
+
+class _TimedWrite:
+    def __init__(self, stats: WriteStats):
+        self.stats = stats
+        self.rows = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.stats.record(self.rows, time.perf_counter() - self.start)
+        return False
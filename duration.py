@@ -0,0 +1,167 @@
+from moviepy.editor import VideoFileClip  # Used to read the length of the background videos.
+import threading  # Provides support for threading.
+import random  # Used to pick one of the backgrounds that fit.
+import math  # Used to widen the estimate with the spread of the samples.
+import time  # Provides various time-related functions.
+import os  # Provides functions for interacting with the operating system.
+
+# Voice and speed of the voice over
+TTS_VOICE = "en_us_006"
+TTS_SPEED = 1.15
+# Seconds of silence between two sentences of the voice over
+SENTENCE_GAP = 0.1
+# Longest video the platforms accept, in seconds, 0 for no limit
+PLATFORM_LIMIT = 0
+
+# Samples of a voice and speed needed before the model learned from them replaces the default
+MIN_SAMPLES = 20
+# Model used until enough samples are recorded, roughly what en_us_006 reads at speed 1.15
+DEFAULT_SECONDS_PER_CHAR = 1 / 15
+DEFAULT_SECONDS_PER_SENTENCE = 0.3
+DEFAULT_SENTENCE_DEVIATION = 0.6
+# Standard deviations added to an estimate before it is compared to a background or limit
+CONFIDENCE = 2.0
+
+_background_lock = threading.Lock()
+# Durations of the background videos as path: ((mtime, size), seconds)
+_background_durations = {}
+
+
+class DurationModel:
+    def __init__(self, seconds_per_char: float, seconds_per_sentence: float, deviation: float, samples: int = 0):
+        """
+        Initialize the DurationModel object, a linear model of the length of a spoken sentence.
+
+        Args:
+            seconds_per_char (float): Seconds added by every character of a sentence.
+            seconds_per_sentence (float): Seconds every sentence takes regardless of its length.
+            deviation (float): The standard deviation of a sentence's length around the model.
+            samples (int): The number of sentences the model was learned from, 0 for the default model.
+        """
+        self.seconds_per_char = seconds_per_char
+        self.seconds_per_sentence = seconds_per_sentence
+        self.deviation = deviation
+        self.samples = samples
+
+    def estimate(self, sentences, gap: float = SENTENCE_GAP):
+        """
+        Estimate the length of the voice over of a script.
+
+        Args:
+            sentences (list): The sentences of the script, including the title.
+            gap (float): Seconds of silence between two sentences.
+
+        Returns:
+            tuple: The expected length and a pessimistic upper bound, in seconds.
+        """
+        if not sentences:
+            return 0.0, 0.0
+        expected = sum(self.seconds_per_char * len(s) + self.seconds_per_sentence for s in sentences)
+        expected += gap * (len(sentences) - 1)
+        # The errors of independent sentences add up with the square root of their count
+        return expected, expected + CONFIDENCE * self.deviation * math.sqrt(len(sentences))
+
+    def __str__(self):
+        source = f"{self.samples} samples" if self.samples else "default"
+        return f"{self.seconds_per_char * 1000:.1f}ms per character + {self.seconds_per_sentence:.2f}s per sentence ({source})"
+
+
+class DurationEstimator:
+    def __init__(self, database):
+        """
+        Initialize the DurationEstimator object, which learns how long the voice over of a script takes.
+
+        Every synthesized sentence is recorded in the 'tts_samples' table with its character
+        count, voice, speed and length. A least squares line through the samples of a voice
+        and speed predicts the length of new scripts before any TTS is paid for. The fit is
+        computed from aggregates inside SQLite, so it stays cheap however many samples exist.
+
+        Args:
+            database (ConnectionPool): The pool the calling thread's connection is taken from.
+        """
+        self.database = database
+
+    def record(self, voice: str, speed: float, script):
+        """
+        Record the lengths of synthesized sentences.
+
+        Args:
+            voice (str): The TTS voice.
+            speed (float): The TTS speed.
+            script (list): (characters, seconds) pairs, one per sentence.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            conn.executemany("INSERT INTO tts_samples (voice, speed, chars, seconds, created_at) VALUES (?, ?, ?, ?, ?)",
+                             [(voice, round(speed, 2), chars, seconds, now) for chars, seconds in script])
+
+    def model(self, voice: str = TTS_VOICE, speed: float = TTS_SPEED):
+        """
+        Fit the model of a voice and speed from the recorded samples.
+
+        Args:
+            voice (str): The TTS voice.
+            speed (float): The TTS speed.
+
+        Returns:
+            DurationModel: The learned model, or the default one if there are too few samples.
+        """
+        n, sx, sy, sxx, sxy, syy = self.database.connection().execute(
+            """SELECT COUNT(*), SUM(chars), SUM(seconds), SUM(chars * chars), SUM(chars * seconds), SUM(seconds * seconds)
+               FROM tts_samples WHERE voice = ? AND speed = ?""", (voice, round(speed, 2))).fetchone()
+        denominator = n * (sxx or 0) - (sx or 0) ** 2
+        if n < MIN_SAMPLES or denominator <= 0:
+            return DurationModel(DEFAULT_SECONDS_PER_CHAR, DEFAULT_SECONDS_PER_SENTENCE, DEFAULT_SENTENCE_DEVIATION)
+        slope = (n * sxy - sx * sy) / denominator
+        intercept = (sy - slope * sx) / n
+        residuals = syy - intercept * sy - slope * sxy
+        return DurationModel(slope, intercept, math.sqrt(max(residuals, 0.0) / (n - 2)), n)
+
+
+def background_durations(directory: str = "inputs"):
+    """
+    Get the length of every background video, reading each file only once while it is unchanged.
+
+    Args:
+        directory (str): The folder holding the background videos.
+
+    Returns:
+        dict: A mapping of file name to length in seconds.
+    """
+    durations = {}
+    for name in sorted(f for f in os.listdir(directory) if f.endswith(".mp4")):
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        version = (stat.st_mtime, stat.st_size)
+        with _background_lock:
+            cached = _background_durations.get(path)
+        if cached and cached[0] == version:
+            durations[name] = cached[1]
+            continue
+        try:
+            clip = VideoFileClip(path)
+            seconds = clip.duration
+            clip.close()
+        except Exception as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error reading the length of background video {name}: {e}\n")
+            continue
+        with _background_lock:
+            _background_durations[path] = (version, seconds)
+        durations[name] = seconds
+    return durations
+
+
+def choose_background(seconds: float, durations: dict):
+    """
+    Pick a random background video at least as long as the voice over.
+
+    Args:
+        seconds (float): The length the background must cover.
+        durations (dict): A mapping of file name to length, see background_durations.
+
+    Returns:
+        str: The file name of the background, or None if none is long enough.
+    """
+    fitting = [name for name, length in durations.items() if length >= seconds]
+    return random.choice(fitting) if fitting else None
@@ -6,8 +6,6 @@ import random  # Provides functions for generating random numbers or selecting r
 import math  # Provides mathematical functions and constants.
 import os  # Provides functions for interacting with the operating system.
 
-fstl_flag = 0 # Used to keep track of if the first subtitle has passed
-
 def calculate_title_duration(srt_path):
     """
     Calculate the duration of the first subtitle in the SRT file.
@@ -59,7 +57,7 @@ def time_to_seconds(time_str):
         return None
 
 class VideoEditor:
-    def __init__(self, clip_duration, srt_path, wav_path, image_path, animate_text=True):
+    def __init__(self, clip_duration, srt_path, wav_path, image=None, animate_text=True, background=None):
         """
         Initialize the Editor object.
 
@@ -68,20 +66,25 @@ class VideoEditor:
             clip_duration (int): The duration of the video clip in seconds.
             srt_path (str): The path to the SRT file.
             wav_path (str): The path to the WAV file.
-            image_path (str): The path to the picture to include in the video.
+                The duration, SRT and WAV may be None and set before start_render, so the background can be chosen before the audio exists.
+            image (numpy.ndarray | str, optional): The reddit mockup as an in-memory RGBA array or a path to an image file.
+            background (str, optional): The file name of the background video in the inputs folder, chosen at random if not given.
 
         Attributes:
             reddit_id (str): The ID of the Reddit post.
             clip_duration (int): The duration of the video clip in seconds.
             srt_path (str): The path to the SRT file.
             wav_path (str): The path to the WAV file.
-            image_path (str): The path to the picture to include in the video.
-            bg_path (list): A list of background video paths.
+            image (numpy.ndarray | str): The reddit mockup to overlay at the start of the video.
+            bg_path (str): The file name of the chosen background video.
             background_video (VideoFileClip): The background video clip.
+            fstl_flag (int): Used to keep track of if the first subtitle has passed.
         """
+        # Per-instance, so several editors can render at once
+        self.fstl_flag = 0
         try:
-            # Initialize the reddit mockup image
-            self.image_path = "temp/redit_mockup.png"
+            # Initialize the reddit mockup image, falling back to the legacy on-disk mockup
+            self.image = image if image is not None else "temp/redit_mockup.png"
 
             # The Y coordinate of the text.
             self.y_cord = 1080
@@ -92,11 +95,15 @@ class VideoEditor:
             # The path to the WAV and SRT file.
             self.srt_path = srt_path
             self.wav_path = wav_path
-            # A list of background videos
-            self.bg_path = [
-                f for f in os.listdir("inputs") if f.endswith('.mp4')]
-            # Randomly select a background video to use later
-            self.bg_path = random.choice(self.bg_path)
+            if background is not None:
+                # Use the background chosen by the caller, such as the one of a resumed job
+                self.bg_path = background
+            else:
+                # A list of background videos
+                self.bg_path = [
+                    f for f in os.listdir("inputs") if f.endswith('.mp4')]
+                # Randomly select a background video to use later
+                self.bg_path = random.choice(self.bg_path)
             self.background_video = VideoFileClip(
                 os.path.join("inputs", self.bg_path))
         except Exception as e:
@@ -112,13 +119,11 @@ class VideoEditor:
         Returns:
         TextClip: A TextClip object with the specified text and style.
         """
-        # Access global variable within function
-        global fstl_flag
        # print("\n \033[1m(#)\033[0m text_generator run, here is previous txt")
         #print(txt)
-        if fstl_flag < 2:
+        if self.fstl_flag < 2:
             txt = " "  # Set txt to empty string to display nothing
-            fstl_flag += 1  # Let the program know we are now past the first subtitle after 2 counts
+            self.fstl_flag += 1  # Let the program know we are now past the first subtitle after 2 counts
             #print("\n \033[1m(#)\033[0m text Generator set fstl_flag set to 1 and txt to null, here is txt after")
             #print(txt)
         #print("\n \033[1m(#)\033[0m and now after the function")
@@ -140,14 +145,14 @@ class VideoEditor:
         Args:
             output_path (str): The path to save the rendered video file. Default is "outputs/output.mp4".
 
-        Returns:
-            None
+        Raises:
+            ValueError: If the background video is shorter than the audio.
+            Exception: Any error of the render, so the caller does not treat the video as made.
         """
         try:
             print("\033[1m(#)\033[0m Rendering video...\n")
             # Reset fstl_flag to remove first subtitle for reddit mockup
-            global fstl_flag
-            fstl_flag = 0
+            self.fstl_flag = 0
             
             # Get the actual duration of the background video
             background_duration = self.background_video.duration
@@ -157,7 +162,7 @@ class VideoEditor:
                 print("\033[31m\033[1m(#)\033[0m The background video isn't long enough for the chosen post, please choose a shorter post or use a longer background video.\n")
                 print("\033[1m(#)\033[0m Background video duration:", background_duration)
                 print("\033[1m(#)\033[0m Clip duration:", self.clip_duration)
-                return  # Exit the method if the background video is too short
+                raise ValueError(f"The background video {self.bg_path} ({background_duration:.1f}s) is shorter than the audio ({self.clip_duration:.1f}s)")
 
             # Randomly select a start time for the video clip
             self.start_time = random.randint(0, math.floor(background_duration - self.clip_duration))
@@ -179,11 +184,12 @@ class VideoEditor:
                 self.__text_generator).set_position(('center', 550))
 
             # Load the image clip
-            image_clip = ImageClip(self.image_path)
+            image_clip = ImageClip(self.image)
             
-            # Resize the image to fit the width of the background video
+            # Resize the image to fit the width of the background video, unless it was drawn at that width
             bg_width = self.background_video.size[0]
-            image_clip = image_clip.resize(width=bg_width)
+            if image_clip.w != bg_width:
+                image_clip = image_clip.resize(width=bg_width)
 
             # Set the duration for how long the image should appear (same as title duration)
             title_duration = calculate_title_duration(self.srt_path)
@@ -200,6 +206,7 @@ class VideoEditor:
             print("\033[1m(#)\033[0m Video rendered successfully!\n")
         except Exception as e:
             print("\033[31m\033[1m(#)\033[0m Error occurred while rendering video:", e)
+            raise
 
 
     def aspect_converter(self, input_directory="downloads/", output_directory="inputs/", output_width=1080, output_height=1920):
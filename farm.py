@@ -0,0 +1,499 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler  # Serves the render queue to farm workers.
+from concurrent.futures import ProcessPoolExecutor, as_completed  # Used to run several farm workers on one machine.
+from urllib.parse import urlsplit, parse_qs  # Used to route the requests of farm workers.
+from generator import VideoGenerator, collect_workspaces, STAGE_WORKERS  # Custom module for the stages of a video.
+from jobqueue import KeepAlive, worker_name  # Custom module for the durable render queue.
+from database import VIDEO_PENDING, VIDEO_FAILED  # Custom module for the render states of posts.
+import multiprocessing  # Used to start the farm worker processes.
+import threading  # Provides support for threading.
+import requests  # Used for making HTTP requests, typically for API interactions.
+import json  # Used to encode the requests and responses of the farm API.
+import time  # Provides various time-related functions.
+import re  # Provides support for regular expressions (regex).
+import os  # Provides functions for interacting with the operating system.
+
+# Port the coordinator listens on unless another is given
+FARM_PORT = 8765
+# Seconds between scans for new pending posts while workers are claiming jobs
+ENQUEUE_INTERVAL = 30
+# Seconds an idle worker waits before asking for a job again
+POLL_INTERVAL = 10
+# Seconds a request to the coordinator may take, uploads excluded
+REQUEST_TIMEOUT = 30
+# Bytes read from an upload at a time
+UPLOAD_CHUNK = 1024 * 1024
+
+# Job endpoints as /jobs/<id>/<action>
+_JOB_PATH = re.compile(r"^/jobs/(\d+)/(heartbeat|checkpoint|complete|fail|video)$")
+
+
+class Coordinator:
+    def __init__(self, reddit, host: str = "127.0.0.1", port: int = FARM_PORT, enqueue_interval: float = ENQUEUE_INTERVAL):
+        """
+        Initialize the Coordinator object, which hands out the render queue to farm workers over HTTP.
+
+        The coordinator is the only process that touches the database. Workers claim a job
+        together with its post details, extend the lease with heartbeats while they render,
+        upload the finished video and report their stage timings. Jobs of workers that stop
+        sending heartbeats are reclaimed by the next claim once their lease runs out.
+
+        Endpoints, all JSON:
+            POST /jobs/claim {"worker"}: 200 with the job, post and lease_seconds, or 204 if no job is available.
+            POST /jobs/<id>/heartbeat {"worker", "stage"}: {"ok"}, false if the lease was lost.
+            POST /jobs/<id>/checkpoint {"worker", "stage", "artifacts"}: {"ok"}, false if the lease was lost.
+            PUT /jobs/<id>/video?name=<file>: the rendered video as the request body.
+            POST /jobs/<id>/complete {"worker", "timings", "output"}: {"ok"}, 409 if the worker lost the lease.
+            POST /jobs/<id>/fail {"worker", "error", "timings"}: {"dead"}, true if the job was dead-lettered.
+            GET /status: the number of jobs in every status.
+
+        Args:
+            reddit (RedditAPI): The Reddit client owning the database and the render queue.
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+            enqueue_interval (float): Seconds between scans for new pending posts.
+        """
+        self.reddit = reddit
+        self.enqueue_interval = enqueue_interval
+        self.output_dir = reddit.generator.output_dir
+        self.server = ThreadingHTTPServer((host, port), _CoordinatorHandler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self.__last_enqueue = 0.0
+        # Claims are handed out one at a time so two workers never race for the same post details
+        self.__claim_lock = threading.Lock()
+
+    @property
+    def address(self):
+        """
+        The URL workers connect to.
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """
+        Serve workers until shutdown is called or the process is interrupted.
+        """
+        print(f"\033[1m(#)\033[0m Coordinator listening on {self.address}, start workers with '-wk {self.address}'.\n")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+
+    def shutdown(self):
+        """
+        Stop serving, requests already being handled are left to finish.
+        """
+        self.server.shutdown()
+
+    def claim(self, worker: str):
+        """
+        Lease the next job to a worker, with the post details it needs to render it.
+
+        Args:
+            worker (str): The name of the claiming worker.
+
+        Returns:
+            dict: The job, post and lease_seconds, or None if no job is available.
+        """
+        with self.__claim_lock:
+            if time.time() - self.__last_enqueue >= self.enqueue_interval:
+                self.reddit.jobs.enqueue(VIDEO_PENDING, admit=self.reddit.admit)
+                self.__last_enqueue = time.time()
+            while True:
+                job = self.reddit.jobs.claim(worker)
+                if job is None:
+                    return None
+                try:
+                    post = self.reddit.posts_for_render([job.post_id]).get(job.post_id)
+                    if post is None:
+                        post = self.reddit.get_from_url(job.url)
+                except Exception as e:
+                    # The post could not be loaded, count it as a failed attempt and hand out the next job
+                    print(f"\033[31m\033[1m(#)\033[0m Error loading post ID {job.post_id} for {worker}: {e}\n")
+                    if self.reddit.jobs.fail(job.id, f"claim: {e}", owner=worker):
+                        self.reddit.set_video_state(job.post_id, VIDEO_FAILED)
+                    continue
+                print(f"\033[1m(#)\033[0m Leased job {job.id} (post ID {job.post_id}, attempt {job.attempts} of {job.max_attempts}) to {worker}.\n")
+                return {"job": job._asdict(), "post": post, "lease_seconds": self.reddit.jobs.lease_seconds}
+
+    def checkpoint(self, job_id: int, worker: str, stage: str, artifacts: dict):
+        """
+        Record a stage a worker completed, learning the voice over lengths from the audio stage.
+
+        Returns:
+            bool: False if the worker no longer holds the lease.
+        """
+        ok = self.reddit.jobs.checkpoint(job_id, worker, stage, artifacts)
+        if ok and stage == "audio":
+            self.reddit.record_durations(artifacts)
+        return ok
+
+    def complete(self, job_id: int, worker: str, timings: dict = None, output: str = None):
+        """
+        Record a job a worker finished and uploaded, rejected if the worker no longer holds the lease.
+
+        Returns:
+            bool: True if the job was completed, False if the lease was lost, None if the job does not exist.
+        """
+        job = self.reddit.jobs.get(job_id)
+        if job is None:
+            return None
+        output_path = os.path.join(self.output_dir, os.path.basename(output)) if output else None
+        if job.lease_owner != worker or not self.reddit.jobs.complete(job_id, worker, timings, output_path):
+            print(f"\033[31m\033[1m(#)\033[0m {worker} finished job {job_id} after losing its lease, rejecting it.\n")
+            return False
+        self.reddit.mark_rendered(job.post_id, job.version_hash)
+        stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in (timings or {}).items())
+        print(f"\033[1m(#)\033[0m {worker} finished job {job_id} (post ID {job.post_id}){f': {stages}' if stages else ''}.\n")
+        return True
+
+    def fail(self, job_id: int, worker: str, error: str, timings: dict = None):
+        """
+        Record a failed attempt of a worker, ignored if the worker no longer holds the lease.
+
+        Returns:
+            bool: True if the job was dead-lettered.
+        """
+        job = self.reddit.jobs.get(job_id)
+        if job is None:
+            return False
+        if job.lease_owner != worker:
+            print(f"\033[31m\033[1m(#)\033[0m {worker} reported a failure of job {job_id} after losing its lease, ignoring it.\n")
+            return False
+        print(f"\033[31m\033[1m(#)\033[0m {worker} failed job {job_id} (post ID {job.post_id}, attempt {job.attempts} of {job.max_attempts}): {error}\n")
+        dead = self.reddit.jobs.fail(job_id, error, timings, owner=worker)
+        if dead:
+            self.reddit.set_video_state(job.post_id, VIDEO_FAILED)
+        return dead
+
+    def store_video(self, job_id: int, name: str, stream, length: int):
+        """
+        Store a video uploaded by a worker in the outputs folder.
+
+        Args:
+            job_id (int): The ID of the job the video belongs to.
+            name (str): The file name of the video.
+            stream (file): The request body.
+            length (int): The number of bytes in the body.
+
+        Returns:
+            str: The path the video was stored at, or None if the job does not exist.
+        """
+        if self.reddit.jobs.get(job_id) is None:
+            return None
+        path = os.path.join(self.output_dir, name)
+        tmp_path = f"{path}.{job_id}.part"
+        with open(tmp_path, "wb") as f:
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(UPLOAD_CHUNK, remaining))
+                if not chunk:
+                    raise ConnectionError(f"Upload of {name} ended {remaining} bytes early")
+                f.write(chunk)
+                remaining -= len(chunk)
+        os.replace(tmp_path, path)
+        return path
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    def handle(self):
+        try:
+            super().handle()
+        finally:
+            # Every request runs on its own thread, close its database connection when it is done
+            self.server.coordinator.reddit.database.release()
+
+    def log_message(self, format, *args):
+        # Requests are reported by the coordinator itself
+        pass
+
+    def __reply(self, status: int, body: dict = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def __body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/status":
+            self.__reply(200, {"jobs": self.server.coordinator.reddit.jobs.counts()})
+        else:
+            self.__reply(404, {"error": "Not found"})
+
+    def do_POST(self):
+        coordinator = self.server.coordinator
+        path = urlsplit(self.path).path
+        try:
+            body = self.__body()
+            worker = body.get("worker") or self.client_address[0]
+            if path == "/jobs/claim":
+                claimed = coordinator.claim(worker)
+                if claimed is None:
+                    self.__reply(204)
+                else:
+                    self.__reply(200, claimed)
+                return
+            match = _JOB_PATH.match(path)
+            if not match or match.group(2) == "video":
+                self.__reply(404, {"error": "Not found"})
+                return
+            job_id, action = int(match.group(1)), match.group(2)
+            if action == "heartbeat":
+                self.__reply(200, {"ok": coordinator.reddit.jobs.heartbeat(job_id, worker, body.get("stage"))})
+            elif action == "checkpoint":
+                self.__reply(200, {"ok": coordinator.checkpoint(job_id, worker, body.get("stage"), body.get("artifacts") or {})})
+            elif action == "complete":
+                ok = coordinator.complete(job_id, worker, body.get("timings"), body.get("output"))
+                self.__reply(404 if ok is None else 200 if ok else 409, {"ok": bool(ok)})
+            else:
+                self.__reply(200, {"dead": coordinator.fail(job_id, worker, body.get("error") or "Unknown error", body.get("timings"))})
+        except Exception as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error handling {path}: {e}\n")
+            self.__reply(500, {"error": str(e)})
+
+    def do_PUT(self):
+        coordinator = self.server.coordinator
+        url = urlsplit(self.path)
+        match = _JOB_PATH.match(url.path)
+        if not match or match.group(2) != "video":
+            self.__reply(404, {"error": "Not found"})
+            return
+        # Only the file name is kept, so uploads can never be written outside the outputs folder
+        name = os.path.basename(parse_qs(url.query).get("name", [""])[0])
+        if not name.endswith(".mp4"):
+            self.__reply(400, {"error": "Expected an .mp4 file name"})
+            return
+        try:
+            path = coordinator.store_video(int(match.group(1)), name, self.rfile, int(self.headers.get("Content-Length") or 0))
+            if path is None:
+                self.__reply(404, {"error": "Unknown job"})
+            else:
+                self.__reply(200, {"path": path})
+        except Exception as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error storing the upload of {name}: {e}\n")
+            self.__reply(500, {"error": str(e)})
+
+
+class RemoteQueue:
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT):
+        """
+        Initialize the RemoteQueue object, a client of the render queue served by a Coordinator.
+
+        Its heartbeat method matches JobQueue.heartbeat, so a KeepAlive can extend remote leases.
+
+        Args:
+            url (str): The URL of the coordinator, such as http://127.0.0.1:8765.
+            timeout (float): Seconds a request may take, uploads excluded.
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.__lock = threading.Lock()
+
+    def __post(self, path: str, body: dict):
+        # Heartbeats are sent from other threads than the claims, a session is not thread-safe
+        with self.__lock:
+            response = self.session.post(self.url + path, json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def claim(self, owner: str):
+        """
+        Lease the next job.
+
+        Args:
+            owner (str): The name of the worker.
+
+        Returns:
+            dict: The job, post and lease_seconds, or None if no job is available.
+        """
+        response = self.__post("/jobs/claim", {"worker": owner})
+        return None if response.status_code == 204 else response.json()
+
+    def heartbeat(self, job_id: int, owner: str, stage: str = None):
+        """
+        Extend the lease of a job and record the stage it has reached.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        try:
+            return self.__post(f"/jobs/{job_id}/heartbeat", {"worker": owner, "stage": stage}).json()["ok"]
+        except requests.RequestException as e:
+            # Keep trying, the coordinator decides when the lease has run out
+            print(f"\033[31m\033[1m(#)\033[0m Heartbeat of job {job_id} failed: {e}\n")
+            return True
+
+    def checkpoint(self, job_id: int, owner: str, stage: str, artifacts: dict):
+        """
+        Record that a job completed a stage, with the artifacts a retry can resume from.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        return self.__post(f"/jobs/{job_id}/checkpoint", {"worker": owner, "stage": stage, "artifacts": artifacts}).json()["ok"]
+
+    def upload(self, job_id: int, path: str):
+        """
+        Upload a rendered video.
+
+        Args:
+            job_id (int): The ID of the job.
+            path (str): The local path of the video.
+        """
+        with open(path, "rb") as f:
+            response = requests.put(f"{self.url}/jobs/{job_id}/video", params={"name": os.path.basename(path)}, data=f,
+                                    timeout=(self.timeout, None))
+        response.raise_for_status()
+
+    def complete(self, job_id: int, owner: str, timings: dict = None, output: str = None):
+        """
+        Mark a job as done once its video has been uploaded.
+        """
+        self.__post(f"/jobs/{job_id}/complete", {"worker": owner, "timings": timings, "output": output})
+
+    def fail(self, job_id: int, owner: str, error: str, timings: dict = None):
+        """
+        Record a failed attempt.
+
+        Returns:
+            bool: True if the job was dead-lettered.
+        """
+        return self.__post(f"/jobs/{job_id}/fail", {"worker": owner, "error": error, "timings": timings}).json()["dead"]
+
+
+class FarmWorker:
+    def __init__(self, url: str, stage_workers: tuple = STAGE_WORKERS, poll_interval: float = POLL_INTERVAL):
+        """
+        Initialize the FarmWorker object, which renders jobs leased from a Coordinator.
+
+        Jobs run through the same prepare, audio and render pipeline as local renders. The
+        finished video is uploaded to the coordinator together with the stage timings and
+        removed locally, so workers need neither Reddit credentials nor the database.
+        Checkpoints are reported to the coordinator, so a retry on the same machine resumes
+        from the artifacts left in the workspace.
+
+        Args:
+            url (str): The URL of the coordinator.
+            stage_workers (tuple): The number of threads of the prepare, audio and render stages.
+            poll_interval (float): Seconds to wait before asking again when no job is available.
+        """
+        self.queue = RemoteQueue(url)
+        self.stage_workers = stage_workers
+        self.poll_interval = poll_interval
+        self.owner = worker_name()
+        # Videos wait in their workspace for the upload, apart from the outputs folder the coordinator may share on the same machine
+        self.generator = VideoGenerator(output_dir=None)
+
+    def run(self):
+        """
+        Render leased jobs until the process is interrupted.
+        """
+        print(f"\033[1m(#)\033[0m Worker {self.owner} rendering jobs from {self.queue.url}.\n")
+        while True:
+            try:
+                if not self.run_once():
+                    time.sleep(self.poll_interval)
+            except KeyboardInterrupt:
+                return
+
+    def run_once(self):
+        """
+        Render jobs until the coordinator has none left.
+
+        Returns:
+            int: The number of jobs claimed.
+        """
+        claimed = [0]
+        # Remove the workspaces of failed videos that were never retried
+        collect_workspaces()
+
+        def claimed_jobs():
+            while True:
+                try:
+                    lease = self.queue.claim(self.owner)
+                except requests.RequestException as e:
+                    print(f"\033[31m\033[1m(#)\033[0m Could not reach the coordinator at {self.queue.url}: {e}\n")
+                    return
+                if lease is None:
+                    return
+                claimed[0] += 1
+                job = lease["job"]
+                # Keep the lease alive while the job waits in and moves through the pipeline
+                keep_alive = KeepAlive(self.queue, job["id"], self.owner, lease["lease_seconds"] / 3).start()
+                yield {"job": job, "post": lease["post"], "checkpoints": json.loads(job.get("checkpoints") or "{}"),
+                       "background": job.get("background"), "keep_alive": keep_alive}
+
+        def on_done(task):
+            job = task["job"]
+            task["keep_alive"].stop()
+            path = task["output_path"]
+            try:
+                self.queue.upload(job["id"], path)
+                self.queue.complete(job["id"], self.owner, task.get("timings"), os.path.basename(path))
+            except Exception as e:
+                on_error(task, "upload", e)
+                return
+            self.generator.cleanup(task)
+
+        def on_error(task, stage, e):
+            job = task["job"]
+            task["keep_alive"].stop()
+            print(f"\033[31m\033[1m(#)\033[0m Error generating video for post ID {job['post_id']} in the {stage} stage (attempt {job['attempts']} of {job['max_attempts']}): {e}\n")
+            try:
+                self.queue.fail(job["id"], self.owner, f"{stage}: {e}", task.get("timings"))
+            except requests.RequestException as e:
+                # The lease runs out and the coordinator hands the job out again
+                print(f"\033[31m\033[1m(#)\033[0m Could not report the failure of job {job['id']}: {e}\n")
+
+        def on_checkpoint(task, stage, artifacts):
+            try:
+                self.queue.checkpoint(task["job"]["id"], self.owner, stage, artifacts)
+            except requests.RequestException as e:
+                # The stage is simply redone if the job is retried
+                print(f"\033[31m\033[1m(#)\033[0m Could not record the {stage} checkpoint of job {task['job']['id']}: {e}\n")
+
+        pipeline = self.generator.pipeline(self.stage_workers, on_checkpoint)
+        pipeline.run(claimed_jobs(), on_done, on_error,
+                     on_stage=lambda task, stage: task["keep_alive"].set_stage(stage))
+        if claimed[0]:
+            print(f"\033[1m(#)\033[0m Stage timings: {pipeline}\n")
+        return claimed[0]
+
+
+def _run_worker(url: str, stage_workers: tuple):
+    """
+    Run a farm worker in a worker process.
+    """
+    FarmWorker(url, stage_workers).run()
+
+
+def run_workers(url: str, workers: int = 1, stage_workers: tuple = STAGE_WORKERS):
+    """
+    Run farm workers against a coordinator until interrupted.
+
+    Args:
+        url (str): The URL of the coordinator.
+        workers (int): The number of worker processes, 1 runs in this process.
+        stage_workers (tuple): The number of threads of each stage in every worker.
+    """
+    if workers <= 1:
+        FarmWorker(url, stage_workers).run()
+        return
+    # Spawned rather than forked so every worker starts with a clean interpreter
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_run_worker, url, stage_workers) for _ in range(workers)]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                print(f"\033[31m\033[1m(#)\033[0m A farm worker stopped unexpectedly: {e}\n")
@@ -0,0 +1,150 @@
+from ratelimit import shared_budget  # Custom module for sharing Reddit's rate limit.
+from httpcache import CachingAdapter  # Custom module for caching and recording Reddit responses.
+from tqdm import tqdm  # Provides a progress bar to show the progress of iterative tasks.
+import requests  # Used for making HTTP requests, typically for API interactions.
+import asyncio  # Used to run the author feed requests concurrently.
+import time  # Provides various time-related functions.
+
+# User agent sent with the author feed requests
+USER_AGENT = "ReditStoryCapture/1.0"
+
+
+class AuthorFeedChecker:
+    def __init__(self, database, concurrency: int = 8, base_interval: int = 30 * 60, max_interval: int = 7 * 24 * 60 * 60):
+        """
+        Initialize the AuthorFeedChecker object.
+
+        Author feeds are fetched concurrently over one pooled session with conditional
+        requests. Every author has its own polling interval, which resets when the author
+        posts something new and doubles every time their feed is unchanged, so dormant
+        authors are polled exponentially less often.
+
+        Args:
+            database (ConnectionPool): The pool the calling thread's connection is taken from.
+            concurrency (int): The maximum number of feed requests in flight.
+            base_interval (int): Seconds between checks of an active author.
+            max_interval (int): The longest interval between checks of a dormant author.
+        """
+        self.database = database
+        self.concurrency = concurrency
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+
+        # Pooled session shared by every request, answered from the response cache or paced by the budget of unauthenticated Reddit requests
+        self.budget = shared_budget
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = CachingAdapter(pool_connections=concurrency, pool_maxsize=concurrency, budget=self.budget)
+        self.session.mount("https://", adapter)
+
+    def due_authors(self, now: float = None):
+        """
+        Get the authors whose feeds are due to be checked.
+
+        Args:
+            now (float, optional): The current UNIX time.
+
+        Returns:
+            list: (author, etag, last_modified, last_activity, interval) tuples.
+        """
+        now = now or time.time()
+        return self.database.connection().execute(
+            """SELECT a.author, c.etag, c.last_modified, c.last_activity, c.interval
+               FROM (SELECT DISTINCT author FROM posts WHERE author IS NOT NULL) a
+               LEFT JOIN author_checks c ON c.author = a.author
+               WHERE c.next_check IS NULL OR c.next_check <= ?
+               ORDER BY c.next_check""", (now,)).fetchall()
+
+    def __fetch(self, author: str, etag: str, last_modified: str):
+        """
+        Fetch an author's submitted feed, revalidating with the stored validators.
+
+        Returns:
+            tuple: (status_code, response or None).
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            # Update checks yield to discovery and hydration
+            with self.budget.priority("updates"):
+                response = self.session.get(f"https://www.reddit.com/user/{author}/submitted/.json",
+                                            headers=headers, timeout=30)
+            return response.status_code, response
+        except requests.RequestException as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error fetching the feed of {author}: {e}.\n")
+            return None, None
+
+    async def __fetch_all(self, due: list):
+        """
+        Fetch every due feed with at most `concurrency` requests in flight.
+
+        Returns:
+            list: (state, status_code, response) tuples in completion order.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(state):
+            async with semaphore:
+                status, response = await loop.run_in_executor(None, self.__fetch, state[0], state[1], state[2])
+                return state, status, response
+
+        results = []
+        tasks = [asyncio.ensure_future(fetch(state)) for state in due]
+        for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="Checking for similar titles", unit="author"):
+            results.append(await task)
+        return results
+
+    def check(self):
+        """
+        Check every due author's feed and reschedule their next check.
+
+        Returns:
+            dict: A mapping of author to their submissions (the "data" of each listing child) for every feed that changed.
+        """
+        now = time.time()
+        due = self.due_authors(now)
+        if not due:
+            return {}
+        results = asyncio.run(self.__fetch_all(due))
+
+        feeds = {}
+        states = []
+        for (author, etag, last_modified, last_activity, interval), status, response in results:
+            interval = interval or self.base_interval
+            if status == 200:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                try:
+                    submissions = [child["data"] for child in response.json()["data"]["children"]]
+                except (ValueError, KeyError, TypeError):
+                    submissions = []
+                newest = max((submission.get("created_utc", 0) for submission in submissions), default=0)
+                if newest > (last_activity or 0):
+                    # The author posted something new, check them again soon
+                    last_activity = newest
+                    interval = self.base_interval
+                else:
+                    interval = min(interval * 2, self.max_interval)
+                feeds[author] = submissions
+            elif status == 304:
+                # Unchanged feed, back off
+                interval = min(interval * 2, self.max_interval)
+            elif status in (403, 404):
+                # Suspended or deleted accounts are checked as rarely as possible
+                interval = self.max_interval
+            # Any other failure keeps the interval and is retried on the next cadence
+            states.append((author, etag, last_modified, now, last_activity, interval, now + interval))
+
+        conn = self.database.connection()
+        with conn:
+            conn.executemany(
+                """INSERT INTO author_checks (author, etag, last_modified, last_checked, last_activity, interval, next_check)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(author) DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified,
+                       last_checked=excluded.last_checked, last_activity=excluded.last_activity,
+                       interval=excluded.interval, next_check=excluded.next_check""", states)
+        return feeds
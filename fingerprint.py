@@ -0,0 +1,172 @@
+import hashlib  # Used to hash the shingles of a post.
+import re  # Provides support for regular expressions (regex).
+
+# Number of bits in a fingerprint
+FINGERPRINT_BITS = 64
+# Number of bands the fingerprint is split into for the index
+FINGERPRINT_BANDS = 4
+# Maximum number of differing bits for two posts to count as copies of the same story.
+# With 4 bands of 16 bits, any two fingerprints within 3 bits share at least one band exactly.
+DUPLICATE_DISTANCE = 3
+# Number of words in each shingle
+SHINGLE_SIZE = 3
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+_BAND_BITS = FINGERPRINT_BITS // FINGERPRINT_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def simhash(text: str):
+    """
+    Compute the SimHash fingerprint of a text.
+
+    The text is lowercased and split into overlapping word shingles, so reposts with
+    different formatting, punctuation or a few edited words get fingerprints that
+    differ in only a few bits.
+
+    Args:
+        text (str): The post content.
+
+    Returns:
+        int: The fingerprint as a signed 64-bit integer so it fits in SQLite, or None if the text has no words.
+    """
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if not words:
+        return None
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))]
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    # Store as signed so SQLite's 64-bit INTEGER can hold it
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint >> (FINGERPRINT_BITS - 1) else fingerprint
+
+
+def hamming_distance(a: int, b: int):
+    """
+    Count the bits that differ between two fingerprints.
+
+    Args:
+        a (int): The first fingerprint.
+        b (int): The second fingerprint.
+
+    Returns:
+        int: The number of differing bits.
+    """
+    return bin((a ^ b) & ((1 << FINGERPRINT_BITS) - 1)).count("1")
+
+
+def bands(fingerprint: int):
+    """
+    Split a fingerprint into its bands.
+
+    Args:
+        fingerprint (int): The fingerprint.
+
+    Returns:
+        list: (band, value) tuples.
+    """
+    return [(band, (fingerprint >> (band * _BAND_BITS)) & _BAND_MASK) for band in range(FINGERPRINT_BANDS)]
+
+
+class FingerprintIndex:
+    def __init__(self, conn):
+        """
+        Initialize the FingerprintIndex object, a banded index of post fingerprints.
+
+        Each fingerprint is stored in posts.simhash and its bands in the simhash_bands table,
+        so finding near-duplicates only compares the posts sharing a band with the query
+        instead of every stored post.
+
+        Args:
+            conn (sqlite3.Connection): The database connection.
+        """
+        self.conn = conn
+
+    def add_many(self, rows):
+        """
+        Add posts to the index. Must be called inside the transaction that writes the posts.
+
+        Args:
+            rows (iterable): (post_id, text) tuples.
+
+        Returns:
+            dict: A mapping of post ID to its fingerprint for every post with text.
+        """
+        fingerprints = {}
+        for post_id, text in rows:
+            fingerprint = simhash(text)
+            if fingerprint is not None:
+                fingerprints[post_id] = fingerprint
+        self.remove_many(list(fingerprints))
+        self.conn.executemany("INSERT OR REPLACE INTO simhash_bands (band, value, post_id) VALUES (?, ?, ?)",
+                              [(band, value, post_id) for post_id, fingerprint in fingerprints.items()
+                               for band, value in bands(fingerprint)])
+        self.conn.executemany("UPDATE posts SET simhash = ? WHERE id = ?",
+                              [(fingerprint, post_id) for post_id, fingerprint in fingerprints.items()])
+        return fingerprints
+
+    def remove_many(self, post_ids):
+        """
+        Remove posts from the index.
+
+        Args:
+            post_ids (list): The post IDs.
+        """
+        self.conn.executemany("DELETE FROM simhash_bands WHERE post_id = ?", [(post_id,) for post_id in post_ids])
+
+    def remove(self, post_id: str = None):
+        """
+        Remove a post from the index, or every post if no ID is given.
+
+        Args:
+            post_id (str, optional): The ID of the post.
+        """
+        if post_id is None:
+            self.conn.execute("DELETE FROM simhash_bands")
+        else:
+            self.remove_many([post_id])
+
+    def rebuild(self):
+        """
+        Rebuild the index from every post in the database.
+        """
+        self.remove()
+        self.add_many(self.conn.execute("SELECT id, content FROM posts").fetchall())
+
+    def nearest(self, post_id: str, fingerprint: int, state: int = None, max_distance: int = DUPLICATE_DISTANCE):
+        """
+        Find the closest other post within a Hamming distance of a fingerprint.
+
+        Args:
+            post_id (str): The ID of the post being checked, excluded from the results.
+            fingerprint (int): Its fingerprint.
+            state (int, optional): Only match posts in this render state.
+            max_distance (int): The maximum number of differing bits.
+
+        Returns:
+            tuple: (post_id, distance) of the closest match, or None.
+        """
+        clauses = " OR ".join("(b.band = ? AND b.value = ?)" for _ in range(FINGERPRINT_BANDS))
+        params = [item for band in bands(fingerprint) for item in band] + [post_id]
+        state_clause = ""
+        if state is not None:
+            state_clause = "AND p.video_made = ?"
+            params.append(state)
+        rows = self.conn.execute(
+            f"""SELECT DISTINCT p.id, p.simhash FROM simhash_bands b JOIN posts p ON p.id = b.post_id
+                WHERE ({clauses}) AND p.id != ? {state_clause}""", params)
+
+        best = None
+        for candidate_id, candidate in rows:
+            distance = hamming_distance(fingerprint, candidate)
+            if distance <= max_distance and (best is None or distance < best[1]):
+                best = (candidate_id, distance)
+        return best
@@ -0,0 +1,313 @@
+from tqdm import tqdm  # Provides a progress bar to show the progress of iterative tasks.
+from tiktokvoice import tts, get_duration, merge_audio_files  # Functions for creating and manipulating audio files.
+from srt import gen_srt_file  # Library for working with SubRip (SRT) subtitle files.
+from editor import VideoEditor  # Custom module for video editing tasks.
+from pipeline import Pipeline  # Custom module for overlapping the stages of several videos.
+from mockup import MockupRenderer  # Custom module for drawing the Reddit post mockup.
+from avatars import AvatarCache  # Custom module for caching profile pictures.
+from duration import background_durations, choose_background, TTS_VOICE, TTS_SPEED, SENTENCE_GAP  # Custom module for predicting the length of the voice over.
+import shutil  # Used to remove video workspaces.
+import time  # Provides various time-related functions.
+import os  # Provides functions for interacting with the operating system.
+import sys  # Provides access to some variables used or maintained by the Python interpreter and to functions that interact strongly with the interpreter.
+
+# Every video is generated in its own workspace directory below this one
+WORKSPACE_ROOT = "temp"
+# Threads of the prepare (background and avatar download), audio (TTS and merge) and render (mockup and video) stages
+STAGE_WORKERS = (1, 2, 1)
+# Seconds the workspace of a video that never finished is kept for a retry to resume from
+WORKSPACE_TTL = 3 * 24 * 60 * 60
+
+
+def collect_workspaces(ttl: float = WORKSPACE_TTL, active=(), root: str = WORKSPACE_ROOT):
+    """
+    Remove the workspaces of videos that have not been touched for longer than the TTL.
+
+    Workspaces of failed videos are kept so a retry can resume from their checkpoints,
+    this removes the ones no retry came back for.
+
+    Args:
+        ttl (float): Seconds since the last change before a workspace is removed.
+        active (iterable): Post IDs whose workspaces are in use and must be kept.
+        root (str): The folder holding the workspaces.
+
+    Returns:
+        int: The number of workspaces removed.
+    """
+    active = set(active)
+    removed = 0
+    cutoff = time.time() - ttl
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if name in active or not os.path.isdir(path):
+            continue
+        # A workspace changes whenever a stage writes to it
+        if max([os.path.getmtime(path)] + [os.path.getmtime(os.path.join(path, f)) for f in os.listdir(path)]) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+class VideoGenerator:
+    def __init__(self, output_dir: str = "outputs"):
+        """
+        Initialize the VideoGenerator object, which turns post details into a video.
+
+        Generation is split into the prepare, audio and render stages, each taking and
+        returning a task dict, so they can run one after another or overlap across posts in
+        a Pipeline. Nothing here touches Reddit or the database, the post details are
+        passed in with the task.
+
+        Every stage records a checkpoint in the task's "checkpoints" dict with the paths of
+        the artifacts it left in the workspace. A stage whose checkpoint is passed in with
+        the task and whose artifacts still exist is skipped, so a retry resumes from the
+        first incomplete stage. The workspace is only removed by cleanup, once the video is
+        safely stored, or by collect_workspaces after the TTL.
+
+        Args:
+            output_dir (str): The folder finished videos are written to, None keeps them in the workspace.
+        """
+        self.output_dir = output_dir
+        # Mockup renderer, decoded lazily on first use and kept for every post afterwards
+        self.__mockup = None
+        # Avatar cache, created lazily on first use
+        self.__avatars = None
+
+    @property
+    def mockup(self):
+        """
+        The shared MockupRenderer holding the decoded template layers and fonts.
+        """
+        if self.__mockup is None:
+            self.__mockup = MockupRenderer()
+        return self.__mockup
+
+    @property
+    def avatars(self):
+        """
+        The shared AvatarCache holding downloaded and fitted profile pictures.
+        """
+        if self.__avatars is None:
+            self.__avatars = AvatarCache()
+        return self.__avatars
+
+    def generate(self, post: dict, background: str = None):
+        """
+        Generate the video of a post, running every stage in turn.
+
+        Args:
+            post (dict): The post details, see RedditAPI.get_from_url.
+            background (str, optional): The file name of the background video, chosen at random if not given.
+
+        Returns:
+            dict: The finished task, with the path of the video in "output_path".
+        """
+        task = {"post": post, "background": background}
+        for stage in (self.prepare, self.synthesize_audio, self.render):
+            task = stage(task)
+        self.cleanup(task)
+        return task
+
+    def pipeline(self, stage_workers: tuple = STAGE_WORKERS, on_checkpoint=None):
+        """
+        Build a Pipeline of the prepare, audio and render stages.
+
+        Every stage records its duration in the task's "timings" dict, so the timings of a
+        single video can be reported alongside the totals kept by the pipeline.
+
+        Args:
+            stage_workers (tuple): The number of threads of the prepare, audio and render stages.
+            on_checkpoint (callable, optional): Called with the task, stage name and artifacts whenever a stage records a new checkpoint.
+
+        Returns:
+            Pipeline: The pipeline, run it with tasks holding the post details in "post" and optionally the stored "checkpoints".
+        """
+        prepare_workers, audio_workers, render_workers = stage_workers
+        return Pipeline([("prepare", self.__tracked("prepare", self.prepare, on_checkpoint), prepare_workers),
+                         ("audio", self.__tracked("audio", self.synthesize_audio, on_checkpoint), audio_workers),
+                         ("render", self.__tracked("render", self.render, on_checkpoint), render_workers)])
+
+    @staticmethod
+    def __tracked(name: str, stage, on_checkpoint):
+        def run(task):
+            start = time.perf_counter()
+            before = task.get("checkpoints", {}).get(name)
+            try:
+                task = stage(task)
+            finally:
+                task.setdefault("timings", {})[name] = round(time.perf_counter() - start, 3)
+            after = task["checkpoints"].get(name)
+            if on_checkpoint and after is not before:
+                on_checkpoint(task, name, after)
+            return task
+        return run
+
+    @staticmethod
+    def __resume(task: dict, stage: str, *paths: str):
+        """
+        Get the checkpoint of a stage if every artifact it names still exists.
+        """
+        checkpoint = task.setdefault("checkpoints", {}).get(stage)
+        if checkpoint and all(checkpoint.get(path) and os.path.exists(checkpoint[path]) for path in paths):
+            return checkpoint
+        return None
+
+    def cleanup(self, task: dict):
+        """
+        Remove the workspace of a video once it is safely stored, other videos may still be using theirs.
+
+        Args:
+            task (dict): The finished video task.
+        """
+        workspace = task.get("workspace")
+        if not workspace:
+            return
+        try:
+            shutil.rmtree(workspace)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error occurred while deleting {workspace}: {str(e)}")
+            print("\n") # Used so the progress bar wont clear the error
+
+    def prepare(self, task: dict):
+        """
+        First stage of a video: choose the background and start downloading the profile picture.
+
+        The mockup is only drawn in the render stage, so the download overlaps the voice over
+        instead of holding up this stage.
+
+        Args:
+            task (dict): The video task, with the post details and optionally the "background" chosen when it was queued.
+
+        Returns:
+            dict: The task with the workspace and editor added.
+        """
+        post = task["post"]
+
+        # Print to termninal what content we are generating
+        print("\n \033[1m(#)\033[0m Generating video content for, " + post["username"] + " - " + post["title"] + " - " + post["date_posted"])
+
+        # Every file of this video is kept in its own workspace, so several videos can be generated at once
+        task["workspace"] = os.path.join(WORKSPACE_ROOT, post["id"])
+        os.makedirs(task["workspace"], exist_ok=True)
+
+        # Start fetching the profile picture, it downloads while the voice over is synthesized
+        self.avatars.prefetch(post["profile_picture_url"])
+
+        checkpoint = task.setdefault("checkpoints", {}).get("prepare")
+        if checkpoint and os.path.exists(os.path.join("inputs", checkpoint["background"])):
+            # Resume with the background of the previous attempt
+            task["editor"] = VideoEditor(None, None, None, background=checkpoint["background"])
+            return task
+
+        # Use the background chosen when the post was admitted, the audio is attached once it has been synthesized
+        background = task.get("background")
+        if background and not os.path.exists(os.path.join("inputs", background)):
+            background = None
+        task["editor"] = v = VideoEditor(None, None, None, background=background)
+        task["checkpoints"]["prepare"] = {"background": v.bg_path}
+        return task
+
+    def synthesize_audio(self, task: dict):
+        """
+        Second stage of a video: synthesize the voice over, write the subtitles and merge the audio.
+
+        Args:
+            task (dict): The video task from the first stage.
+
+        Returns:
+            dict: The task with the SRT and WAV attached to its editor.
+        """
+        post = task["post"]
+        workspace = task["workspace"]
+        v = task["editor"]
+
+        checkpoint = self.__resume(task, "audio", "srt", "wav")
+        if checkpoint:
+            # Resume with the voice over and subtitles of the previous attempt
+            v.clip_duration = checkpoint["duration"]
+            v.srt_path = checkpoint["srt"]
+            v.wav_path = checkpoint["wav"]
+            return task
+
+        # Create the audio files for each sentence using the script
+        script = []
+        content = [post["title"]] + post["content"]
+
+        # Every mp3 in the workspace is merged, drop the sentences of an earlier attempt at a longer version
+        prefix = f"temp_{post['id']}_"
+        for name in os.listdir(workspace):
+            if name.startswith(prefix) and name.endswith(".mp3"):
+                os.remove(os.path.join(workspace, name))
+
+        # TTS for Voice over
+        with tqdm(total=len(content), desc="Generating TTS", unit="file") as pbar:
+            for item, i in zip(content, range(len(content))):
+                filename = os.path.join(workspace, f"temp_{post['id']}_{i}.mp3")
+                tts(item, TTS_VOICE, filename, TTS_SPEED)
+                dur = get_duration(filename)
+                script.append((item, dur))
+                pbar.update(1)
+
+        # Clearing the progress bar from the terminal
+        sys.stdout.write("\033[F")  # Move cursor up one line
+        sys.stdout.write("\033[K")  # Clear line
+
+
+        # Create the srt using the script
+        srt_path = os.path.join(workspace, f"{post['id']}.srt")
+        gen_srt_file(script, srt_path, SENTENCE_GAP)
+
+        # Merge the audio files into one
+        wav_path = os.path.join(workspace, f"{post['id']}.wav")
+        totaldur = merge_audio_files(wav_path, SENTENCE_GAP, workspace)
+
+        v.clip_duration = totaldur
+        v.srt_path = srt_path
+        v.wav_path = wav_path
+        # The length of every sentence is kept to train the duration estimator
+        task["checkpoints"]["audio"] = {"srt": srt_path, "wav": wav_path, "duration": totaldur, "voice": TTS_VOICE,
+                                        "speed": TTS_SPEED, "script": [[len(item), dur] for item, dur in script]}
+        return task
+
+    def render(self, task: dict):
+        """
+        Last stage of a video: draw the mockup and render the video to the output folder.
+
+        The workspace is kept until cleanup is called, so a video that fails to be stored
+        afterwards can still be resumed.
+
+        Args:
+            task (dict): The video task from the second stage.
+
+        Returns:
+            dict: The task with the path of the video in "output_path".
+        """
+        checkpoint = self.__resume(task, "render", "output")
+        if checkpoint:
+            # The video was rendered by the previous attempt, only storing it failed
+            task["output_path"] = checkpoint["output"]
+            return task
+
+        post = task["post"]
+        v = task["editor"]
+
+        # The estimate the background was chosen by can fall short, switch to one that fits before rendering
+        if v.background_video.duration < v.clip_duration:
+            background = choose_background(v.clip_duration, background_durations())
+            if background:
+                print(f"\033[1m(#)\033[0m Background {v.bg_path} is shorter than the {v.clip_duration:.1f}s voice over, using {background} instead.\n")
+                v = task["editor"] = VideoEditor(v.clip_duration, v.srt_path, v.wav_path, background=background)
+
+        # Draw the mockup directly at the background width and hand it to the editor in memory
+        bg_width = v.background_video.size[0]
+        profile_pic = self.avatars.fitted(post["profile_picture_url"], self.mockup, bg_width)
+        v.image = self.mockup.render(post, bg_width, profile_pic, fitted=True)
+
+        # Create the video
+        video_title = str(post["username"] + " - " + post["title"] + " - " + post["date_posted"])
+        task["output_path"] = os.path.join(self.output_dir or task["workspace"], f"{video_title}.mp4")
+        v.start_render(task["output_path"])
+        task["checkpoints"]["render"] = {"output": task["output_path"]}
+        return task
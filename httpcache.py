@@ -0,0 +1,272 @@
+from requests.structures import CaseInsensitiveDict  # Used for the headers of cached responses.
+from ratelimit import BudgetedAdapter, BudgetedRequestor  # Custom module for sharing Reddit's rate limit.
+from urllib.parse import urlsplit  # Used to match request paths to their cache lifetime.
+import prawcore  # Low level PRAW networking, used to report replay misses the way PRAW expects.
+import requests  # Used for making HTTP requests, typically for API interactions.
+import threading  # Provides support for threading.
+import hashlib  # Used to derive fixture file names from requests.
+import base64  # Used to store binary response bodies in the fixture files.
+import json  # Used to read and write the fixture files.
+import time  # Provides various time-related functions.
+import re  # Provides support for regular expressions (regex).
+import os  # Provides functions for interacting with the operating system.
+
+# Cache modes:
+# - off: every request goes to the network.
+# - cache: responses are reused until their endpoint's lifetime runs out.
+# - record: every request goes to the network and every response is written to a fixture file.
+# - replay: responses are only read from the fixture files, nothing goes to the network.
+CACHE_MODES = ("off", "cache", "record", "replay")
+DEFAULT_CACHE_DIR = "cache/http"
+
+# Seconds a response is reused in cache mode, matched against the request path in order.
+# Anything unmatched, including tokens and avatars (which have their own cache), is never reused.
+ENDPOINT_TTLS = [
+    (re.compile(r"^/api/v1/access_token"), 0),
+    (re.compile(r"^/api/user_data_by_account_ids"), 24 * 60 * 60),
+    (re.compile(r"^/api/info"), 5 * 60),
+    (re.compile(r"/comments/"), 10 * 60),
+    (re.compile(r"^/r/[^/]+/(top|new|hot|rising|controversial)"), 5 * 60),
+    (re.compile(r"^/user/[^/]+/(submitted|about)"), 5 * 60),
+]
+
+# Headers that describe the original transfer or the rate limit at the time, never replayed
+UNCACHED_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "set-cookie",
+                    "x-ratelimit-remaining", "x-ratelimit-reset", "x-ratelimit-used"}
+
+
+class CacheMiss(requests.ConnectionError):
+    """
+    Raised in replay mode when a request has no recorded response.
+    """
+
+
+def endpoint_ttl(url: str):
+    """
+    Get the number of seconds a response from a URL may be reused.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        int: The lifetime of the response, 0 if it is never reused.
+    """
+    path = urlsplit(url).path
+    for pattern, ttl in ENDPOINT_TTLS:
+        if pattern.search(path):
+            return ttl
+    return 0
+
+
+class ResponseCache:
+    def __init__(self, mode: str = "off", directory: str = DEFAULT_CACHE_DIR):
+        """
+        Initialize the ResponseCache object, an HTTP response cache shared by every Reddit client.
+
+        Responses are keyed by method and full URL and stored as one JSON fixture file each,
+        so a recorded run can be replayed later without any network access.
+
+        Args:
+            mode (str): One of CACHE_MODES.
+            directory (str): The directory the fixture files are stored in.
+
+        Attributes:
+            hits (int): The number of requests answered from the cache.
+            misses (int): The number of requests sent to the network.
+        """
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        self.configure(mode, directory)
+
+    def configure(self, mode: str, directory: str = None):
+        """
+        Change the cache mode and fixture directory.
+
+        Args:
+            mode (str): One of CACHE_MODES.
+            directory (str, optional): The directory the fixture files are stored in.
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'.")
+        with self.__lock:
+            self.mode = mode
+            if directory:
+                self.directory = directory
+                self.__entries = {}
+        if mode != "off":
+            os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(method: str, url: str, params=None):
+        """
+        Build the cache key of a request.
+
+        Args:
+            method (str): The HTTP method.
+            url (str): The request URL.
+            params (dict, optional): Query parameters not yet encoded into the URL.
+
+        Returns:
+            str: The method and fully encoded URL.
+        """
+        if params:
+            url = requests.Request(method, url, params=params).prepare().url
+        return f"{method.upper()} {url}"
+
+    def __path(self, key: str):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def __load(self, key: str):
+        with self.__lock:
+            if key in self.__entries:
+                return self.__entries[key]
+        try:
+            with open(self.__path(key), "r") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        with self.__lock:
+            self.__entries[key] = entry
+        return entry
+
+    def lookup(self, key: str, url: str):
+        """
+        Get the cached response for a request, if the current mode allows it to be reused.
+
+        Args:
+            key (str): The cache key of the request.
+            url (str): The request URL.
+
+        Returns:
+            requests.Response: The cached response, or None if the request must go to the network.
+
+        Raises:
+            CacheMiss: In replay mode, if the request was never recorded.
+        """
+        if self.mode in ("off", "record"):
+            return None
+        entry = self.__load(key)
+        if self.mode == "replay":
+            if entry is None:
+                raise CacheMiss(f"No recorded response for {key}")
+        elif entry is None or time.time() - entry["stored_at"] >= endpoint_ttl(url):
+            with self.__lock:
+                self.misses += 1
+            return None
+        with self.__lock:
+            self.hits += 1
+        return self.__response(entry)
+
+    def store(self, key: str, response):
+        """
+        Store a response if the current mode keeps it.
+
+        Args:
+            key (str): The cache key of the request.
+            response (requests.Response): The response received from the network.
+        """
+        if self.mode == "off" or (self.mode == "cache" and (response.status_code != 200 or not endpoint_ttl(response.url))):
+            return
+        body = response.content
+        try:
+            body, encoding = body.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(body).decode("ascii"), "base64"
+        entry = {
+            "key": key,
+            "url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {name: value for name, value in response.headers.items() if name.lower() not in UNCACHED_HEADERS},
+            "body": body,
+            "encoding": encoding,
+            "stored_at": time.time(),
+        }
+        path = self.__path(key)
+        # Thread idents repeat across the worker processes started by -w, the pid keeps the name unique
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self.__lock:
+            self.__entries[key] = entry
+
+    @staticmethod
+    def __response(entry: dict):
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.url = entry["url"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = "utf-8"
+        if entry["encoding"] == "base64":
+            response._content = base64.b64decode(entry["body"])
+        else:
+            response._content = entry["body"].encode("utf-8")
+        return response
+
+    def __str__(self):
+        return f"{self.hits} cached responses used, {self.misses} fetched ({self.mode} mode)"
+
+
+class CachingRequestor(BudgetedRequestor):
+    def __init__(self, *args, cache: ResponseCache = None, **kwargs):
+        """
+        Initialize the CachingRequestor object, a PRAW requestor that answers from the response
+        cache before spending any of the request budget.
+
+        Pass it to praw.Reddit with requestor_class and requestor_kwargs={"budget": budget, "cache": cache}.
+
+        Args:
+            cache (ResponseCache): The shared response cache.
+        """
+        super().__init__(*args, **kwargs)
+        self.cache = cache or shared_cache
+
+    def request(self, *args, **kwargs):
+        method = kwargs.get("method", args[0] if args else "GET")
+        url = kwargs.get("url", args[1] if len(args) > 1 else "")
+        key = self.cache.key(method, url, kwargs.get("params"))
+        try:
+            response = self.cache.lookup(key, url)
+        except CacheMiss as e:
+            # PRAW expects network failures wrapped in its own exception
+            raise prawcore.exceptions.RequestException(e, args, kwargs)
+        if response is not None:
+            return response
+        response = super().request(*args, **kwargs)
+        self.cache.store(key, response)
+        return response
+
+
+class CachingAdapter(BudgetedAdapter):
+    def __init__(self, *args, cache: ResponseCache = None, **kwargs):
+        """
+        Initialize the CachingAdapter object, a requests adapter that answers from the response
+        cache before spending any of the request budget.
+
+        Mount it on a requests.Session for "https://".
+
+        Args:
+            cache (ResponseCache): The shared response cache.
+        """
+        super().__init__(*args, **kwargs)
+        self.cache = cache or shared_cache
+
+    def send(self, request, **kwargs):
+        key = self.cache.key(request.method, request.url)
+        response = self.cache.lookup(key, request.url)
+        if response is not None:
+            response.request = request
+            response.connection = self
+            return response
+        response = super().send(request, **kwargs)
+        if not kwargs.get("stream"):
+            self.cache.store(key, response)
+        return response
+
+
+# The cache shared by every Reddit client in the process, configured from the command line
+shared_cache = ResponseCache()
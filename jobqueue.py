@@ -0,0 +1,407 @@
+import threading  # Provides support for threading.
+from database import VIDEO_FAILED  # Custom module for the render states of posts.
+import socket  # Used to name the workers holding leases.
+import math  # Used to weigh scores on a log scale.
+import json  # Used to store the stage timings of a job.
+import time  # Provides various time-related functions.
+import os  # Used to name the workers holding leases.
+
+# Job statuses, only queued and leased jobs are active
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_DEAD = "dead"
+
+# Seconds a worker holds a job without sending a heartbeat before it is reclaimed
+LEASE_SECONDS = 10 * 60
+# Attempts before a job is dead-lettered
+MAX_ATTEMPTS = 4
+# Delay before the first retry, doubled on every later attempt up to MAX_BACKOFF
+BASE_BACKOFF = 60
+MAX_BACKOFF = 6 * 60 * 60
+# Priority lost per day of post age, so fresh stories go before old ones with a similar score
+FRESHNESS_WEIGHT = 0.5
+
+# Columns returned for a claimed job
+_JOB_COLUMNS = "id, post_id, url, stage, priority, attempts, max_attempts, lease_owner, lease_expires, checkpoints, background, version_hash"
+
+
+def job_priority(likes: int, created_utc: float, now: float = None):
+    """
+    Compute the priority of a render job, higher runs first.
+
+    Args:
+        likes (int): The score of the post.
+        created_utc (float): When the post was created.
+        now (float, optional): The current UNIX time.
+
+    Returns:
+        float: The log of the score minus a penalty for the age of the post.
+    """
+    now = now or time.time()
+    age_days = max(now - (created_utc or now), 0) / (24 * 60 * 60)
+    return math.log10(max(likes or 0, 0) + 1) - age_days * FRESHNESS_WEIGHT
+
+
+def backoff(attempts: int):
+    """
+    Get the delay before retrying a job that has failed a number of times.
+
+    Args:
+        attempts (int): The number of attempts made so far.
+
+    Returns:
+        float: Seconds to wait before the job may be claimed again.
+    """
+    return min(BASE_BACKOFF * 2 ** max(attempts - 1, 0), MAX_BACKOFF)
+
+
+def worker_name():
+    """
+    Get a name identifying the current worker thread across hosts and processes.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class JobQueue:
+    def __init__(self, database, lease_seconds: int = LEASE_SECONDS, max_attempts: int = MAX_ATTEMPTS):
+        """
+        Initialize the JobQueue object, a durable render queue stored in the 'jobs' table.
+
+        Workers claim the highest priority job with a lease and extend it with heartbeats.
+        Jobs whose lease runs out, because their worker crashed or hung, are reclaimed by the
+        next claim. Failed jobs are retried with exponential backoff and dead-lettered once
+        they run out of attempts. Claims are single UPDATE statements, so any number of
+        threads and processes can drain the queue at once.
+
+        Args:
+            database (ConnectionPool): The pool the calling thread's connection is taken from.
+            lease_seconds (int): Seconds a job is held without a heartbeat.
+            max_attempts (int): Attempts before a job is dead-lettered.
+        """
+        self.database = database
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def enqueue(self, state: int, now: float = None, admit=None):
+        """
+        Queue a job for every post in a render state that has no active job.
+
+        Args:
+            state (int): The posts.video_made state to queue, such as VIDEO_PENDING.
+            now (float, optional): The current UNIX time.
+            admit (callable, optional): Called with the candidate post IDs, returns a mapping of the
+                admitted ones to their chosen background (or None). Posts left out are not queued.
+
+        Returns:
+            int: The number of jobs queued.
+        """
+        now = now or time.time()
+        conn = self.database.connection()
+        rows = conn.execute(
+            """SELECT p.id, p.url, p.likes, p.created_utc FROM posts p
+               WHERE p.video_made = ? AND NOT EXISTS (
+                   SELECT 1 FROM jobs j WHERE j.post_id = p.id AND j.status IN (?, ?))""",
+            (state, JOB_QUEUED, JOB_LEASED)).fetchall()
+        backgrounds = admit([row.id for row in rows]) if admit and rows else {}
+        if admit:
+            rows = [row for row in rows if row.id in backgrounds]
+        with conn:
+            conn.executemany(
+                """INSERT OR IGNORE INTO jobs (post_id, url, priority, status, attempts, max_attempts, available_at, created_at, updated_at, background)
+                   VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?, ?)""",
+                [(post_id, url, job_priority(likes, created_utc, now), JOB_QUEUED, self.max_attempts, now, now, now,
+                  backgrounds.get(post_id)) for post_id, url, likes, created_utc in rows])
+        return len(rows)
+
+    def claim(self, owner: str = None, now: float = None):
+        """
+        Lease the highest priority job that is available, reclaiming expired leases first.
+
+        The job records the post's current version_hash, the content it is about to render.
+
+        Args:
+            owner (str, optional): The name of the claiming worker, defaults to worker_name().
+            now (float, optional): The current UNIX time.
+
+        Returns:
+            Row: The claimed job, or None if no job is available.
+        """
+        owner = owner or worker_name()
+        now = now or time.time()
+        conn = self.database.connection()
+        with conn:
+            self.__reclaim(conn, now)
+            claimed = conn.execute(
+                f"""UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, heartbeat_at = ?,
+                        attempts = attempts + 1, updated_at = ?,
+                        version_hash = (SELECT version_hash FROM posts WHERE posts.id = jobs.post_id)
+                    WHERE id = (SELECT id FROM jobs WHERE status = ? AND available_at <= ?
+                                ORDER BY priority DESC, id LIMIT 1)
+                    RETURNING {_JOB_COLUMNS}""",
+                (JOB_LEASED, owner, now + self.lease_seconds, now, now, JOB_QUEUED, now)).fetchall()
+        return claimed[0] if claimed else None
+
+    def __reclaim(self, conn, now: float):
+        """
+        Return jobs with expired leases to the queue, or dead-letter them if they are out of attempts.
+
+        Posts of dead-lettered jobs are marked VIDEO_FAILED, so enqueue does not give a post
+        that keeps crashing its worker a fresh set of attempts.
+        """
+        reclaimed = conn.execute(
+            """UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END,
+                   last_error = 'Lease expired on ' || lease_owner, lease_owner = NULL, lease_expires = NULL,
+                   available_at = ?, updated_at = ?, finished_at = CASE WHEN attempts >= max_attempts THEN ? END
+               WHERE status = ? AND lease_expires < ?
+               RETURNING post_id, status""",
+            (JOB_DEAD, JOB_QUEUED, now, now, now, JOB_LEASED, now)).fetchall()
+        dead = [(VIDEO_FAILED, int(now), row.post_id) for row in reclaimed if row.status == JOB_DEAD]
+        if dead:
+            conn.executemany("UPDATE posts SET video_made = ?, state_updated_at = ? WHERE id = ?", dead)
+
+    def heartbeat(self, job_id: int, owner: str, stage: str = None):
+        """
+        Extend the lease of a job and record the stage it has reached.
+
+        Args:
+            job_id (int): The ID of the job.
+            owner (str): The name of the worker holding the lease.
+            stage (str, optional): The stage the job has reached.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET lease_expires = ?, heartbeat_at = ?, updated_at = ?, stage = COALESCE(?, stage)
+                   WHERE id = ? AND lease_owner = ? AND status = ?""",
+                (now + self.lease_seconds, now, now, stage, job_id, owner, JOB_LEASED))
+        return cursor.rowcount > 0
+
+    def checkpoint(self, job_id: int, owner: str, stage: str, artifacts: dict):
+        """
+        Record that a job completed a stage, with the artifacts a retry can resume from.
+
+        Args:
+            job_id (int): The ID of the job.
+            owner (str): The name of the worker holding the lease.
+            stage (str): The completed stage.
+            artifacts (dict): The paths and values the stage produced.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET checkpoints = json_set(COALESCE(checkpoints, '{}'), '$.' || ?, json(?)), updated_at = ?
+                   WHERE id = ? AND lease_owner = ? AND status = ?""",
+                (stage, json.dumps(artifacts), now, job_id, owner, JOB_LEASED))
+        return cursor.rowcount > 0
+
+    def keep_alive(self, job, owner: str, interval: float = None):
+        """
+        Get a context manager that sends heartbeats for a job from a background thread.
+
+        Usage:
+            with queue.keep_alive(job, owner):
+                ...
+
+        Args:
+            job (Row): The claimed job.
+            owner (str): The name of the worker holding the lease.
+            interval (float, optional): Seconds between heartbeats, a third of the lease by default.
+
+        Returns:
+            KeepAlive: The context manager.
+        """
+        return KeepAlive(self, job.id, owner, interval or self.lease_seconds / 3)
+
+    def get(self, job_id: int):
+        """
+        Get a job by its ID.
+
+        Args:
+            job_id (int): The ID of the job.
+
+        Returns:
+            Row: The job, or None if it does not exist.
+        """
+        return self.database.connection().execute(
+            f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def complete(self, job_id: int, owner: str, timings: dict = None, output_path: str = None):
+        """
+        Mark a job as done.
+
+        Args:
+            job_id (int): The ID of the job.
+            owner (str): The name of the worker holding the lease.
+            timings (dict, optional): Seconds spent in each stage.
+            output_path (str, optional): Where the finished video was stored.
+
+        Returns:
+            bool: False if the lease was lost to another worker, the job is left alone.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            cursor = conn.execute(
+                """UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, finished_at = ?, updated_at = ?,
+                       timings = COALESCE(?, timings), output_path = COALESCE(?, output_path)
+                   WHERE id = ? AND lease_owner = ? AND status = ?""",
+                (JOB_DONE, now, now, json.dumps(timings) if timings else None, output_path, job_id, owner, JOB_LEASED))
+        return cursor.rowcount > 0
+
+    def fail(self, job_id: int, error: str, timings: dict = None, owner: str = None):
+        """
+        Record a failed attempt, scheduling a retry with backoff or dead-lettering the job.
+
+        Args:
+            job_id (int): The ID of the job.
+            error (str): The error of the failed attempt.
+            timings (dict, optional): Seconds spent in each stage that ran.
+            owner (str, optional): The name of the worker reporting the failure, ignored if it no longer holds the lease.
+
+        Returns:
+            bool: True if the job was dead-lettered.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            row = conn.execute("SELECT attempts, max_attempts, status, lease_owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or (owner is not None and (row.status != JOB_LEASED or row.lease_owner != owner)):
+                return False
+            dead = row.attempts >= row.max_attempts
+            conn.execute(
+                """UPDATE jobs SET status = ?, last_error = ?, lease_owner = NULL, lease_expires = NULL,
+                       available_at = ?, updated_at = ?, finished_at = ?, timings = COALESCE(?, timings)
+                   WHERE id = ?""",
+                (JOB_DEAD if dead else JOB_QUEUED, error, now + (0 if dead else backoff(row.attempts)), now,
+                 now if dead else None, json.dumps(timings) if timings else None, job_id))
+        return dead
+
+    def requeue_dead(self):
+        """
+        Give every dead-lettered job a fresh set of attempts.
+
+        Returns:
+            int: The number of jobs queued again.
+        """
+        now = time.time()
+        conn = self.database.connection()
+        with conn:
+            # Dead jobs of posts that already have an active job are left alone
+            cursor = conn.execute(
+                """UPDATE OR IGNORE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ?, finished_at = NULL
+                   WHERE status = ?""", (JOB_QUEUED, now, now, JOB_DEAD))
+        return cursor.rowcount
+
+    def remove(self, post_id: str = None):
+        """
+        Remove the jobs of a post, or every job if no ID is given. Must be called inside the transaction that removes the posts.
+
+        Args:
+            post_id (str, optional): The ID of the post.
+        """
+        conn = self.database.connection()
+        if post_id is None:
+            conn.execute("DELETE FROM jobs")
+        else:
+            conn.execute("DELETE FROM jobs WHERE post_id = ?", (post_id,))
+
+    def leased(self):
+        """
+        Get the post IDs of the jobs currently held by a worker.
+
+        Returns:
+            list: The post IDs.
+        """
+        return [row.post_id for row in self.database.connection().execute(
+            "SELECT post_id FROM jobs WHERE status = ?", (JOB_LEASED,))]
+
+    def available(self, now: float = None):
+        """
+        Get the post IDs of the jobs that can be claimed now, highest priority first.
+
+        Args:
+            now (float, optional): The current UNIX time.
+
+        Returns:
+            list: The post IDs.
+        """
+        now = now or time.time()
+        return [row.post_id for row in self.database.connection().execute(
+            "SELECT post_id FROM jobs WHERE status = ? AND available_at <= ? ORDER BY priority DESC, id",
+            (JOB_QUEUED, now))]
+
+    def counts(self):
+        """
+        Count the jobs in every status.
+
+        Returns:
+            dict: A mapping of status to the number of jobs.
+        """
+        return dict(self.database.connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class KeepAlive:
+    def __init__(self, queue, job_id: int, owner: str, interval: float):
+        """
+        Initialize the KeepAlive object, which extends the lease of a job from a background thread.
+
+        Args:
+            queue (JobQueue): The queue holding the job, or any object with the same heartbeat method.
+            job_id (int): The ID of the job.
+            owner (str): The name of the worker holding the lease.
+            interval (float): Seconds between heartbeats.
+        """
+        self.queue = queue
+        self.job_id = job_id
+        self.owner = owner
+        self.interval = interval
+        self.stage = None
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def __run(self):
+        while not self.__stop.wait(self.interval):
+            if not self.queue.heartbeat(self.job_id, self.owner, self.stage):
+                print(f"\033[31m\033[1m(#)\033[0m Lost the lease on job {self.job_id}, another worker may pick it up.\n")
+                return
+
+    def set_stage(self, stage: str):
+        """
+        Record the stage the job has reached with an immediate heartbeat.
+
+        Args:
+            stage (str): The stage name.
+        """
+        self.stage = stage
+        self.queue.heartbeat(self.job_id, self.owner, stage)
+
+    def start(self):
+        """
+        Start sending heartbeats, for jobs that are handed between threads instead of run in a with block.
+        """
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop sending heartbeats.
+        """
+        self.__stop.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -15,6 +15,18 @@ import os  # Provides functions for interacting with the operating system.
 import sys  # Provides access to some variables used or maintained by the Python interpreter and to functions that interact strongly with the interpreter.
 import time  # Provides various time-related functions.
 from tabulate import tabulate # Provides utilities to create tables in the terminal space
+from httpcache import shared_cache, CACHE_MODES, DEFAULT_CACHE_DIR  # Custom module for caching and recording Reddit responses.
+from scheduler import Scheduler  # Custom module for running the auto mode tasks on their own cadences.
+from farm import Coordinator, run_workers, FARM_PORT  # Custom module for spreading renders over several machines.
+from duration import PLATFORM_LIMIT  # Custom module for predicting the length of the voice over.
+
+# Auto mode tasks as name: (minutes between runs, jitter as a fraction of the interval)
+AUTO_SCHEDULE = {
+    "discovery": (30, 0.1),  # Search subreddits for new popular posts
+    "scores": (6 * 60, 0.1),  # Refresh the scores of known posts
+    "updates": (60, 0.2),  # Check authors for update posts
+    "render": (10, 0.0),  # Generate videos for queued posts
+}
 
 # Clear_terminal Function
 def clear_terminal():
@@ -51,8 +63,50 @@ if __name__ == "__main__":
         print("\033[31m\033[1m(#)\033[0m ffmpeg is not installed. Please install ffmpeg to continue.\n")
         exit(1)
 
-    # Check if the credentials file exists
-    if not os.path.exists("credentials.txt"):
+    # Define command-line arguments
+    parser = argparse.ArgumentParser(description='ShortFormGen: Reddit Short-Form Content Generator V2.2')
+    parser.add_argument('-a', '--Auto', action='store_true', help='Program will search for new content, check for updates, refresh scores and generate videos, each on its own schedule (see -ev and -ji)')
+    parser.add_argument('-ev', '--Every', metavar=('<task>', '<minutes>'), nargs=2, action='append', default=[], help=f'Used with auto mode, minutes between runs of a task ({", ".join(f"{name} {minutes}" for name, (minutes, _) in AUTO_SCHEDULE.items())}), can be repeated')
+    parser.add_argument('-ji', '--Jitter', metavar=('<task>', '<fraction>'), nargs=2, action='append', default=[], help='Used with auto mode, fraction of the interval each run of a task is randomly moved by, can be repeated')
+    parser.add_argument('-cs', '--ContentSearch', action='store_true', help='Program will only attempt to find and store new content in database')
+    parser.add_argument('-ucs', '--UpdateContentSearch', action='store_true', help='Program will only attempt to find update content for videos already in the database, not new content')
+    parser.add_argument('-cc', '--CreateContent', action='store_true', help='Program will generate videos for entries stored in the database that dont have a pre-existing video generated')
+    parser.add_argument('-gv', '--GenerateVideo', metavar='<url/file>', nargs='+', help='Used to generate videos for the specified reddit posts, or for every url listed in a text file')
+    parser.add_argument('-dm', '--DiscoveryMode', choices=['top', 'new'], default='top', help='Listing used by content search: top posts in the time window since the last search, or new posts since the last search')
+    parser.add_argument('-rsc', '--RefreshScores', action='store_true', help='Refresh the scores of posts already stored in the database')
+    parser.add_argument('-re', '--RetryErrors', action='store_true', help='Used to retry generating video that previously encountered errors when proccessing')
+    parser.add_argument('-w', '--Workers', metavar='<N>', type=int, default=1, help='Number of videos generated at once in separate processes by -cc, -re and auto mode (default 1)')
+    parser.add_argument('-sw', '--StageWorkers', metavar=('<prepare>', '<audio>', '<render>'), type=int, nargs=3, default=[1, 2, 1], help='Threads of the prepare (background and profile picture download), audio (TTS and merge) and render (mockup and video) stages in every worker (default 1 2 1)')
+    parser.add_argument('-sp', '--SearchPosts', metavar='<keywords>', nargs='?', const='', help='Search the posts in the database, optionally for posts containing all of the keywords')
+    parser.add_argument('--MinLength', metavar='<chars>', type=int, help='Used with -sp, minimum post length in characters')
+    parser.add_argument('--MaxLength', metavar='<chars>', type=int, help='Used with -sp, maximum post length in characters')
+    parser.add_argument('--MinScore', metavar='<likes>', type=int, help='Used with -sp, minimum number of likes')
+    parser.add_argument('--Subreddit', metavar='<subreddit>', help='Used with -sp, only include posts from this subreddit')
+    parser.add_argument('--Pending', action='store_true', help='Used with -sp, only include posts without a video')
+    parser.add_argument('--Limit', metavar='<count>', type=int, default=20, help='Used with -sp, maximum number of posts listed (default 20)')
+    parser.add_argument('-cd', '--ClearDatabase', action='store_true', help='Clears all videos in the database')
+    parser.add_argument('-ce', '--ClearEntry', metavar='<post_id>', help='Clears entry submisison in the database')
+    parser.add_argument('-vs', '--ViewSubreddits', action='store_true', help='View subreddits that will be searched by content search.')
+    parser.add_argument('-as', '--AddSubreddit', metavar='<subreddit>', help='Add a subreddit that will be searched by content search.')
+    parser.add_argument('-rs', '--RemoveSubreddit', metavar='<subreddit>', help='Remove a subreddit that will be searched by content search.')
+    parser.add_argument('-vf', '--ViewFilter', action='store_true', help='Produces a list of words in the censored list')
+    parser.add_argument('-af', '--AddFilter', metavar='<word>', help='Adds word to censored list')
+    parser.add_argument('-rf', '--RemoveFilter', metavar='<word>', help='Removes word from censored list')
+    parser.add_argument('-pl', '--PlatformLimit', metavar='<seconds>', type=float, default=PLATFORM_LIMIT, help=f'Posts whose voice over is estimated to be longer than this are not queued for rendering, 0 for no limit (default {PLATFORM_LIMIT:g})')
+    parser.add_argument('-co', '--Coordinator', metavar='<host:port>', nargs='?', const=f'127.0.0.1:{FARM_PORT}', help=f'Serve the render queue to farm workers over HTTP, listening on 127.0.0.1:{FARM_PORT} unless another address is given')
+    parser.add_argument('-wk', '--Worker', metavar='<url>', help='Render jobs leased from the coordinator at this URL, use -w to run several workers on this machine')
+    parser.add_argument('-ls', '--LeaseSeconds', metavar='<seconds>', type=int, help='Used with -co, seconds a job is held without a heartbeat before it is handed to another worker')
+    parser.add_argument('-hc', '--HttpCache', choices=CACHE_MODES, default='off', help='Reuse recent Reddit responses (cache), write every response to fixture files (record) or run offline from recorded fixtures (replay)')
+    parser.add_argument('-hcd', '--HttpCacheDir', metavar='<directory>', default=DEFAULT_CACHE_DIR, help=f'Directory the cached responses and fixtures are stored in (default {DEFAULT_CACHE_DIR})')
+
+    # Parse command-line arguments
+    args = parser.parse_args()
+
+    # Configure the response cache shared by every Reddit client before any request is made
+    shared_cache.configure(args.HttpCache, args.HttpCacheDir)
+
+    # Check if the credentials file exists, farm workers never talk to Reddit themselves
+    if not os.path.exists("credentials.txt") and not args.Worker:
         # print("No credentials file found, going through the setup")
         setup_credentials()
 
@@ -74,6 +128,12 @@ if __name__ == "__main__":
         print("\033[31m\033[1m(#)\033[0m No input video files found in the inputs folder, Add your input video files to this folder.\n")
         exit(1)
 
+    # Worker mode renders jobs leased from a coordinator, without the credentials or the database
+    if args.Worker:
+        print(f"\033[1m(#)\033[0m Running as a farm worker of {args.Worker}, press Ctrl+C to stop.\n")
+        run_workers(args.Worker, args.Workers, tuple(args.StageWorkers))
+        exit(0)
+
     # Read the credentials from the file
     with open("credentials.txt", "r") as f:
         creds = f.readlines()
@@ -89,25 +149,8 @@ if __name__ == "__main__":
         print("\033[31m\033[1m(#)\033[0m Credentials not set correctly, delete credentials.txt and setup again.\n")
         exit(1)
 
-    # Define command-line arguments
-    parser = argparse.ArgumentParser(description='ShortFormGen: Reddit Short-Form Content Generator V2.2')
-    parser.add_argument('-a', '--Auto', action='store_true', help='Program will attempt to search for and generate new content every 30 minutes (can be changed in main.py)')
-    parser.add_argument('-cs', '--ContentSearch', action='store_true', help='Program will only attempt to find and store new content in database')
-    parser.add_argument('-ucs', '--UpdateContentSearch', action='store_true', help='Program will only attempt to find update content for videos already in the database, not new content')
-    parser.add_argument('-cc', '--CreateContent', action='store_true', help='Program will generate videos for entries stored in the database that dont have a pre-existing video generated')
-    parser.add_argument('-gv', '--GenerateVideo', metavar='<url>', help='Used to generate a video for a specified reddit post')
-    parser.add_argument('-re', '--RetryErrors', action='store_true', help='Used to retry generating video that previously encountered errors when proccessing')
-    parser.add_argument('-cd', '--ClearDatabase', action='store_true', help='Clears all videos in the database')
-    parser.add_argument('-ce', '--ClearEntry', metavar='<post_id>', help='Clears entry submisison in the database')
-    parser.add_argument('-vs', '--ViewSubreddits', action='store_true', help='View subreddits that will be searched by content search.')
-    parser.add_argument('-as', '--AddSubreddit', metavar='<subreddit>', help='Add a subreddit that will be searched by content search.')
-    parser.add_argument('-rs', '--RemoveSubreddit', metavar='<subreddit>', help='Remove a subreddit that will be searched by content search.')
-    parser.add_argument('-vf', '--ViewFilter', action='store_true', help='Produces a list of words in the censored list')
-    parser.add_argument('-af', '--AddFilter', metavar='<word>', help='Adds word to censored list')
-    parser.add_argument('-rf', '--RemoveFilter', metavar='<word>', help='Removes word from censored list')
-
-    # Parse command-line arguments
-    args = parser.parse_args()
+    # Posts estimated to be longer than the platform allows are not queued for rendering
+    reddit.platform_limit = args.PlatformLimit
 
     print("\033[1m \n", 
         "   ___ ___ ___  ___ ___ _____   ___  ___ ___   \n ", 
@@ -117,43 +160,44 @@ if __name__ == "__main__":
         "Reddit Short-Form Content Generator V2.2 \033[0m \n ")
         
     # If no run mode is provided, run the program in auto.
-    if not any([args.ContentSearch, args.UpdateContentSearch, args.CreateContent, args.GenerateVideo, args.RetryErrors, args.ClearDatabase, args.ClearEntry, args.ViewSubreddits, args.AddSubreddit, args.RemoveSubreddit, args.ViewFilter, args.AddFilter, args.RemoveFilter]):
+    if not any([args.ContentSearch, args.UpdateContentSearch, args.CreateContent, args.GenerateVideo, args.RefreshScores, args.RetryErrors, args.SearchPosts is not None, args.Coordinator, args.ClearDatabase, args.ClearEntry, args.ViewSubreddits, args.AddSubreddit, args.RemoveSubreddit, args.ViewFilter, args.AddFilter, args.RemoveFilter]):
         # Execute Auto mode logic if no specific options are provided
         print("\033[1m(#)\033[0m Running in Auto Mode, if this was a mistake run the program using '-h' or '--help' command-line argument.\n")
         # Auto mode logic
-        
-        # Define the duration of the interval in seconds (30 minutes)
-        interval_seconds = 30 * 60
 
-        while True:
-            # Record the start time
-            start_time = time.time()
-
-            # Auto Loop Code:
+        # Apply the intervals and jitter given on the command line
+        schedule = dict(AUTO_SCHEDULE)
+        for name, value in args.Every:
+            if name not in schedule:
+                parser.error(f"unknown auto mode task '{name}', choose from {', '.join(AUTO_SCHEDULE)}")
+            schedule[name] = (float(value), schedule[name][1])
+        for name, value in args.Jitter:
+            if name not in schedule:
+                parser.error(f"unknown auto mode task '{name}', choose from {', '.join(AUTO_SCHEDULE)}")
+            schedule[name] = (schedule[name][0], float(value))
+
+        def discover():
             # Check for new popular posts in subreddits
-            subreddits = reddit.view_subreddits()
-            updated_posts = reddit.get_updated_posts()
+            updated_posts = reddit.get_updated_posts(mode=args.DiscoveryMode)
             reddit.update_database(updated_posts)
 
+        tasks = {
+            "discovery": discover,
+            # Refresh the scores of known posts
+            "scores": lambda: reddit.refresh_scores(schedule["scores"][0] * 60),
             # Checks for update posts by the same creators
-            reddit.check_for_similar_titles()
-
+            "updates": reddit.check_for_similar_titles,
             # Generate Videos
-            reddit.process_unmade_videos() 
+            "render": lambda: reddit.process_unmade_videos(args.Workers, tuple(args.StageWorkers)),
+        }
 
-            # Calculate the time taken for the code execution
-            time_taken = time.time() - start_time
-            
-            # Calculate the remaining time to make it 30 minutes
-            remaining_time = interval_seconds - time_taken
-
-            # Pause execution for the remaining time
-            if remaining_time > 0:
-                print(f"\033[1m(#)\033[0m Code execution took {time_taken:.2f} seconds.\n")
-                print(f"\033[1m(#)\033[0mWaiting for {remaining_time:.2f} seconds.\n")
-                time.sleep(remaining_time)
-            else:
-                print("\033[1m(#)\033[0m Code execution took longer than 30 minutes. Restarting loop immediately.\n")
+        # Every task runs concurrently on its own cadence, a task still running when it is due again skips that run
+        scheduler = Scheduler()
+        for name, (minutes, jitter) in schedule.items():
+            print(f"\033[1m(#)\033[0m Running the {name} task every {minutes:g} minutes.\n")
+            # Stagger the first runs so discovery has stored posts before the first render
+            scheduler.add(name, tasks[name], minutes * 60, jitter, delay=list(schedule).index(name) * 5)
+        scheduler.run()
 
         pass
     else:
@@ -162,10 +206,16 @@ if __name__ == "__main__":
             # Content search logic
             print("\033[1m(#)\033[0m Searching through Reddit for posts\n") 
             subreddits = reddit.view_subreddits()
-            updated_posts = reddit.get_updated_posts()
+            updated_posts = reddit.get_updated_posts(mode=args.DiscoveryMode)
             reddit.update_database(updated_posts)
             pass
 
+        if args.RefreshScores:
+            # Refresh scores logic
+            print("\033[1m(#)\033[0m Refreshing the scores of posts stored in the database\n")
+            reddit.refresh_scores()
+            pass
+
         if args.UpdateContentSearch:
             # Update content search logic
             print("\033[1m(#)\033[0m Searching through Reddit for update content, this can be slow due to API limits.\n") 
@@ -175,27 +225,65 @@ if __name__ == "__main__":
         if args.CreateContent:
             # Create content logic (run video creation loop)
             print("\033[1m(#)\033[0m Generating video content, this will take a long time.\n")
-            reddit.process_unmade_videos()
+            reddit.process_unmade_videos(args.Workers, tuple(args.StageWorkers))
             pass
 
         if args.GenerateVideo:
             # Generate video logic
-            url = args.GenerateVideo
-            # Logic for generating video for a specified Reddit post
-            print(f"\033[1m(#)\033[0m Generating content for provided url ({url}), please wait..\n")
-            
-            reddit.generateVideo(url)
-            print(f"\033[1m(#)\033[0m Finished generating content for provided url ({url}), closing program in 5 seconds\n")
+            urls = []
+            for arg in args.GenerateVideo:
+                # Text files list one url per line
+                if os.path.isfile(arg):
+                    with open(arg, "r") as f:
+                        urls.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+                else:
+                    urls.append(arg)
+
+            if len(urls) == 1:
+                url = urls[0]
+                # Logic for generating video for a specified Reddit post
+                print(f"\033[1m(#)\033[0m Generating content for provided url ({url}), please wait..\n")
+                reddit.generateVideo(url)
+                print(f"\033[1m(#)\033[0m Finished generating content for provided url ({url}), closing program in 5 seconds\n")
+            else:
+                # Logic for generating videos for a batch of Reddit posts
+                print(f"\033[1m(#)\033[0m Generating content for {len(urls)} provided urls, please wait..\n")
+                reddit.generate_videos(urls)
+                print(f"\033[1m(#)\033[0m Finished generating content for {len(urls)} provided urls, closing program in 5 seconds\n")
             time.sleep(5)
 
         if args.RetryErrors:
             # Retry errors logic
             print("\033[1m(#)\033[0m Program attempting to regenerate content for previously failed entries in the database\n")
-            reddit.retry_errors()
+            reddit.retry_errors(args.Workers, tuple(args.StageWorkers))
             print("\033[1m(#)\033[0m Program hyas attempted to regenerate content for previously failed entries in the database, closing in 5 seconds..\n")
             time.sleep(5)
             pass
 
+        if args.SearchPosts is not None:
+            # Search posts logic
+            print("\033[1m(#)\033[0m Below are the matching posts in the database.\n")
+
+            # Select the candidates inside SQLite
+            posts_entries = reddit.search_posts(args.SearchPosts, args.MinLength, args.MaxLength, args.MinScore,
+                                                args.Subreddit, args.Pending, args.Limit)
+
+            # Define headers for the table
+            headers = ["ID", "Subreddit", "Title", "Likes", "Length", "Video Made"]
+
+            # Print the table using tabulate
+            print(tabulate(posts_entries, headers=headers, tablefmt="grid"))
+            pass
+
+        if args.Coordinator:
+            # Coordinator logic, serve the render queue to farm workers
+            host, _, port = args.Coordinator.rpartition(":")
+            if args.LeaseSeconds:
+                reddit.jobs.lease_seconds = args.LeaseSeconds
+            coordinator = Coordinator(reddit, host or "127.0.0.1", int(port))
+            coordinator.serve_forever()
+            pass
+
         if args.ClearDatabase:
             # Clear database logic
             # Prompt the user for confirmation
@@ -0,0 +1,182 @@
+from PIL import Image, ImageDraw, ImageFont, ImageOps  # Python Imaging Library, used for image manipulation.
+import numpy as np  # Used to hand the finished mockup to moviepy as an in-memory array.
+import threading  # Provides support for threading.
+
+# Template layers used for the Reddit post mockup
+TEMPLATE_PATH = "inputs/6365678-ai.png"
+MASK_PATH = "inputs/mask.png"
+
+# Font files used for the dynamic fields
+FONT_ROBOTO_MEDIUM = "fonts/Roboto-Medium.ttf"
+FONT_ROBOTO = "fonts/Roboto-Regular.ttf"
+FONT_ROBOTO_LIGHT = "fonts/Roboto-Light.ttf"
+
+# Layout of the dynamic fields in template pixel coordinates: (position, font, size, color)
+FIELDS = {
+    "username": ((188, 78), FONT_ROBOTO_MEDIUM, 24, "#000000"),
+    "title": ((103, 141), FONT_ROBOTO, 20, "#000000"),
+    "time": ((104, 274), FONT_ROBOTO, 13.4, "#b0b0b0"),
+    "date": ((150, 274), FONT_ROBOTO, 13.4, "#b0b0b0"),
+    "likes": ((240, 310), FONT_ROBOTO_LIGHT, 12.34, "#666666"),
+    "comments": ((127, 310), FONT_ROBOTO_LIGHT, 12.34, "#666666"),
+}
+
+# Maximum width and height for the title in template pixels
+MAX_TITLE_WIDTH = 501
+MAX_TITLE_HEIGHT = 68
+
+# Where the profile picture is pasted in template pixels
+AVATAR_POSITION = (102.72, 51.6)
+
+
+class MockupRenderer:
+    def __init__(self, template_path: str = TEMPLATE_PATH, mask_path: str = MASK_PATH):
+        """
+        Initialize the MockupRenderer object.
+
+        The template and mask are decoded once and kept in memory. Scaled copies of the
+        layers and the font objects are built lazily for every target width and reused
+        for every post rendered at that width.
+
+        Args:
+            template_path (str): The path to the mockup template image.
+            mask_path (str): The path to the circular profile picture mask.
+
+        Attributes:
+            template (Image): The decoded template image at its native size.
+            mask (Image): The decoded profile picture mask at its native size.
+        """
+        self.template = Image.open(template_path).convert("RGBA")
+        self.mask = Image.open(mask_path).convert("L")
+        # Scaled layers and fonts keyed by target width
+        self.__layers = {}
+        self.__fonts = {}
+        self.__lock = threading.Lock()
+
+    def layers(self, width: int = None):
+        """
+        Get the template layers scaled to the given width.
+
+        Args:
+            width (int, optional): The target width in pixels. Defaults to the template width.
+
+        Returns:
+            tuple: (scale, template, mask) where template and mask are resized for the width.
+        """
+        width = width or self.template.width
+        with self.__lock:
+            if width not in self.__layers:
+                scale = width / self.template.width
+                if scale == 1:
+                    template, mask = self.template, self.mask
+                else:
+                    height = round(self.template.height * scale)
+                    template = self.template.resize((width, height), Image.LANCZOS)
+                    mask = self.mask.resize(
+                        (max(1, round(self.mask.width * scale)), max(1, round(self.mask.height * scale))), Image.LANCZOS)
+                self.__layers[width] = (scale, template, mask)
+            return self.__layers[width]
+
+    def font(self, path: str, size: float, scale: float = 1.0):
+        """
+        Get a cached font object for the given file, size and scale.
+
+        Args:
+            path (str): The path to the font file.
+            size (float): The font size in template pixels.
+            scale (float): The scale factor applied to the template.
+
+        Returns:
+            FreeTypeFont: The loaded font.
+        """
+        key = (path, size, scale)
+        with self.__lock:
+            if key not in self.__fonts:
+                self.__fonts[key] = ImageFont.truetype(path, size * scale)
+            return self.__fonts[key]
+
+    def fit_avatar(self, avatar, width: int = None):
+        """
+        Fit a profile picture to the mask for the given width and apply the mask as alpha.
+
+        Args:
+            avatar (Image): The decoded profile picture.
+            width (int, optional): The target width of the mockup.
+
+        Returns:
+            Image: The masked profile picture, ready to paste.
+        """
+        _, _, mask = self.layers(width)
+        output = ImageOps.fit(avatar.convert("RGBA"), mask.size, centering=(0.5, 0.5))
+        output.putalpha(mask)
+        return output
+
+    @staticmethod
+    def wrap_text(draw, text, font, max_width):
+        """
+        Wrap text so that no line is wider than the maximum width.
+
+        Args:
+            draw (ImageDraw): The ImageDraw object used to measure the text.
+            text (str): The text to wrap.
+            font (FreeTypeFont): The font used to draw the text.
+            max_width (float): The maximum width of a line in pixels.
+
+        Returns:
+            str: The wrapped text.
+        """
+        line = ''
+        lines = []
+        for word in text.split():
+            # Check if adding the word exceeds the max width
+            if draw.textlength(line + ' ' + word, font=font) <= max_width:
+                line += ' ' + word if line else word
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+        return '\n'.join(lines)
+
+    def render(self, post: dict, width: int = None, avatar=None, fitted: bool = False):
+        """
+        Render the Reddit post mockup.
+
+        Args:
+            post (dict): The post details as returned by RedditAPI.get_from_url.
+            width (int, optional): The target width in pixels, usually the background video width.
+            avatar (Image, optional): The profile picture.
+            fitted (bool): Whether the profile picture was already fitted for this width by fit_avatar.
+
+        Returns:
+            numpy.ndarray: The mockup as an RGBA array.
+        """
+        scale, template, mask = self.layers(width)
+        image = template.copy()
+        draw = ImageDraw.Draw(image)
+
+        # Split the time string and keep only the hours and minutes
+        time_only_hh_mm = ":".join(post["time"].split(":")[:2])
+        values = {
+            "username": post["username"],
+            "title": post["title"],
+            "time": time_only_hh_mm + "  .  ",
+            "date": post["date_posted"],
+            "likes": str(post["likes"]),
+            "comments": str(post["comments"]),
+        }
+
+        # Draw only the dynamic fields on top of the cached template
+        for field, ((x, y), path, size, color) in FIELDS.items():
+            font = self.font(path, size, scale)
+            text = values[field]
+            if field == "title":
+                text = self.wrap_text(draw, text, font, MAX_TITLE_WIDTH * scale)
+            draw.text((x * scale, y * scale), text, font=font, fill=color)
+
+        # Paste the profile picture onto the mockup
+        if avatar is not None:
+            if not fitted:
+                avatar = self.fit_avatar(avatar, width)
+            image.paste(avatar, (int(AVATAR_POSITION[0] * scale), int(AVATAR_POSITION[1] * scale)), avatar)
+
+        return np.asarray(image)
@@ -0,0 +1,98 @@
+import threading  # Provides support for threading.
+import queue  # Provides the bounded queues between stages.
+import time  # Provides various time-related functions.
+
+# Marks the end of the items flowing into a stage
+_DONE = object()
+
+
+class Pipeline:
+    def __init__(self, stages, maxsize: int = 2):
+        """
+        Initialize the Pipeline object, which runs items through stages that overlap across items.
+
+        Every stage has its own worker threads and reads from a bounded queue filled by the
+        stage before it, so while one item is in a slow stage the next items are already
+        being worked on by the earlier stages. Throughput is bounded by the slowest stage
+        rather than the sum of all stages, and the bounded queues stop fast stages from
+        running far ahead of slow ones.
+
+        Args:
+            stages (list): (name, function, workers) tuples in order. Each function takes an item and returns the item for the next stage.
+            maxsize (int): The number of items that may wait in front of each stage.
+
+        Attributes:
+            timings (dict): A mapping of stage name to [items processed, seconds spent].
+        """
+        self.stages = stages
+        self.maxsize = maxsize
+        self.timings = {name: [0, 0.0] for name, _, _ in stages}
+        self.__lock = threading.Lock()
+
+    def run(self, source, on_done=None, on_error=None, on_stage=None):
+        """
+        Run every item of the source through the stages and wait until all of them are finished.
+
+        The source is consumed lazily, only as fast as the first stage accepts items.
+
+        Args:
+            source (iterable): The items to process.
+            on_done (callable, optional): Called with each item that finished the last stage.
+            on_error (callable, optional): Called with the item, stage name and exception when a stage fails, the item is dropped.
+            on_stage (callable, optional): Called with the item and stage name before each stage starts on it.
+        """
+        queues = [queue.Queue(self.maxsize) for _ in self.stages]
+        threads = []
+        for index, (name, function, workers) in enumerate(self.stages):
+            inbox = queues[index]
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            remaining = [workers]
+            for worker in range(workers):
+                thread = threading.Thread(target=self.__work, name=f"{name}-{worker + 1}", daemon=True,
+                                          args=(index, inbox, outbox, remaining, on_done, on_error, on_stage))
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                queues[0].put(item)
+        finally:
+            # Stop the first stage once the source is exhausted, the others stop in turn
+            for _ in range(self.stages[0][2]):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+    def __work(self, index, inbox, outbox, remaining, on_done, on_error, on_stage):
+        name, function, _ = self.stages[index]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            try:
+                if on_stage:
+                    on_stage(item, name)
+                start = time.perf_counter()
+                item = function(item)
+                with self.__lock:
+                    self.timings[name][0] += 1
+                    self.timings[name][1] += time.perf_counter() - start
+                if outbox is None and on_done:
+                    on_done(item)
+            except Exception as e:
+                if on_error:
+                    on_error(item, name, e)
+                continue
+            if outbox is not None:
+                outbox.put(item)
+
+        # The last worker of a stage tells every worker of the next stage to stop
+        with self.__lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last and outbox is not None:
+            for _ in range(self.stages[index + 1][2]):
+                outbox.put(_DONE)
+
+    def __str__(self):
+        return ", ".join(f"{name} {count} in {seconds:.1f}s" for name, (count, seconds) in self.timings.items())
@@ -0,0 +1,258 @@
+from requests.adapters import HTTPAdapter  # Used to route raw requests through the shared budget.
+from urllib.parse import urlsplit  # Used to tell Reddit API hosts apart from CDN hosts.
+import prawcore  # Low level PRAW networking, used to route PRAW requests through the shared budget.
+import itertools  # Provides counters used to keep waiters in arrival order.
+import threading  # Provides support for threading.
+import heapq  # Provides the priority queue of waiting requests.
+import time  # Provides various time-related functions.
+
+# Scheduling priority of each kind of Reddit traffic, lower runs first
+PRIORITIES = {
+    "hydration": 0,  # Fetching posts that are about to be rendered
+    "discovery": 1,  # Subreddit listings and score refreshes
+    "updates": 2,  # Author feed checks for update posts
+}
+DEFAULT_PRIORITY = "discovery"
+
+# Reddit allows 100 requests per minute per OAuth client, averaged over the reset window
+DEFAULT_RATE = 100 / 60
+# Unauthenticated requests to the public reddit.com hosts are limited per IP, far below the OAuth allowance
+PUBLIC_RATE = 10 / 60
+# Host of the authenticated API, the only one whose rate limit headers describe the OAuth allowance
+OAUTH_HOST = "oauth.reddit.com"
+# How many requests may be sent back to back before pacing kicks in
+DEFAULT_CAPACITY = 10
+
+
+class RequestBudget:
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_CAPACITY):
+        """
+        Initialize the RequestBudget object, a token bucket shared by all Reddit traffic of one rate limit.
+
+        The refill rate follows the X-Ratelimit-Remaining and X-Ratelimit-Reset headers of
+        every response, so the remaining allowance is spread evenly over the rest of the
+        window. Waiting requests are served by priority, then in arrival order. The priority
+        set by a thread applies to every budget.
+
+        Args:
+            rate (float): Requests per second used until Reddit reports the real allowance.
+            capacity (int): The maximum number of tokens that can accumulate.
+
+        Attributes:
+            remaining (float): The last reported number of requests left in the window.
+            reset (float): The last reported number of seconds until the window resets.
+        """
+        self.default_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.remaining = None
+        self.reset = None
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__waiters = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__local = _priorities
+
+    def __refill(self, now: float):
+        # No tokens accumulate while paused for a window reset
+        if now < self.__paused_until:
+            self.__updated = now
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    def priority(self, name: str):
+        """
+        Get a context manager that sets the priority of requests made by the current thread.
+
+        Usage:
+            with budget.priority("updates"):
+                ...
+
+        Args:
+            name (str): One of the keys of PRIORITIES.
+
+        Returns:
+            _Priority: The context manager.
+        """
+        return _Priority(self.__local, name)
+
+    def acquire(self, priority: str = None):
+        """
+        Block until a request may be sent.
+
+        Args:
+            priority (str, optional): One of the keys of PRIORITIES, defaults to the current thread's priority.
+        """
+        priority = priority or getattr(self.__local, "priority", DEFAULT_PRIORITY)
+        entry = (PRIORITIES[priority], next(self.__sequence))
+        with self.__condition:
+            heapq.heappush(self.__waiters, entry)
+            while True:
+                now = time.monotonic()
+                self.__refill(now)
+                if self.__waiters[0] == entry and self.tokens >= 1:
+                    heapq.heappop(self.__waiters)
+                    self.tokens -= 1
+                    self.__condition.notify_all()
+                    return
+                # Sleep until the next token is due or another waiter changes the state
+                wait = max(self.__paused_until - now, (1 - self.tokens) / self.rate if self.rate else 1.0, 0.01)
+                self.__condition.wait(wait)
+
+    def update(self, headers, status_code: int = None):
+        """
+        Update the budget from the rate limit headers of a response.
+
+        Args:
+            headers (Mapping): The response headers.
+            status_code (int, optional): The response status code.
+        """
+        try:
+            remaining = float(headers["X-Ratelimit-Remaining"])
+            reset = float(headers["X-Ratelimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            remaining = reset = None
+
+        with self.__condition:
+            now = time.monotonic()
+            self.__refill(now)
+            if remaining is not None:
+                self.remaining, self.reset = remaining, reset
+                self.tokens = min(self.tokens, remaining)
+                if remaining < 1:
+                    # Out of requests, wait for the window to reset
+                    self.__paused_until = now + reset
+                    self.tokens = 0.0
+                    self.rate = self.default_rate
+                else:
+                    # Spread what is left evenly over the rest of the window
+                    self.rate = remaining / max(reset, 1.0)
+            if status_code == 429:
+                retry_after = headers.get("Retry-After")
+                try:
+                    delay = float(retry_after) if retry_after else (reset or 60.0)
+                except ValueError:
+                    delay = reset or 60.0
+                self.__paused_until = max(self.__paused_until, now + delay)
+                self.tokens = 0.0
+                print(f"\033[31m\033[1m(#)\033[0m Reddit rate limit hit, pausing requests for {delay:.0f} seconds.\n")
+            self.__condition.notify_all()
+
+
+# Request priority of every thread, shared by all budgets
+_priorities = threading.local()
+
+
+class _Priority:
+    def __init__(self, local, name: str):
+        if name not in PRIORITIES:
+            raise ValueError(f"Unknown request priority '{name}'.")
+        self.local = local
+        self.name = name
+
+    def __enter__(self):
+        self.previous = getattr(self.local, "priority", None)
+        self.local.priority = self.name
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.local.priority = self.previous
+        return False
+
+
+def budget_for(url: str, budget: RequestBudget = None, public_budget: RequestBudget = None):
+    """
+    Get the budget a request to a URL is paced by.
+
+    The authenticated API and the public reddit.com hosts report separate rate limits, so
+    their headers must never update each other's budget.
+
+    Args:
+        url (str): The request URL.
+        budget (RequestBudget, optional): The OAuth budget, defaults to shared_budget.
+        public_budget (RequestBudget, optional): The budget of unauthenticated requests, defaults to shared_public_budget.
+
+    Returns:
+        RequestBudget: The budget, or None if the URL is not rate limited.
+    """
+    if not is_budgeted(url):
+        return None
+    if urlsplit(url).hostname == OAUTH_HOST:
+        return budget or shared_budget
+    return public_budget or shared_public_budget
+
+
+def is_budgeted(url: str):
+    """
+    Check whether a URL counts against Reddit's API rate limit.
+
+    Avatars and other static files are served from CDN hosts that are not rate limited.
+
+    Args:
+        url (str): The request URL.
+
+    Returns:
+        bool: True for reddit.com hosts.
+    """
+    host = urlsplit(url).hostname or ""
+    return host == "reddit.com" or host.endswith(".reddit.com")
+
+
+class BudgetedRequestor(prawcore.Requestor):
+    def __init__(self, *args, budget: RequestBudget = None, public_budget: RequestBudget = None, **kwargs):
+        """
+        Initialize the BudgetedRequestor object, a PRAW requestor that sends every request through the budget.
+
+        Pass it to praw.Reddit with requestor_class and requestor_kwargs={"budget": budget}.
+
+        Args:
+            budget (RequestBudget): The shared request budget of the OAuth API.
+            public_budget (RequestBudget): The shared budget of unauthenticated requests, such as token requests.
+        """
+        super().__init__(*args, **kwargs)
+        self.budget = budget or shared_budget
+        self.public_budget = public_budget or shared_public_budget
+
+    def request(self, *args, **kwargs):
+        url = kwargs.get("url", args[1] if len(args) > 1 else "")
+        budget = budget_for(url, self.budget, self.public_budget)
+        if budget:
+            budget.acquire()
+        response = super().request(*args, **kwargs)
+        if budget:
+            budget.update(response.headers, response.status_code)
+        return response
+
+
+class BudgetedAdapter(HTTPAdapter):
+    def __init__(self, *args, budget: RequestBudget = None, public_budget: RequestBudget = None, **kwargs):
+        """
+        Initialize the BudgetedAdapter object, a requests adapter that sends Reddit requests through the budget.
+
+        Mount it on a requests.Session for "https://".
+
+        Args:
+            budget (RequestBudget): The shared request budget of the OAuth API.
+            public_budget (RequestBudget): The shared budget of unauthenticated requests, such as author feeds.
+        """
+        super().__init__(*args, **kwargs)
+        self.budget = budget or shared_budget
+        self.public_budget = public_budget or shared_public_budget
+
+    def send(self, request, **kwargs):
+        budget = budget_for(request.url, self.budget, self.public_budget)
+        if budget:
+            budget.acquire()
+        response = super().send(request, **kwargs)
+        if budget:
+            budget.update(response.headers, response.status_code)
+        return response
+
+
+# The OAuth budget shared by every Reddit client in the process
+shared_budget = RequestBudget()
+# The per-IP budget of unauthenticated requests to reddit.com, such as the author feeds
+shared_public_budget = RequestBudget(PUBLIC_RATE)
@@ -1,21 +1,47 @@
 import requests  # Used for making HTTP requests, typically for API interactions.
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed  # Used to fetch several subreddits and generate several videos at once.
+import multiprocessing  # Used to start the video worker processes.
 import sqlite3  # Provides a lightweight disk-based database that doesn’t require a separate server process.
 from datetime import datetime  # Provides classes for manipulating dates and times.
 import praw  # Python Reddit API Wrapper, used for interacting with the Reddit API.
-from prawcore.exceptions import Forbidden, RequestException  # Exceptions specific to the PRAW library.
+from prawcore.exceptions import Forbidden, NotFound, RequestException  # Exceptions specific to the PRAW library.
 from praw.exceptions import RedditAPIException  # Exceptions specific to the PRAW library.
 from ftfy import ftfy  # Fixes mojibake and other glitches in Unicode text.
 from tqdm import tqdm  # Provides a progress bar to show the progress of iterative tasks.
-from PIL import Image, ImageDraw, ImageFont, ImageOps  # Python Imaging Library, used for image manipulation.
-from tiktokvoice import tts, get_duration, merge_audio_files  # Functions for creating and manipulating audio files.
-from srt import gen_srt_file  # Library for working with SubRip (SRT) subtitle files.
-from editor import VideoEditor  # Custom module for video editing tasks.
+from database import ConnectionPool, migrate, content_hash, WriteStats, DATABASE_PATH, VIDEO_PENDING, VIDEO_MADE, VIDEO_FAILED, VIDEO_DUPLICATE, VIDEO_TOO_LONG  # Custom module for opening and measuring the database.
+from similarity import TitleIndex, TITLE_SIMILARITY_THRESHOLD  # Custom module for matching update posts to their originals.
+from fingerprint import FingerprintIndex  # Custom module for detecting reposted stories.
+from jobqueue import JobQueue, worker_name, JOB_QUEUED, JOB_LEASED  # Custom module for the durable render queue.
+from generator import VideoGenerator, collect_workspaces, STAGE_WORKERS  # Custom module for the stages of a video.
+from duration import DurationEstimator, background_durations, choose_background, PLATFORM_LIMIT, TTS_VOICE, TTS_SPEED  # Custom module for predicting the length of the voice over.
+from feeds import AuthorFeedChecker  # Custom module for checking author feeds for update posts.
+from ratelimit import shared_budget  # Custom module for sharing Reddit's rate limit.
+from httpcache import CachingRequestor, shared_cache  # Custom module for caching and recording Reddit responses.
+from censor import CensorEngine  # Custom module for censoring and rewriting post content.
+from avatars import DEFAULT_AVATAR_URL  # Custom module for caching profile pictures.
+import threading  # Used to give every thread its own Reddit client.
 import time  # Provides various time-related functions.
-import re  # Provides support for regular expressions (regex).
+import json  # Used to read the checkpoints of render jobs.
+import html  # Used to unescape profile picture URLs returned by the Reddit API.
 import os  # Provides functions for interacting with the operating system.
 import sys  # Provides access to some variables used or maintained by the Python interpreter and to functions that interact strongly with the interpreter.
 
 
+# Time windows of the "top" listing, smallest first, as (time_filter, seconds)
+DISCOVERY_WINDOWS = [("hour", 60 * 60), ("day", 24 * 60 * 60), ("week", 7 * 24 * 60 * 60),
+                     ("month", 31 * 24 * 60 * 60), ("year", 366 * 24 * 60 * 60)]
+# How far back discovery re-reads so posts have time to reach the like threshold, "new" mode keeps its
+# cursor behind posts younger than this that are still below the threshold
+DISCOVERY_LOOKBACK = 24 * 60 * 60
+
+
+def _run_jobs_worker(credentials: tuple, cache_mode: str, cache_dir: str, desc: str, stage_workers: tuple):
+    """
+    Drain the render queue from a worker process with its own Reddit client and database connections.
+    """
+    shared_cache.configure(cache_mode, cache_dir)
+    RedditAPI(*credentials).run_jobs(desc, stage_workers)
+
 
 class RedditAPI:
     def __init__(self, client_id: str = None, client_secret: str = None, username: str = None, password: str = None):
@@ -45,50 +71,107 @@ class RedditAPI:
             raise ValueError(
                 "\033[31m\033[1m(#)\033[0m REDDIT_PASSWORD not set correctly, delete credentials.txt and setup again.\n")
 
-        # Create the Reddit instance
-        self.reddit = praw.Reddit(
-            client_id=client_id,
-            client_secret=client_secret,
-            user_agent='RSCG',
-            username=username,
-            password=password)
-        # Set the config to decode HTML entities
-        self.reddit.config.decode_html_entities = True
-
-        # Connect to SQLite database
-        self.conn = sqlite3.connect('database.db')
-        self.c = self.conn.cursor()
-
-        # Create posts table if not exists
-        self.c.execute('''CREATE TABLE IF NOT EXISTS posts
-                          (id TEXT PRIMARY KEY,
-                           subreddit TEXT,
-                           title TEXT,
-                           content TEXT,
-                           likes INTEGER,
-                           author TEXT,
-                           created_utc INTEGER,
-                           url TEXT)''')
-        
-        # Create 'subreddits' table
-        self.c.execute('''CREATE TABLE IF NOT EXISTS subreddits (
-                            id INTEGER PRIMARY KEY,
-                            name TEXT UNIQUE,
-                            enabled INTEGER DEFAULT 1
-                        )''')
-
-        # Create 'filters' table
-        self.c.execute('''CREATE TABLE IF NOT EXISTS filters (
-                            id INTEGER PRIMARY KEY,
-                            word TEXT UNIQUE
-                        )''')
-
-        self.conn.commit()
+        # Kept so worker threads and processes can create their own client
+        self.__credentials = (client_id, client_secret, username, password)
+
+        # PRAW sessions are not thread-safe, every thread holds its own Reddit instance while it runs.
+        # Instances of threads that ended are handed to new threads, keeping their access tokens.
+        self.__clients = {}
+        self.__idle_clients = []
+        self.__clients_lock = threading.Lock()
+        self.budget = shared_budget
+        # Create the Reddit instance of this thread
+        self.reddit
+
+        # Per-thread SQLite connections in WAL mode, so discovery, update checks and renders can share the database
+        self.database = ConnectionPool(DATABASE_PATH)
+        # Write throughput of the discovery passes
+        self.write_stats = WriteStats()
+
+        # Bring the schema up to date
+        migrate(self.conn)
+        # Concurrent author feed checker with per-author polling intervals
+        self.feed_checker = AuthorFeedChecker(self.database)
+        # Durable render queue drained by process_unmade_videos and retry_errors
+        self.jobs = JobQueue(self.database)
+
+        # Prepare, audio and render stages of every video
+        self.generator = VideoGenerator()
+        # Predicts the length of a voice over before any TTS is paid for
+        self.durations = DurationEstimator(self.database)
+        # Longest video in seconds the posts are admitted for, 0 for no limit
+        self.platform_limit = PLATFORM_LIMIT
+        # Compiled censor engine, rebuilt after the filter list changes
+        self.__censor = None
     
-    def __del__(self):
-        # Close database connection when object is deleted
-        self.conn.close()
+    def close(self):
+        """
+        Close the database connections opened by this process.
+        """
+        self.database.close()
+
+    @property
+    def reddit(self):
+        """
+        The current thread's Reddit instance, sharing the request budget and response cache with every other one.
 
+        Discovery pools and scheduled tasks start new threads on every pass, so an instance
+        is only created when every existing one is held by a running thread.
+        """
+        thread = threading.current_thread()
+        client = self.__clients.get(thread)
+        if client is not None:
+            return client
+        with self.__clients_lock:
+            for ended in [t for t in self.__clients if not t.is_alive()]:
+                self.__idle_clients.append(self.__clients.pop(ended))
+            client = self.__idle_clients.pop() if self.__idle_clients else None
+        if client is None:
+            client_id, client_secret, username, password = self.__credentials
+            client = praw.Reddit(
+                client_id=client_id,
+                client_secret=client_secret,
+                user_agent='RSCG',
+                username=username,
+                password=password,
+                # Route every PRAW request through the response cache and the budget shared with the other Reddit clients
+                requestor_class=CachingRequestor,
+                requestor_kwargs={"budget": shared_budget, "cache": shared_cache})
+            # Set the config to decode HTML entities
+            client.config.decode_html_entities = True
+        with self.__clients_lock:
+            self.__clients[thread] = client
+        return client
+
+    @property
+    def conn(self):
+        """
+        The current thread's database connection.
+        """
+        return self.database.connection()
+
+    @property
+    def title_index(self):
+        """
+        The title index used to match update posts to their originals, on the current thread's connection.
+        """
+        return TitleIndex(self.conn)
+
+    @property
+    def fingerprints(self):
+        """
+        The content fingerprints used to skip reposts of stories already rendered, on the current thread's connection.
+        """
+        return FingerprintIndex(self.conn)
+
+    @property
+    def censor(self):
+        """
+        The CensorEngine compiled from the 'filters' table.
+        """
+        if self.__censor is None:
+            self.__censor = CensorEngine(row[0] for row in self.conn.execute("SELECT word FROM filters"))
+        return self.__censor
 
     def __utc_to_datetimestr(self, utc: float):
         """
@@ -101,9 +184,9 @@ class RedditAPI:
             str: The formatted string representing the datetime in the format "dd-mm-yyyy HH:MM:SS".
         """
         # Convert UTC timestamp to datetime object
-        self.__datetime_obj = datetime.utcfromtimestamp(float(utc))
+        datetime_obj = datetime.utcfromtimestamp(float(utc))
         # Convert datetime object to formatted string and return
-        return self.__datetime_obj.strftime("%d-%m-%Y %H:%M:%S")
+        return datetime_obj.strftime("%d-%m-%Y %H:%M:%S")
     
 
     def __filter_content(self, textstr: str):
@@ -117,89 +200,212 @@ class RedditAPI:
             list: A list of filtered sentences.
         """
 
-        # Fetch swear words from the 'filters' table
-        self.c.execute("SELECT word FROM filters")
-        swear_words = [row[0] for row in self.c.fetchall()]
+        # Grammar fix for better TTS
+        unfiltered = ftfy(textstr)
 
-        # Close database connection
-        self.conn.close()
+        # Apply phrase rewrites, censoring and age rewrites in one pass
+        unfiltered = self.censor.filter(unfiltered)
 
-        # Grammar fix for better TTS
-        self.__unfiltered = ftfy(textstr)
+        # Split content and filter out empty strings, then return
+        return [f"{s.strip()}" for s in unfiltered.split(". ") if len(s) > 1]
 
-        # Define the words to check for replacement and their corresponding replacements
-        self.__chkWords = ("\n", '."', "UPDATE:", "AITA")
-        self.__repWords = (". ", '". ', ". UPDATE:. ", "Am I the asshole")
+    def __stored_posts(self, post_ids):
+        """
+        Load the stored content hash, edited timestamp, score and version hash for a batch of post IDs.
+
+        Args:
+            post_ids (list): The post IDs to look up.
 
-        # Define a dictionary to store censored versions of swear words
-        censored_swear_words = {word: word[0] + '*' * (len(word) - 2) + word[-1] for word in swear_words}
+        Returns:
+            dict: A mapping of post ID to a (content_hash, edited, likes, version_hash) tuple for every ID already stored.
+        """
+        stored = {}
+        # Query in chunks to stay below SQLite's bound parameter limit
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for post_id, stored_hash, edited, likes, version in self.conn.execute(
+                    f"SELECT id, content_hash, edited, likes, version_hash FROM posts WHERE id IN ({placeholders})", chunk):
+                stored[post_id] = (stored_hash, edited, likes, version)
+        return stored
+
+    def version_hash(self, textstr: str):
+        """
+        Hash the normalized, filtered text of a post, which identifies a renderable version.
 
-        # Replace all occurrences of check words with replace words
-        for check, replace in zip(self.__chkWords, self.__repWords):
-            self.__unfiltered = self.__unfiltered.replace(check, replace)
+        Args:
+            textstr (str): The raw post content.
 
-        # Replace swear words with censored versions
-        for word, censored_word in censored_swear_words.items():
-            self.__unfiltered = self.__unfiltered.replace(word, censored_word)
+        Returns:
+            str: The hex digest of the filtered sentences with whitespace collapsed.
+        """
+        return content_hash(" ".join(" ".join(self.__filter_content(textstr or "")).split()))
 
-        # Replace "M" followed by 1-3 digit numbers with "Male "
-        self.__unfiltered = re.sub(r'M(\d{1,3})', r'Male \1', self.__unfiltered)
+    def __mark_duplicates(self, rows):
+        """
+        Fingerprint posts and mark those that repost an already rendered story as duplicates.
+        Must be called inside the transaction that writes the posts.
 
-        # Replace "F" followed by 1-3 digit numbers with "Female "
-        self.__unfiltered = re.sub(r'F(\d{1,3})', r'Female \1', self.__unfiltered)
+        Args:
+            rows (iterable): (post_id, content) tuples of new posts and new versions.
 
-        # Split content and filter out empty strings, then return
-        return [f"{s.strip()}" for s in self.__unfiltered.split(". ") if len(s) > 1]
+        Returns:
+            list: (post_id, duplicate_of, distance) tuples for every post marked as a duplicate.
+        """
+        duplicates = []
+        originals = []
+        for post_id, fingerprint in self.fingerprints.add_many(rows).items():
+            match = self.fingerprints.nearest(post_id, fingerprint, VIDEO_MADE)
+            if match:
+                duplicates.append((post_id, match[0], match[1]))
+            else:
+                originals.append((post_id,))
+        self.conn.executemany(f"UPDATE posts SET duplicate_of = ?, video_made = {VIDEO_DUPLICATE} WHERE id = ?",
+                              [(duplicate_of, post_id) for post_id, duplicate_of, _ in duplicates])
+        # A new version that no longer matches is no longer a duplicate
+        self.conn.executemany("UPDATE posts SET duplicate_of = NULL WHERE id = ? AND duplicate_of IS NOT NULL", originals)
+        return duplicates
 
     def update_database(self, posts):
         """
         Update the database with Reddit posts.
 
+        All new and changed posts are written in a single transaction. A new version is
+        recorded in 'post_versions' only when the filtered text of a post changes, which
+        queues it to be rendered again. Score-only changes just update the score.
+
         Args:
             posts (list): List of Reddit post objects.
         """
+        stored = self.__stored_posts([post.id for post in posts])
+        now = int(time.time())
+        rows = []
+        versions = []
+        new_posts = []
+        edited_posts = []
+
         # Initialize tqdm with the total number of posts
         progress_bar = tqdm(total=len(posts), unit="post")
         for post in posts:
-            self.c.execute("SELECT * FROM posts WHERE id=?", (post.id,))
-            existing_post = self.c.fetchone()
-            if existing_post:
-                # Check if post content has changed
-                if existing_post[3] != post.selftext or existing_post[6] != post.edited:
-                    # Update existing post in database
-                    self.c.execute("UPDATE posts SET content=?, likes=? WHERE id=?",
-                                (post.selftext, post.score, post.id))
-                    self.conn.commit()
-                    self.generate_post(post.url)
-                    # Check if edited content is different
-                    if existing_post[3] != post.selftext:
-                        # If edited content is different, create a new entry in the database
-                        self.c.execute("INSERT INTO posts (id, subreddit, title, content, likes, author, created_utc, url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                                    (post.id, post.subreddit.display_name, post.title, post.selftext,
-                                        post.score, post.author.name if post.author else None,
-                                        post.created_utc, post.url))
-                        self.conn.commit()
-                        # Print statement for the new entry with edited content
-                        print(f"\033[1m(#)\033[0m A new entry has been added for edited content by {post.author} titled '{post.title}' posted on {post.created_utc}.\n")
-            else:
-                # Add new post to database
-                self.c.execute("INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                            (post.id, post.subreddit.display_name, post.title, post.selftext,
-                                post.score, post.author.name if post.author else None,
-                                post.created_utc, post.url))
-                self.conn.commit()
-                self.generate_post(post.url)
+            existing_post = stored.get(post.id)
+            post_hash = content_hash(post.selftext)
+            edited = float(post.edited or 0)
+            # Only write posts that are new or whose content, edited timestamp or score has changed
+            if existing_post is None or existing_post[:3] != (post_hash, edited, post.score):
+                version = existing_post[3] if existing_post else None
+                # Only re-filter the content when the raw content or edited timestamp changed
+                if existing_post is None or existing_post[:2] != (post_hash, edited):
+                    version = self.version_hash(post.selftext)
+                    if existing_post is None:
+                        new_posts.append(post)
+                        versions.append((post.id, version, post.selftext, now))
+                    elif existing_post[3] is None and existing_post[0] == post_hash:
+                        # Posts stored before versioning adopt the hash of their unchanged content without being rendered again
+                        versions.append((post.id, version, post.selftext, now))
+                    elif version != existing_post[3]:
+                        edited_posts.append(post)
+                        versions.append((post.id, version, post.selftext, now))
+                rows.append((post.id, post.subreddit.display_name, post.title, post.selftext,
+                             post.score, post.author.name if post.author else None,
+                             post.created_utc, post.url, now, post_hash, edited, now, version,
+                             post.num_comments, getattr(post, "author_fullname", None)))
             # Update the progress bar
             progress_bar.update(1)
         # Close the progress bar
         progress_bar.close()
 
+        # Insert new posts and update changed ones in one transaction, a new version is queued for rendering again
+        with self.write_stats.timed() as batch, self.conn:
+            self.conn.executemany(
+                f"""INSERT INTO posts (id, subreddit, title, content, likes, author, created_utc, url, discovered_at, content_hash, edited, score_refreshed_at, version_hash, num_comments, author_fullname)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET content=excluded.content, likes=excluded.likes, num_comments=excluded.num_comments,
+                       content_hash=excluded.content_hash, edited=excluded.edited,
+                       score_refreshed_at=excluded.score_refreshed_at, version_hash=excluded.version_hash,
+                       video_made=CASE WHEN posts.version_hash IS NOT excluded.version_hash
+                                            AND (posts.version_hash IS NOT NULL OR posts.content_hash IS NOT excluded.content_hash)
+                                       THEN {VIDEO_PENDING} ELSE posts.video_made END""", rows)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO post_versions (post_id, content_hash, content, created_at) VALUES (?, ?, ?, ?)", versions)
+            # Stages checkpointed for the previous version must not be resumed by the job rendering the new one
+            self.conn.executemany(
+                "UPDATE jobs SET checkpoints = NULL WHERE post_id = ? AND status IN (?, ?)",
+                [(post.id, JOB_QUEUED, JOB_LEASED) for post in edited_posts])
+            self.title_index.add_many((post.id, post.author.name if post.author else None, post.title) for post in new_posts)
+            duplicates = self.__mark_duplicates((post.id, post.selftext) for post in new_posts + edited_posts)
+            batch.rows = len(rows) + len(versions)
+
+        for post in edited_posts:
+            # Print statement for the new version of edited content
+            print(f"\033[1m(#)\033[0m A new version has been stored for edited content by {post.author} titled '{post.title}' posted on {post.created_utc}.\n")
+        for post_id, duplicate_of, distance in duplicates:
+            # Print statement for reposts that will not be rendered
+            print(f"\033[1m(#)\033[0m Post {post_id} is a repost of {duplicate_of} ({distance} bits apart) and will be skipped.\n")
+        skipped = {post_id for post_id, _, _ in duplicates}
+        for post in new_posts + edited_posts:
+            if post.id not in skipped:
+                self.generate_post(post.url)
+
+        print(f"\033[1m(#)\033[0m Database writes: {self.write_stats}\n")
+
     def fetch_all_posts(self):
         """
         Fetch all posts from the database.
         """
-        self.c.execute("SELECT * FROM posts")
-        return self.c.fetchall()
+        return self.conn.execute("SELECT * FROM posts").fetchall()
+
+    def search_posts(self, keywords: str = None, min_length: int = None, max_length: int = None,
+                     min_score: int = None, subreddit: str = None, pending_only: bool = False, limit: int = 20):
+        """
+        Select candidate posts inside SQLite using the full-text index.
+
+        Args:
+            keywords (str, optional): Words that must all appear in the title or content, results are ordered by rank.
+            min_length (int, optional): The minimum content length in characters.
+            max_length (int, optional): The maximum content length in characters.
+            min_score (int, optional): The minimum number of likes.
+            subreddit (str, optional): Only include posts from this subreddit.
+            pending_only (bool): Only include posts without a video.
+            limit (int): The maximum number of posts returned.
+
+        Returns:
+            list: (id, subreddit, title, likes, length, video_made) tuples.
+        """
+        conditions = []
+        params = []
+        if keywords:
+            # Quote every word so user input is never parsed as FTS5 query syntax
+            conditions.append("posts_fts MATCH ?")
+            params.append(" ".join('"' + word.replace('"', '""') + '"' for word in keywords.split()))
+        if min_length is not None:
+            conditions.append("length(p.content) >= ?")
+            params.append(min_length)
+        if max_length is not None:
+            conditions.append("length(p.content) <= ?")
+            params.append(max_length)
+        if min_score is not None:
+            conditions.append("p.likes >= ?")
+            params.append(min_score)
+        if subreddit:
+            conditions.append("p.subreddit = ? COLLATE NOCASE")
+            params.append(subreddit)
+        if pending_only:
+            conditions.append("p.video_made = ?")
+            params.append(VIDEO_PENDING)
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+        if keywords:
+            query = f"""SELECT p.id, p.subreddit, p.title, p.likes, length(p.content), p.video_made
+                        FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid
+                        {where} ORDER BY bm25(posts_fts), p.likes DESC LIMIT ?"""
+        else:
+            query = f"""SELECT p.id, p.subreddit, p.title, p.likes, length(p.content), p.video_made
+                        FROM posts p {where} ORDER BY p.likes DESC LIMIT ?"""
+        try:
+            return self.conn.execute(query, params + [limit]).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error searching posts: {e}\n")
+            return []
 
     def generate_post(self, url):
         """
@@ -211,33 +417,170 @@ class RedditAPI:
         #print("Generating post for URL:", url)
         # Your implementation here
 
-    def get_updated_posts(self, threshold_likes=1000):
+    def __discovery_cursors(self, mode: str):
+        """
+        Load the discovery cursors stored for a mode.
+
+        Args:
+            mode (str): The discovery mode.
+
+        Returns:
+            dict: A mapping of subreddit name to a (last_fullname, last_created_utc, updated_at) tuple.
+        """
+        rows = self.conn.execute(
+            "SELECT subreddit, last_fullname, last_created_utc, updated_at FROM subreddit_cursors WHERE mode = ?", (mode,))
+        return {row[0]: row[1:] for row in rows}
+
+    def __fetch_listing(self, subreddit_name: str, mode: str = "top", cursor: tuple = None, limit: int = 100, lookback: int = DISCOVERY_LOOKBACK):
+        """
+        Fetch the part of a subreddit listing beyond its cursor, used by the discovery worker threads.
+
+        In "new" mode the listing is read newest first and stops at the last post seen.
+        In "top" mode the smallest time window covering the time since the last run plus
+        the lookback is used, so posts still have time to reach the like threshold.
+
+        Args:
+            subreddit_name (str): The name of the subreddit.
+            mode (str): Either "new" or "top".
+            cursor (tuple, optional): The stored (last_fullname, last_created_utc, updated_at) cursor.
+            limit (int): The maximum number of posts to retrieve.
+            lookback (int): Seconds of older posts re-read by "top" mode on every run.
+
+        Returns:
+            tuple: (subreddit_name, posts, seconds) where seconds is the time spent fetching.
+        """
+        start_time = time.perf_counter()
+        # Discovery listings are scheduled behind hydration in the shared request budget
+        with self.budget.priority("discovery"):
+            subreddit = self.reddit.subreddit(subreddit_name)
+            last_fullname, last_created_utc, updated_at = cursor or (None, None, None)
+
+            if mode == "new":
+                posts = []
+                # Limit to avoid hitting API limits
+                for post in subreddit.new(limit=limit):
+                    if post.fullname == last_fullname or (last_created_utc and post.created_utc <= last_created_utc):
+                        break
+                    posts.append(post)
+            else:
+                time_filter = "all"
+                if updated_at:
+                    elapsed = time.time() - updated_at + lookback
+                    time_filter = next((name for name, seconds in DISCOVERY_WINDOWS if elapsed <= seconds), "all")
+                # Limit to avoid hitting API limits
+                posts = list(subreddit.top(time_filter=time_filter, limit=limit))
+        return subreddit_name, posts, time.perf_counter() - start_time
+
+    def get_updated_posts(self, threshold_likes=1000, workers=4, mode="top"):
         """
         Get updated Reddit posts from subreddits.
 
+        The subreddit listings are fetched concurrently by a bounded pool of worker threads,
+        the shared request budget paces the requests they make. Each subreddit only fetches the
+        listing beyond its stored cursor, and the cursors are advanced once the results are
+        merged into one batch and checked against the database from the calling thread.
+
         Args:
-            subreddits (list): List of subreddit names.
             threshold_likes (int): Threshold for number of likes.
+            workers (int): The maximum number of subreddits fetched at once.
+            mode (str): Either "top" for the top listing by time window, or "new" for posts created since
+                the last run (posts below the threshold are listed again until they are older than the lookback).
 
         Returns:
             list: List of Reddit post objects.
         """
+        subreddit_names = [name for _, name, enabled in self.view_subreddits() if enabled]
+        cursors = self.__discovery_cursors(mode)
+        candidates = {}
+        new_cursors = []
+        self.discovery_timings = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(subreddit_names) or 1)), thread_name_prefix="discovery") as executor:
+            futures = [executor.submit(self.__fetch_listing, name, mode, cursors.get(name)) for name in subreddit_names]
+            for future in as_completed(futures):
+                try:
+                    subreddit_name, posts, seconds = future.result()
+                except (Forbidden, RequestException, RedditAPIException) as e:
+                    print(f"\033[31m\033[1m(#)\033[0m Error fetching subreddit listing: {e}.\n")
+                    continue
+                self.discovery_timings[subreddit_name] = seconds
+                for post in posts:
+                    if post.score >= threshold_likes:
+                        candidates[post.id] = post
+
+                # Advance the cursor to the newest post seen, keeping the old one if nothing new was listed
+                last_fullname, last_created_utc, _ = cursors.get(subreddit_name, (None, None, None))
+                if mode == "new":
+                    # Stop before the oldest post that may still reach the threshold, so the next run lists it again
+                    cutoff = time.time() - DISCOVERY_LOOKBACK
+                    for post in sorted(posts, key=lambda post: post.created_utc):
+                        if post.score < threshold_likes and post.created_utc > cutoff:
+                            break
+                        last_fullname, last_created_utc = post.fullname, post.created_utc
+                elif posts:
+                    newest = max(posts, key=lambda post: post.created_utc)
+                    if not last_created_utc or newest.created_utc > last_created_utc:
+                        last_fullname, last_created_utc = newest.fullname, newest.created_utc
+                new_cursors.append((subreddit_name, mode, last_fullname, last_created_utc, int(time.time())))
+
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO subreddit_cursors (subreddit, mode, last_fullname, last_created_utc, updated_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(subreddit, mode) DO UPDATE SET last_fullname=excluded.last_fullname,
+                       last_created_utc=excluded.last_created_utc, updated_at=excluded.updated_at""", new_cursors)
+
+        # Report the time spent on each subreddit, slowest first
+        for subreddit_name, seconds in sorted(self.discovery_timings.items(), key=lambda item: item[1], reverse=True):
+            print(f"\033[1m(#)\033[0m Fetched r/{subreddit_name} in {seconds:.2f} seconds.")
+        print()
+
+        # Look up the whole batch in one pass and compare hashes instead of full bodies
         updated_posts = []
-        subreddits = self.view_subreddits()
-        for subreddit_name in subreddits:
-            subreddit = self.reddit.subreddit(subreddit_name)
-            for post in subreddit.top(limit=100):  # Limit to avoid hitting API limits
-                if post.score >= threshold_likes:
-                    self.c.execute("SELECT * FROM posts WHERE id=?", (post.id,))
-                    existing_post = self.c.fetchone()
-                    if existing_post:
-                        # Check if post content has changed
-                        if existing_post[3] != post.selftext or existing_post[6] != post.edited:
-                            updated_posts.append(post)
-                    else:
-                        updated_posts.append(post)
+        stored = self.__stored_posts(list(candidates))
+        for post in candidates.values():
+            existing_post = stored.get(post.id)
+            if existing_post is None:
+                updated_posts.append(post)
+            # Check if post content has changed
+            elif existing_post[0] != content_hash(post.selftext) or existing_post[1] != float(post.edited or 0):
+                updated_posts.append(post)
         return updated_posts
 
+    def refresh_scores(self, max_age: int = 6 * 60 * 60, limit: int = 1000):
+        """
+        Refresh the scores of known posts, oldest refresh first.
+
+        This runs on a slower cadence than discovery, so discovery only has to read new content.
+        Posts are fetched 100 at a time through their fullnames.
+
+        Args:
+            max_age (int): Seconds after which a post's score is considered stale.
+            limit (int): The maximum number of posts refreshed in one call.
+
+        Returns:
+            int: The number of posts refreshed.
+        """
+        now = int(time.time())
+        post_ids = [row[0] for row in self.conn.execute(
+            """SELECT id FROM posts WHERE score_refreshed_at IS NULL OR score_refreshed_at < ?
+               ORDER BY score_refreshed_at IS NOT NULL, score_refreshed_at LIMIT ?""", (now - max_age, limit))]
+        if not post_ids:
+            return 0
+
+        rows = []
+        try:
+            for post in self.reddit.info(fullnames=[f"t3_{post_id}" for post_id in post_ids]):
+                rows.append((post.score, post.num_comments, now, post.id))
+        except (Forbidden, RequestException, RedditAPIException) as e:
+            print(f"\033[31m\033[1m(#)\033[0m Error refreshing post scores: {e}.\n")
+
+        with self.write_stats.timed() as batch, self.conn:
+            self.conn.executemany("UPDATE posts SET likes = ?, num_comments = ?, score_refreshed_at = ? WHERE id = ?", rows)
+            batch.rows = len(rows)
+        print(f"\033[1m(#)\033[0m Refreshed the scores of {len(rows)} posts.\n")
+        return len(rows)
+
     def get_from_url(self, url: str):
         """
         Retrieves information about a Reddit post from its URL.
@@ -257,50 +600,250 @@ class RedditAPI:
             - comments (int): The number of comments the post has received.
             - username (str): The username of the poster.
         """
+        # Fetching posts that are about to be rendered takes priority over other Reddit traffic
+        with self.budget.priority("hydration"):
+            return self.__get_from_url(url)
+
+    def __get_from_url(self, url: str):
         # Get post from URL
-        self.post = self.reddit.submission(url=url)
-        # Original content list
-        original_content = self.__filter_content(self.post.selftext)
-        # Split content into words
-        words = self.post.selftext.split()
-        # New content list: Group words into lists of strings with a maximum of three words
-        new_content = [' '.join(words[i:i+3]) for i in range(0, len(words), 3)]
-        
-        # Print both content lists
-        ##print("New Content:", new_content)
-        
+        post = self.reddit.submission(url=url)
+
         # Check to make sure the user has a profile image
         try:
             # Try to get the profile picture URL
-            profile_picture_url = self.post.author.icon_img
+            profile_picture_url = post.author.icon_img
         except AttributeError:
             # Use the default profile picture URL
-            profile_picture_url = "https://www.redditstatic.com/avatars/defaults/v2/avatar_default_3.png"
+            profile_picture_url = DEFAULT_AVATAR_URL
 
         # Check to make sure user has a name and isnt deleted
         try:
             # Try to get the users name
-            username = self.post.author.name
+            username = post.author.name
         except AttributeError:
             # Use the default profile picture URL
             username = "Deleted User"
 
+        return self.__submission_details(post, username, profile_picture_url)
+
+    def __post_details(self, subreddit: str, post_id: str, title: str, created_utc: float, selftext: str,
+                       likes: int, comments: int, username: str, profile_picture_url: str):
+        """
+        Build the post details used for rendering.
+
+        Args:
+            subreddit (str): The name of the subreddit.
+            post_id (str): The ID of the post.
+            title (str): The title of the post.
+            created_utc (float): The creation time of the post as a UTC timestamp.
+            selftext (str): The raw content of the post.
+            likes (int): The number of likes the post has received.
+            comments (int): The number of comments the post has received.
+            username (str): The username of the poster.
+            profile_picture_url (str): The URL of the poster's profile picture.
+
+        Returns:
+            dict: The post details, see get_from_url.
+        """
+        # Original content list
+        original_content = self.__filter_content(selftext)
+        # Split content into words
+        words = selftext.split()
+        # New content list: Group words into lists of strings with a maximum of three words
+        new_content = [' '.join(words[i:i+3]) for i in range(0, len(words), 3)]
+
         return {
-            "subreddit": self.post.subreddit.display_name,
-            "id": self.post.id,
-            "title": self.post.title,
-            "time": self.__utc_to_datetimestr(self.post.created_utc).split()[1],  # Extracting time part only
-            "date_posted": self.__utc_to_datetimestr(self.post.created_utc).split()[0],  # Extract date part
+            "subreddit": subreddit,
+            "id": post_id,
+            "title": title,
+            "time": self.__utc_to_datetimestr(created_utc).split()[1],  # Extracting time part only
+            "date_posted": self.__utc_to_datetimestr(created_utc).split()[0],  # Extract date part
             "content": original_content,
             "new_content": new_content,
-            "likes": self.post.score,
-            "comments": self.post.num_comments,
+            "likes": likes,
+            "comments": comments,
             "username": username, 
             "profile_picture_url": profile_picture_url
 
         }
-        
 
+    def __submission_details(self, submission, username: str, profile_picture_url: str):
+        """
+        Build the post details used for rendering from a submission.
+        """
+        return self.__post_details(submission.subreddit.display_name, submission.id, submission.title,
+                                   submission.created_utc, submission.selftext, submission.score,
+                                   submission.num_comments, username, profile_picture_url)
+
+    def __author_details(self, author_fullnames):
+        """
+        Fetch the names and profile pictures of many authors, 100 per request.
+
+        Args:
+            author_fullnames (iterable): Account fullnames such as "t2_abc123".
+
+        Returns:
+            dict: A mapping of fullname to a (name, profile_picture_url) tuple for every author found.
+        """
+        author_fullnames = sorted(set(author_fullnames) - {None})
+        authors = {}
+        for i in range(0, len(author_fullnames), 100):
+            try:
+                data = self.reddit.get("/api/user_data_by_account_ids",
+                                       params={"ids": ",".join(author_fullnames[i:i + 100])}) or {}
+            except (Forbidden, RequestException, RedditAPIException) as e:
+                print(f"\033[31m\033[1m(#)\033[0m Error fetching author details: {e}.\n")
+                continue
+            for fullname, author in data.items():
+                authors[fullname] = (author.get("name"), html.unescape(author.get("profile_img") or DEFAULT_AVATAR_URL))
+        return authors
+
+    def __author_fullnames(self, names):
+        """
+        Look up the account fullnames of authors by name, one request per author.
+
+        Only used for rows stored before the author fullname was recorded, the result is
+        stored with the posts so every author is looked up once.
+
+        Args:
+            names (iterable): Author names.
+
+        Returns:
+            dict: A mapping of name to fullname such as "t2_abc123" for every author found.
+        """
+        fullnames = {}
+        for name in sorted(set(names) - {None}):
+            try:
+                fullnames[name] = self.reddit.redditor(name).fullname
+            except (Forbidden, NotFound, RequestException, RedditAPIException, AttributeError) as e:
+                # Deleted and suspended accounts have no fullname, they keep the default avatar
+                print(f"\033[31m\033[1m(#)\033[0m Error looking up author {name}: {e}.\n")
+        return fullnames
+
+    def hydrate_posts(self, urls: list):
+        """
+        Retrieve the details of many Reddit posts with as few API calls as possible.
+
+        Posts are resolved 100 at a time through the fullname 'info' endpoint, and the
+        authors' names and profile pictures are fetched 100 at a time through
+        '/api/user_data_by_account_ids', instead of one submission and one redditor
+        request per post.
+
+        Args:
+            urls (list): URLs or IDs of the Reddit posts.
+
+        Returns:
+            dict: A mapping of each URL or ID given to its post details (see get_from_url).
+                URLs that could not be resolved are left out.
+        """
+        ids = {}
+        for url in urls:
+            try:
+                ids[url] = praw.models.Submission.id_from_url(url) if "/" in url else url
+            except praw.exceptions.InvalidURL:
+                print(f"\033[31m\033[1m(#)\033[0m '{url}' is not a valid Reddit post URL.\n")
+
+        with self.budget.priority("hydration"):
+            # Resolve the submissions, PRAW requests 100 fullnames per call
+            submissions = {}
+            for submission in self.reddit.info(fullnames=[f"t3_{post_id}" for post_id in sorted(set(ids.values()))]):
+                submissions[submission.id] = submission
+
+            # Prefetch the authors in bulk
+            authors = self.__author_details(getattr(submission, "author_fullname", None) for submission in submissions.values())
+
+        posts = {}
+        for url, post_id in ids.items():
+            submission = submissions.get(post_id)
+            if submission is None:
+                print(f"\033[31m\033[1m(#)\033[0m Post '{url}' could not be found.\n")
+                continue
+            author = authors.get(getattr(submission, "author_fullname", None))
+            if author:
+                username, profile_picture_url = author
+            else:
+                username = submission.author.name if submission.author else "Deleted User"
+                profile_picture_url = DEFAULT_AVATAR_URL
+            posts[url] = self.__submission_details(submission, username, profile_picture_url)
+        return posts
+
+    def posts_for_render(self, post_ids: list):
+        """
+        Build the post details for rendering from the rows stored in the database.
+
+        Missing profile picture URLs are resolved in bulk and cached in the database, with
+        the default avatar used if Reddit is unavailable. Rows stored without the author's
+        fullname have it looked up by author name first. Only rows missing their content
+        or comment count are fetched from Reddit again, also in bulk.
+
+        Args:
+            post_ids (list): The IDs of the posts.
+
+        Returns:
+            dict: A mapping of post ID to its post details (see get_from_url).
+        """
+        rows = {}
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(
+                    f"""SELECT id, subreddit, title, created_utc, content, likes, num_comments, author,
+                               author_fullname, avatar_url, url
+                        FROM posts WHERE id IN ({placeholders})""", chunk):
+                rows[row.id] = row
+
+        # Rows stored before the author fullname was recorded resolve it by name, then their profile picture as usual
+        unresolved = {row.author for row in rows.values() if row.avatar_url is None and not row.author_fullname}
+        if unresolved:
+            with self.budget.priority("hydration"):
+                fullnames = self.__author_fullnames(unresolved)
+            with self.conn:
+                self.conn.executemany("UPDATE posts SET author_fullname = ? WHERE author = ? AND author_fullname IS NULL",
+                                      [(fullname, name) for name, fullname in fullnames.items()])
+            for post_id, row in rows.items():
+                if not row.author_fullname and row.author in fullnames:
+                    rows[post_id] = row._replace(author_fullname=fullnames[row.author])
+
+        # Resolve and cache the profile pictures that are not stored yet
+        missing = {row.author_fullname for row in rows.values() if row.avatar_url is None and row.author_fullname}
+        if missing:
+            with self.budget.priority("hydration"):
+                authors = self.__author_details(missing)
+            with self.conn:
+                self.conn.executemany("UPDATE posts SET avatar_url = ? WHERE author_fullname = ?",
+                                      [(avatar_url, fullname) for fullname, (_, avatar_url) in authors.items()])
+            for post_id, row in rows.items():
+                if row.avatar_url is None and row.author_fullname in authors:
+                    rows[post_id] = row._replace(avatar_url=authors[row.author_fullname][1])
+
+        posts = {}
+        refetch = []
+        for post_id, row in rows.items():
+            if row.content is None or row.num_comments is None or row.created_utc is None:
+                refetch.append(row.url)
+                continue
+            posts[post_id] = self.__post_details(row.subreddit, post_id, row.title, row.created_utc, row.content, row.likes,
+                                                 row.num_comments, row.author or "Deleted User", row.avatar_url or DEFAULT_AVATAR_URL)
+
+        # Fall back to the API for rows with missing fields
+        if refetch:
+            for post in self.hydrate_posts(refetch).values():
+                posts[post["id"]] = post
+        return posts
+
+    def generate_videos(self, urls: list):
+        """
+        Generate videos for many Reddit posts, hydrating them in bulk first.
+
+        Args:
+            urls (list): URLs or IDs of the Reddit posts.
+        """
+        posts = self.hydrate_posts(urls)
+        for url, post in tqdm(posts.items(), desc="Generating Videos", unit="video"):
+            try:
+                self.generateVideo(url, post)
+            except Exception as e:
+                print(f"\033[31m\033[1m(#)\033[0m Error generating video for {url}: {e}\n")
 
     def get_top_posts(self, subreddit: str, limit: int = 10):
         """
@@ -320,329 +863,351 @@ class RedditAPI:
                 - content: The filtered content of the post.
         """
         # Set the subreddit
-        self.subreddit = self.reddit.subreddit(subreddit)
+        subreddit = self.reddit.subreddit(subreddit)
 
-        self.final = []  # Init final list to store data
+        final = []  # Init final list to store data
         # Get top posts from subreddit
-        for iter_post in self.subreddit.top(limit=limit):
-            self.final.append({
+        for iter_post in subreddit.top(limit=limit):
+            final.append({
                 "subreddit": iter_post.subreddit.display_name,
                 "id": iter_post.id,
                 "title": iter_post.title,
                 "time": self.__utc_to_datetimestr(iter_post.created_utc),
                 "content": self.__filter_content(iter_post.selftext)
             })
-        return self.final
+        return final
     
-    def add_text(self, draw, text, position, font, size, color, max_width=None, max_height=None):
+    def generateVideo(self, url, post=None):
         """
-        Adds text to the image with optional wrapping based on maximum width and height.
+        Generate the video of a Reddit post, running every stage in turn.
 
         Args:
-            draw (ImageDraw): The ImageDraw object for drawing text on the image.
-            text (str): The text to be added.
-            position (tuple): The position where the text should start (x, y).
-            font (str): The path to the font file.
-            size (int): The font size.
-            color (str): The color of the text.
-            max_width (int, optional): The maximum width for the wrapped text.
-            max_height (int, optional): The maximum height for the wrapped text.
+            url (str): URL of the post.
+            post (dict, optional): The post details, fetched from the URL if not given.
+        """
+        # Get the post from the URL, unless it was already hydrated
+        if post is None:
+            post = self.get_from_url(url)
+
+        # The post was asked for explicitly, so a predicted length only warns instead of skipping it
+        background, reason = self.__fit_background(post["id"], [post["title"]] + post["content"],
+                                                   self.durations.model(TTS_VOICE, TTS_SPEED), background_durations())
+        if reason:
+            print(f"\033[31m\033[1m(#)\033[0m Post ID {post['id']} may not fit, {reason}. Rendering it anyway.\n")
+        task = self.generator.generate(post, background)
+        self.record_durations(task["checkpoints"].get("audio"))
+
+    def __fit_background(self, post_id: str, sentences: list, model, backgrounds: dict):
+        """
+        Estimate the length of a post's voice over and pick a background that covers it.
+
+        Args:
+            post_id (str): The ID of the post.
+            sentences (list): The script, the title followed by the filtered sentences.
+            model (DurationModel): The duration model of the voice over.
+            backgrounds (dict): A mapping of background file name to length, see background_durations.
 
         Returns:
-            None
-        """
-        # Load the font
-        font = ImageFont.truetype(font, size)
-
-        # Check if maximum width and height are specified
-        if max_width is not None and max_height is not None:
-            # Split the text into words
-            words = text.split()
-
-            # Initialize variables for wrapped text
-            wrapped_text = ''
-            line = ''
-            lines = []
-
-            # Iterate over each word and wrap text based on max width
-            for word in words:
-                # Check if adding the word exceeds the max width
-                if draw.textlength(line + ' ' + word, font=font) <= max_width:
-                    # If not, add the word to the current line
-                    line += ' ' + word if line else word
+            tuple: The chosen background (None for a random one) and the reason the post was rejected, or None if it was admitted.
+        """
+        expected, upper = model.estimate(sentences)
+        if self.platform_limit and expected > self.platform_limit:
+            return None, f"its voice over is estimated at {expected:.0f}s, over the {self.platform_limit:g}s platform limit"
+        if not backgrounds:
+            # The background lengths could not be read, leave the choice to the editor
+            return None, None
+        # Prefer a background that covers even a pessimistic estimate
+        background = choose_background(upper, backgrounds)
+        if background is None:
+            longest, longest_seconds = max(backgrounds.items(), key=lambda item: item[1])
+            if longest_seconds < expected:
+                return None, f"its voice over is estimated at {expected:.0f}s, longer than the longest background ({longest_seconds:.0f}s)"
+            print(f"\033[1m(#)\033[0m Post ID {post_id} is estimated at {expected:.0f}s to {upper:.0f}s and may not fit the longest background ({longest_seconds:.0f}s).\n")
+            background = longest
+        return background, None
+
+    def admit(self, post_ids: list):
+        """
+        Decide which posts can be produced before any TTS is paid for, and pick their backgrounds.
+
+        The length of every post's voice over is predicted from its script by the duration
+        estimator. Posts estimated to be longer than the platform limit or than every
+        background are marked VIDEO_TOO_LONG and are not queued. Pass it as the admit
+        callback of JobQueue.enqueue.
+
+        Args:
+            post_ids (list): The IDs of the candidate posts.
+
+        Returns:
+            dict: A mapping of every admitted post ID to its background, None where it is chosen at render time.
+        """
+        model = self.durations.model(TTS_VOICE, TTS_SPEED)
+        backgrounds = background_durations()
+        admitted = {}
+        rejected = []
+        for i in range(0, len(post_ids), 500):
+            chunk = post_ids[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(f"SELECT id, title, content FROM posts WHERE id IN ({placeholders})", chunk).fetchall():
+                if row.content is None:
+                    # The content is fetched at render time, nothing to estimate yet
+                    admitted[row.id] = None
+                    continue
+                background, reason = self.__fit_background(row.id, [row.title] + self.__filter_content(row.content), model, backgrounds)
+                if reason:
+                    rejected.append((row.id, reason))
                 else:
-                    # If adding the word exceeds the max width, start a new line
-                    lines.append(line)
-                    line = word
-
-            # Add the last line
-            lines.append(line)
-
-            # Reset text to wrapped lines
-            text = '\n'.join(lines)
-
-        # Draw the text on the image
-        draw.text(position, text, font=font, fill=color)
-
-        return
-
-    def generateVideo(self, url):
-        # Get the post from the URL
-        post = self.get_from_url(url)
-
-        # Split the time string and keep only the hours and minutes
-        time_parts = post["time"].split(":")
-        # Reconstruct the time string with only hours and minutes
-        time_only_hh_mm = ":".join(time_parts[:2])
-
-        # Print to termninal what content we are generating 
-        print("\n \033[1m(#)\033[0m Generating video content for, " + post["username"] + " - " + post["title"] + " - " + post["date_posted"])
-
-        # Print the post details
-        #print("\n \033[1m Subred:\033[0m", post["subreddit"])
-        #print("\033[1m ID:\033[0m", post["id"])
-        #print("\033[1m Title:\033[0m", post["title"])
-        #print("\033[1m Time:\033[0m", time_only_hh_mm)
-        #print("\033[1m Date posted:\033[0m", post["date_posted"])
-        #print("\033[1m No. of lines:\033[0m", len(post["content"]))
-        #print("\033[1m Likes:\033[0m", post["likes"])
-        #print("\033[1m Comments:\033[0m", post["comments"])
-        #print("\033[1m Username:\033[0m", post["username"])
-        #print("\033[1m Profile picture:\033[0m", post["profile_picture_url"])
-        #print("\n")
-
-
-        #print("\033[1m(#)\033[0m Generating Redit Post Mockup")
-        # Load the image from input path
-        background_image_path = "inputs/6365678-ai.png"
-        background_image = Image.open(background_image_path)
-        draw = ImageDraw.Draw(background_image)
-
-        # Define font settings
-        font_roboto_medium = "fonts/Roboto-Medium.ttf"
-        font_roboto = "fonts/Roboto-Regular.ttf"
-        font_roboto_light = "fonts/Roboto-Light.ttf"
-
-        # Define maximum width and height for the title
-        max_title_width = 501  # Maximum width in pixels
-        max_title_height = 68  # Maximum height in pixels
-
-        # Add text to the image
-        self.add_text(draw, post["username"], (188, 78), font_roboto_medium, 24, "#000000")  # Username
-        self.add_text(draw, post["title"], (103, 141), font_roboto, 20, "#000000", max_width=max_title_width, max_height=max_title_height)  # Title
-        self.add_text(draw, (time_only_hh_mm + "  .  "), (104, 274), font_roboto, 13.4, "#b0b0b0")  # Time
-        self.add_text(draw, post["date_posted"], (150, 274), font_roboto, 13.4, "#b0b0b0")  # Date
-        self.add_text(draw, str(post["likes"]), (240, 310), font_roboto_light, 12.34, "#666666")  # Likes
-        self.add_text(draw, str(post["comments"]), (127, 310), font_roboto_light, 12.34, "#666666")  # Comments
-
-        profile_pic_url = post["profile_picture_url"]
-        response = requests.get(profile_pic_url)
-        if response.status_code == 200:
-            profile_pic_path = "temp/profile_pic.png"
-            with open(profile_pic_path, "wb") as f:
-                f.write(response.content)
-
-            # Load profile picture and mask
-            profile_pic = Image.open(profile_pic_path)
-            mask = Image.open('inputs/mask.png').convert('L')
-
-            # Resize profile picture to fit the mask
-            output = ImageOps.fit(profile_pic, mask.size, centering=(0.5, 0.5))
-            output.putalpha(mask)
-
-            # Paste profile picture onto the main image
-            background_image.paste(output, (int(102.72), int(51.6)), output)
-
-            # Save the modified image to output path
-            output_path = f"temp/redit_mockup.png"
-            background_image.save(output_path)
-        else:
-            print("\033[1m(#)\033[0m Failed to download the profile picture, using default.\n")
-            # Save the modified image to output path without the profile picture
-            output_path = f"temp/redit_mockup.png"
-            background_image.save(output_path)
-
-
-        # Ask if the user wants to proceed
-        #proceed = input("Do you want to proceed? (Y/n)\n")
-        #if not proceed:
-        #    proceed = "y"
-        #if proceed.lower() != "y":
-        #    print("\033[1m(#)\033[0m Exiting")
-        #    exit(0)
-        proceed = "y"
-
-        #print("\033[1m(#)\033[0m Generating TTS")
-        # Create the audio files for each sentence using the script
-        script = []
-        shorteneddialoguescript = []
-        content = [post["title"]] + post["content"]
-        new_content = [post["title"]] + post["new_content"]
-
-        # TTS for Voice over
-        with tqdm(total=len(content), desc="Generating TTS", unit="file") as pbar:
-            for item, i in zip(content, range(len(content))):
-                filename = f"temp/temp_{post['id']}_{i}.mp3"
-                tts(item, "en_us_006", filename, 1.15)
-                dur = get_duration(filename)
-                script.append((item, dur))
-                pbar.update(1)
+                    admitted[row.id] = background
 
-        # Clearing the progress bar from the terminal
-        sys.stdout.write("\033[F")  # Move cursor up one line
-        sys.stdout.write("\033[K")  # Clear line
+        for post_id, reason in rejected:
+            print(f"\033[31m\033[1m(#)\033[0m Post ID {post_id} will not be rendered, {reason}.\n")
+            self.set_video_state(post_id, VIDEO_TOO_LONG)
+        if post_ids:
+            print(f"\033[1m(#)\033[0m Admitted {len(admitted)} of {len(post_ids)} posts, voice over model: {model}.\n")
+        return admitted
 
+    def record_durations(self, artifacts: dict):
+        """
+        Record the sentence lengths of a synthesized voice over for the duration estimator.
 
-        # Create the srt using the script
-        srt_path = f"inputs/{post['id']}.srt"
-        gen_srt_file(script, srt_path, 0.1)
+        Args:
+            artifacts (dict): The audio checkpoint of a video.
+        """
+        if artifacts and artifacts.get("script"):
+            self.durations.record(artifacts["voice"], artifacts["speed"], artifacts["script"])
 
-        # Merge the audio files into one
-        wav_path = f"inputs/{post['id']}.wav"
-        totaldur = merge_audio_files(wav_path, 0.1)
-        #print("\033[1m(#)\033[0m Merged audio duration:", totaldur, "seconds")
+    def set_video_state(self, post_id, state):
+        """
+        Set the render state of a post and record when it changed.
 
-        # Create the video
-        video_title = str(post["username"] + " - " + post["title"] + " - " + post["date_posted"])
-        v = VideoEditor(totaldur, srt_path, wav_path, False)
-        v.start_render(f"outputs/{video_title}.mp4")
+        Args:
+            post_id (str): The ID of the post.
+            state (int): One of VIDEO_PENDING, VIDEO_FAILED or VIDEO_TOO_LONG, see mark_rendered for VIDEO_MADE.
+        """
+        now = int(time.time())
+        with self.conn:
+            self.conn.execute(
+                """UPDATE posts SET video_made = ?, state_updated_at = ?,
+                       video_made_at = CASE WHEN ? = ? THEN ? ELSE video_made_at END
+                   WHERE id = ?""",
+                (state, now, state, VIDEO_MADE, now, post_id))
+
+    def mark_rendered(self, post_id: str, version_hash: str):
+        """
+        Record that a version of a post's content was rendered.
+
+        The post is only marked VIDEO_MADE while that version is still its current one. A post
+        edited during the render stays VIDEO_PENDING, so its new version is queued again.
+
+        Args:
+            post_id (str): The ID of the post.
+            version_hash (str): The version the video was rendered from, see JobQueue.claim.
 
-        # Clean up the temp directory
-        files_to_delete = os.listdir("temp")
-        with tqdm(total=len(files_to_delete), desc="Deleting files", unit="file") as pbar:
-            # Iterate over the files in the directory and delete them
-            for filename in files_to_delete:
-                filepath = os.path.join("temp", filename)
+        Returns:
+            bool: False if the post has moved on to a newer version.
+        """
+        now = int(time.time())
+        with self.conn:
+            made = self.conn.execute(
+                """UPDATE posts SET video_made = ?, state_updated_at = ?, video_made_at = ?
+                   WHERE id = ? AND version_hash IS ?""",
+                (VIDEO_MADE, now, now, post_id, version_hash)).rowcount > 0
+            self.conn.execute("UPDATE post_versions SET rendered_at = ? WHERE post_id = ? AND content_hash = ?",
+                              (now, post_id, version_hash))
+        if not made:
+            print(f"\033[1m(#)\033[0m Post ID {post_id} was edited while it rendered, its new version will be queued again.\n")
+        return made
+
+    def run_jobs(self, desc: str, stage_workers: tuple = STAGE_WORKERS):
+        """
+        Drain the render queue, generating a video for every job that can be claimed now.
+
+        Jobs run through a pipeline of the prepare, audio and render stages, so while one
+        video renders the next one's audio is already being synthesized. Jobs are only
+        claimed as fast as the first stage accepts them. Jobs that fail are retried with
+        backoff on a later run, resuming from the first stage without a checkpoint, and
+        marked VIDEO_FAILED once they are dead-lettered. Other workers may drain the same
+        queue at the same time.
+
+        Args:
+            desc (str): The description of the progress bar.
+            stage_workers (tuple): The number of threads of the prepare, audio and render stages.
+        """
+        owner = worker_name()
+        # Remove the workspaces of failed videos that were never retried
+        collect_workspaces(active=self.jobs.leased())
+        available = self.jobs.available()
+        # Render from the stored rows instead of fetching every post from Reddit again
+        stored = self.posts_for_render(available)
+        pbar = tqdm(total=len(available), desc=desc, unit="video")
+
+        def claimed_jobs():
+            while True:
+                job = self.jobs.claim(owner)
+                if job is None:
+                    return
                 try:
-                    if os.path.isfile(filepath):
-                        os.remove(filepath)
-                        pbar.update(1)  # Update progress bar
+                    post = stored.pop(job.post_id, None)
+                    if post is None:
+                        post = self.posts_for_render([job.post_id]).get(job.post_id)
+                    if post is None:
+                        post = self.get_from_url(job.url)
                 except Exception as e:
-                    print(f"\033[31m\033[1m(#)\033[0m Error occurred while deleting {filename}: {str(e)}")
-                    print("\n") # Used so the progress bar wont clear the error
+                    # The post could not be loaded, count it as a failed attempt and move on to the next job
+                    print(f"\033[31m\033[1m(#)\033[0m Error loading post ID {job.post_id} (attempt {job.attempts} of {job.max_attempts}): {e}\n")
+                    if self.jobs.fail(job.id, f"claim: {e}", owner=owner):
+                        self.set_video_state(job.post_id, VIDEO_FAILED)
+                    pbar.update(1)
+                    continue
+                # Keep the lease alive while the job waits in and moves through the pipeline
+                yield {"job": job, "url": job.url, "post": post, "checkpoints": json.loads(job.checkpoints or "{}"),
+                       "background": job.background, "keep_alive": self.jobs.keep_alive(job, owner).start()}
+
+        def on_done(task):
+            job = task["job"]
+            task["keep_alive"].stop()
+            if not self.jobs.complete(job.id, owner, task.get("timings"), task.get("output_path")):
+                print(f"\033[31m\033[1m(#)\033[0m Lost the lease on job {job.id} before it finished, the worker now holding it will store the video.\n")
+                pbar.update(1)
+                return
+            self.mark_rendered(job.post_id, job.version_hash)
+            # The video is stored, its artifacts are no longer needed for a retry
+            self.generator.cleanup(task)
+            pbar.update(1)
+
+        def on_error(task, stage, e):
+            job = task["job"]
+            task["keep_alive"].stop()
+            print(f"\033[31m\033[1m(#)\033[0m Error generating video for post ID {job.post_id} in the {stage} stage (attempt {job.attempts} of {job.max_attempts}): {e}\n")
+            if self.jobs.fail(job.id, f"{stage}: {e}", task.get("timings"), owner=owner):
+                self.set_video_state(job.post_id, VIDEO_FAILED)
+            pbar.update(1)
+
+        def on_checkpoint(task, stage, artifacts):
+            self.jobs.checkpoint(task["job"].id, owner, stage, artifacts)
+            if stage == "audio":
+                self.record_durations(artifacts)
+
+        pipeline = self.generator.pipeline(stage_workers, on_checkpoint)
+        pipeline.run(claimed_jobs(), on_done, on_error,
+                     on_stage=lambda task, stage: task["keep_alive"].set_stage(stage))
+        pbar.close()
+        print(f"\033[1m(#)\033[0m Stage timings: {pipeline}\n")
+
+    def __drain(self, desc: str, workers: int = 1, stage_workers: tuple = STAGE_WORKERS):
+        """
+        Drain the render queue in this process, or in several worker processes at once.
 
-        # Clearing the progress bar from the terminal
-        sys.stdout.write("\033[F")  # Move cursor up one line
-        sys.stdout.write("\033[K")  # Clear line
-   
-    def process_unmade_videos(self):
+        Args:
+            desc (str): The description of the progress bars.
+            workers (int): The number of worker processes, 1 runs in this process.
+            stage_workers (tuple): The number of threads of each stage in every process.
         """
-        Process posts with video_made set to False.
+        if workers <= 1:
+            self.run_jobs(desc, stage_workers)
+            return
+        # Spawned rather than forked so no threads or connections of this process are inherited
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [executor.submit(_run_jobs_worker, self.__credentials, shared_cache.mode, shared_cache.directory,
+                                       f"{desc} (worker {i + 1})", stage_workers) for i in range(workers)]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"\033[31m\033[1m(#)\033[0m A video worker stopped unexpectedly: {e}\n")
+
+    def process_unmade_videos(self, workers: int = 1, stage_workers: tuple = STAGE_WORKERS):
         """
-        # Fetch posts where video_made is False
-        self.c.execute("SELECT id, url FROM posts WHERE video_made = 0")
-        unmade_videos = self.c.fetchall()
-        
-        # Iterate through unmade videos and generate video with progress bar
-        for post_id, post_url in tqdm(unmade_videos, desc="Generating Videos", unit="video"):
-            try:
-                # Call generateVideo method of the current instance
-                self.generateVideo(post_url)
-                
-                # Update video_made to True for the processed post
-                self.c.execute("UPDATE posts SET video_made = 1 WHERE id = ?", (post_id,))
-                self.conn.commit()
-            except Exception as e:
-                print(f"\033[31m\033[1m(#)\033[0m Error generating video for post ID {post_id}: {e}\n")
-                self.c.execute("UPDATE posts SET video_made = 3 WHERE id = ?", (post_id,))
-                self.conn.commit()
-                continue  # Move to the next iteration if an error occurs
+        Process posts with video_made set to False.
 
+        Args:
+            workers (int): The number of worker processes draining the queue.
+            stage_workers (tuple): The number of threads of the prepare, audio and render stages in every process.
+        """
+        # Queue posts where video_made is False, reposts of rendered stories are marked VIDEO_DUPLICATE and skipped,
+        # posts too long for every background or the platform are marked VIDEO_TOO_LONG
+        self.jobs.enqueue(VIDEO_PENDING, admit=self.admit)
+        # Drain the queue, including retries whose backoff has passed
+        self.__drain("Generating Videos", workers, stage_workers)
 
-    def retry_errors(self):
+    def retry_errors(self, workers: int = 1, stage_workers: tuple = STAGE_WORKERS):
         """
         Retry generating videos for posts that previously encountered errors.
+
+        Args:
+            workers (int): The number of worker processes draining the queue.
+            stage_workers (tuple): The number of threads of the prepare, audio and render stages in every process.
         """
-        # Fetch posts where video_made is 3 (failed)
-        self.c.execute("SELECT id, url FROM posts WHERE video_made = 3")
-        error_videos = self.c.fetchall()
-        
-        # Iterate through error videos and attempt to generate video with progress bar
-        for post_id, post_url in tqdm(error_videos, desc="Retrying Errors", unit="video"):
-            try:
-                # Call generateVideo method of the current instance
-                self.generateVideo(post_url)
-                
-                # Update video_made to 1 for the successfully processed post
-                self.c.execute("UPDATE posts SET video_made = 1 WHERE id = ?", (post_id,))
-                self.conn.commit()
-            except Exception as e:
-                print(f"\033[31m\033[1m(#)\033[0m Error retrying video for post ID {post_id}: {e}\n")
-                continue  # Move to the next iteration if an error occurs
+        # Give dead-lettered jobs a fresh set of attempts and queue failed posts without a job
+        self.jobs.requeue_dead()
+        self.jobs.enqueue(VIDEO_FAILED, admit=self.admit)
+        # Posts rejected as too long are checked again, longer backgrounds may have been added since
+        self.jobs.enqueue(VIDEO_TOO_LONG, admit=self.admit)
+        self.__drain("Retrying Errors", workers, stage_workers)
 
 
-    def check_for_similar_titles(self):
+    def check_for_similar_titles(self, threshold: float = TITLE_SIMILARITY_THRESHOLD):
         """
         Check for new posts with similar titles by previous posters in the database.
+
+        Args:
+            threshold (float): The minimum title similarity for a post to count as an update.
         """
         try:
-            # Fetch all authors from the database
-            self.c.execute("SELECT DISTINCT author FROM posts")
-            authors = self.c.fetchall()
-
-            # Initialize tqdm with the total number of authors
-            progress_bar = tqdm(authors, desc="Checking for similar titles", unit="author")
-
-            # Iterate over each author
-            for author in progress_bar:
-                author = author[0]
-                # Fetch all posts by the author
-                self.c.execute("SELECT title FROM posts WHERE author=?", (author,))
-                titles = self.c.fetchall()
-                titles = [title[0] for title in titles]  # Extract titles from tuples
-
-                # Fetch new posts by the author from Reddit API
-                url = f"https://www.reddit.com/user/{author}/submitted/.json"
-                headers = {"User-Agent": "ReditStoryCapture/1.0"}
-
-                try:
-                    response = requests.get(url, headers=headers)
-                    response.raise_for_status()  # Raise exception for 4XX and 5XX status codes
-                    data = response.json()
-
-                    # Parse the JSON data and process the submissions
-                    for post in data["data"]["children"]:
-                        post_data = post["data"]
-                        post_title = post_data["title"]
-                        post_id = post_data["id"]
-                        post_subreddit = post_data["subreddit"]
-                        post_selftext = post_data["selftext"]
-                        post_score = post_data["score"]
-                        post_author = post_data["author"]
-                        post_created_utc = post_data["created_utc"]
-                        post_url = post_data["url"]
-
-                        if any(title.lower() in post_title.lower() for title in titles):
-                            # If similar title found, check if post already exists in the database
-                            self.c.execute("SELECT * FROM posts WHERE id=?", (post_id,))
-                            existing_post = self.c.fetchone()
-                            if not existing_post:
-                                # If post doesn't exist, add it to the database
-                                self.c.execute("INSERT INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                                    (post_id, post_subreddit, post_title, post_selftext,
-                                        post_score, post_author if post_author else None,
-                                        post_created_utc, post_url))
-                                self.conn.commit()
-                                # Generate post for the new update
-                                self.generate_post(post_url)
-                                # Print statement for the new update
-                                print(f"\033[1m(#)\033[0m A new update post has been found by {post_author} titled '{post_title}' posted on {post_created_utc}.\n")
-
-                except requests.RequestException as e:
-                    # Suppress printing for 403 Forbidden errors
-                    if response.status_code == 403:
-                        continue
-                except RedditAPIException as e:
-                    print(f"\033[31m\033[1m(#)\033[0m Reddit API error: {e}.\n")
-
-            # Close the progress bar
-            progress_bar.close()
+            # Fetch the feeds of every author due for a check, unchanged feeds are skipped
+            feeds = self.feed_checker.check()
+
+            # Update posts found in this pass, keyed by post ID
+            new_posts = {}
+
+            # Iterate over each changed feed
+            for author, submissions in feeds.items():
+                # Parse the JSON data and process the submissions
+                for post_data in submissions:
+                    post_title = post_data["title"]
+                    post_id = post_data["id"]
+                    post_subreddit = post_data["subreddit"]
+                    post_selftext = post_data["selftext"]
+                    post_score = post_data["score"]
+                    post_author = post_data["author"]
+                    post_created_utc = post_data["created_utc"]
+                    post_url = post_data["url"]
+
+                    # Look up the author's stored posts with a similar title in the title index
+                    if self.title_index.candidates(post_title, author, threshold):
+                        # If similar title found, check if post already exists in the database
+                        existing_post = self.conn.execute("SELECT 1 FROM posts WHERE id=?", (post_id,)).fetchone()
+                        if not existing_post and post_id not in new_posts:
+                            # If post doesn't exist, queue it for the batched insert
+                            new_posts[post_id] = (post_id, post_subreddit, post_title, post_selftext,
+                                post_score, post_author if post_author else None,
+                                post_created_utc, post_url, int(time.time()), content_hash(post_selftext),
+                                self.version_hash(post_selftext), post_data.get("num_comments"),
+                                post_data.get("author_fullname"))
+
+            # Add all update posts found in this pass in one transaction
+            with self.write_stats.timed() as batch, self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO posts (id, subreddit, title, content, likes, author, created_utc, url, discovered_at, content_hash, version_hash, num_comments, author_fullname) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                      list(new_posts.values()))
+                self.conn.executemany("INSERT OR IGNORE INTO post_versions (post_id, content_hash, content, created_at) VALUES (?, ?, ?, ?)",
+                                      [(row[0], row[10], row[3], row[8]) for row in new_posts.values()])
+                self.title_index.add_many((row[0], row[5], row[2]) for row in new_posts.values())
+                duplicates = self.__mark_duplicates((row[0], row[3]) for row in new_posts.values())
+                batch.rows = 2 * len(new_posts)
+
+            skipped = {post_id for post_id, _, _ in duplicates}
+            for post_id, post_subreddit, post_title, _, _, post_author, post_created_utc, post_url, *_ in new_posts.values():
+                if post_id in skipped:
+                    # Print statement for update posts that repost a rendered story
+                    print(f"\033[1m(#)\033[0m Update post {post_id} by {post_author} is a repost of a rendered story and will be skipped.\n")
+                    continue
+                # Generate post for the new update
+                self.generate_post(post_url)
+                # Print statement for the new update
+                print(f"\033[1m(#)\033[0m A new update post has been found by {post_author} titled '{post_title}' posted on {post_created_utc}.\n")
 
         except Exception as e:
             print(f"\033[31m\033[1m(#)\033[0m An unexpected error occurred when looking for update content: {e}.\n")
-        # Implement rate limiting to avoid exceeding API limits
-        finally:
-            time.sleep(0.5)  # Sleep for 0.5 seconds to avoid rate limiting
 
 
     def clear_database_entries(self):
@@ -651,8 +1216,13 @@ class RedditAPI:
         """
         try:
             # Clear all entries from the 'posts' table
-            self.c.execute("DELETE FROM posts")
-            self.conn.commit()
+            conn = self.conn
+            with conn:
+                conn.execute("DELETE FROM posts")
+                conn.execute("DELETE FROM post_versions")
+                TitleIndex(conn).remove()
+                FingerprintIndex(conn).remove()
+                self.jobs.remove()
             print("\033[1m(#)\033[0m All entries cleared from the database.")
         except Exception as e:
             print(f"\033[31m\033[1m(#)\033[0m Error clearing database entries: {e}\n")
@@ -664,8 +1234,13 @@ class RedditAPI:
         """
         try:
             # Remove the entry with the specified post ID from the 'posts' table
-            self.c.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-            self.conn.commit()
+            conn = self.conn
+            with conn:
+                conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+                conn.execute("DELETE FROM post_versions WHERE post_id = ?", (post_id,))
+                TitleIndex(conn).remove(post_id)
+                FingerprintIndex(conn).remove(post_id)
+                self.jobs.remove(post_id)
             print("\033[1m(#)\033[0m Entry with post ID", post_id, "removed from the database.")
         except Exception as e:
             print(f"\033[31m\033[1m(#)\033[0m Error removing entry with post ID {post_id}: {e}\n")
@@ -674,16 +1249,15 @@ class RedditAPI:
         """
         View all entries in the 'subreddits' table.
         """
-        self.c.execute("SELECT * FROM subreddits")
-        return self.c.fetchall()
+        return self.conn.execute("SELECT * FROM subreddits").fetchall()
 
     def add_subreddit(self, name, enabled=1):
         """
         Add a new subreddit entry to the 'subreddits' table.
         """
         try:
-            self.c.execute("INSERT INTO subreddits (name, enabled) VALUES (?, ?)", (name, enabled))
-            self.conn.commit()
+            with self.conn as conn:
+                conn.execute("INSERT INTO subreddits (name, enabled) VALUES (?, ?)", (name, enabled))
             print("\033[1m(#)\033[0m Subreddit", name, "added to the 'subreddits' table.")
         except sqlite3.IntegrityError:
             print(f"\033[31m\033[1m(#)\033[0m Subreddit {name} already exists in the 'subreddits' table.\n")
@@ -693,8 +1267,8 @@ class RedditAPI:
         Remove a subreddit entry from the 'subreddits' table.
         """
         try:
-            self.c.execute("DELETE FROM subreddits WHERE name = ?", (name,))
-            self.conn.commit()
+            with self.conn as conn:
+                conn.execute("DELETE FROM subreddits WHERE name = ?", (name,))
             print("\033[1m(#)\033[0m Subreddit", name, "removed from the 'subreddits' table.")
         except sqlite3.IntegrityError:
             print(f"\033[31m\033[1m(#)\033[0m Subreddit {name} does not exist in the 'subreddits' table.\n")
@@ -708,8 +1282,8 @@ class RedditAPI:
         """
         try:
             # Update the 'enabled' status of the specified subreddit to 0
-            self.c.execute("UPDATE subreddits SET enabled = 0 WHERE subreddit = ?", (subreddit_name,))
-            self.conn.commit()
+            with self.conn as conn:
+                conn.execute("UPDATE subreddits SET enabled = 0 WHERE name = ?", (subreddit_name,))
             print(f"Subreddit '{subreddit_name}' disabled successfully.")
         except sqlite3.Error as e:
             print(f"Error disabling subreddit '{subreddit_name}': {e}")        
@@ -719,16 +1293,17 @@ class RedditAPI:
         """
         View all entries in the 'filters' table.
         """
-        self.c.execute("SELECT * FROM filters")
-        return self.c.fetchall()
+        return self.conn.execute("SELECT * FROM filters").fetchall()
 
     def add_filter(self, word):
         """
         Add a new word entry to the 'filters' table.
         """
         try:
-            self.c.execute("INSERT INTO filters (word) VALUES (?)", (word,))
-            self.conn.commit()
+            with self.conn as conn:
+                conn.execute("INSERT INTO filters (word) VALUES (?)", (word,))
+            # Recompile the censor engine on next use
+            self.__censor = None
             print("\033[1m(#)\033[0m Filter word", word, "added to the 'filters' table.")
         except sqlite3.IntegrityError:
             print(f"\033[31m\033[1m(#)\033[0m Filter word {word} already exists in the 'filters' table.\n")
@@ -738,8 +1313,10 @@ class RedditAPI:
         Remove a word entry from the 'filters' table.
         """
         try:
-            self.c.execute("DELETE FROM filters WHERE word = ?", (word,))
-            self.conn.commit()
+            with self.conn as conn:
+                conn.execute("DELETE FROM filters WHERE word = ?", (word,))
+            # Recompile the censor engine on next use
+            self.__censor = None
             print("\033[1m(#)\033[0m Filter word", word, "removed from the 'filters' table.")
         except sqlite3.IntegrityError:
             print(f"\033[31m\033[1m(#)\033[0m Filter word {word} does not exist in the 'filters' table.\n")
@@ -0,0 +1,96 @@
+import threading  # Provides support for threading.
+import random  # Used to jitter the start times of the tasks.
+import time  # Provides various time-related functions.
+
+# Seconds a run may start after its scheduled time before it is reported as overdue
+OVERDUE_TOLERANCE = 60
+
+
+class _Task:
+    def __init__(self, name, function, interval, jitter, start):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.jitter = jitter
+        # The unjittered schedule, so jitter never accumulates into drift
+        self.base = start
+        self.next_run = start
+        self.thread = None
+        self.started_at = None
+        self.runs = 0
+        self.skipped = 0
+
+
+class Scheduler:
+    def __init__(self, tolerance: float = OVERDUE_TOLERANCE):
+        """
+        Initialize the Scheduler object, which runs every task on its own cadence.
+
+        Each task runs in its own thread, so a long render batch never delays discovery or
+        the other way round. A task that is still running when its next run is due skips
+        that run instead of running twice at once, and runs that start late are reported
+        as overdue.
+
+        Args:
+            tolerance (float): Seconds a run may start late before it is reported as overdue.
+        """
+        self.tolerance = tolerance
+        self.tasks = []
+        self.__stop = threading.Event()
+
+    def add(self, name: str, function, interval: float, jitter: float = 0.0, delay: float = 0.0):
+        """
+        Add a task to the schedule.
+
+        Args:
+            name (str): The name of the task shown in the log.
+            function (callable): Called without arguments on every run.
+            interval (float): Seconds between runs.
+            jitter (float): The fraction of the interval each run is randomly moved by, so tasks drift apart.
+            delay (float): Seconds before the first run.
+        """
+        self.tasks.append(_Task(name, function, interval, jitter, time.time() + delay))
+
+    def __run_task(self, task: _Task):
+        start = time.time()
+        try:
+            task.function()
+        except Exception as e:
+            print(f"\033[31m\033[1m(#)\033[0m The {task.name} task failed: {e}\n")
+        print(f"\033[1m(#)\033[0m The {task.name} task took {time.time() - start:.2f} seconds.\n")
+
+    def __start(self, task: _Task, now: float):
+        late = now - task.next_run
+        if task.thread is not None and task.thread.is_alive():
+            task.skipped += 1
+            print(f"\033[31m\033[1m(#)\033[0m The {task.name} task is overdue, its run from {time.time() - task.started_at:.0f} seconds ago is still going. Skipping this run.\n")
+        else:
+            if late > self.tolerance:
+                print(f"\033[31m\033[1m(#)\033[0m The {task.name} task is overdue, starting {late:.0f} seconds late.\n")
+            task.runs += 1
+            task.started_at = now
+            task.thread = threading.Thread(target=self.__run_task, args=(task,), name=task.name, daemon=True)
+            task.thread.start()
+
+        # Schedule the next run from the unjittered schedule, never in the past
+        task.base = max(task.base + task.interval, now)
+        task.next_run = task.base + random.uniform(-task.jitter, task.jitter) * task.interval
+
+    def run(self):
+        """
+        Run the tasks until stop is called, blocking the calling thread.
+        """
+        while not self.__stop.is_set():
+            now = time.time()
+            for task in self.tasks:
+                if task.next_run <= now:
+                    self.__start(task, now)
+            # Sleep until the next task is due
+            wait = min((task.next_run for task in self.tasks), default=now + 60) - time.time()
+            self.__stop.wait(max(wait, 0.0))
+
+    def stop(self):
+        """
+        Stop starting new runs, runs already going are left to finish.
+        """
+        self.__stop.set()
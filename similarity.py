@@ -0,0 +1,127 @@
+import re  # Provides support for regular expressions (regex).
+
+# Minimum overlap between two titles for one to be considered an update of the other
+TITLE_SIMILARITY_THRESHOLD = 0.6
+
+# Words that carry no meaning for matching titles, including the markers update posts add
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "with", "from", "by",
+    "is", "was", "are", "be", "been", "it", "its", "that", "this", "my", "me", "i", "im", "i'm", "so",
+    "her", "his", "she", "he", "they", "them", "we", "our", "you", "your", "about", "after", "not",
+    "update", "updated", "updates", "aita", "aitah", "wibta", "tifu", "edit", "final", "part", "pt",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def normalize_title(title: str):
+    """
+    Normalize a title into its set of meaningful tokens.
+
+    Args:
+        title (str): The post title.
+
+    Returns:
+        set: The lowercase tokens of the title with punctuation, stopwords and update markers removed.
+    """
+    tokens = {token.strip("'") for token in _TOKEN_PATTERN.findall((title or "").lower())}
+    return {token for token in tokens if token and token not in STOPWORDS}
+
+
+class TitleIndex:
+    def __init__(self, conn):
+        """
+        Initialize the TitleIndex object, an inverted index from title tokens to posts.
+
+        The index is stored in the title_tokens table, so candidate lookups only read the
+        postings of the tokens in the query title instead of every stored title. The number
+        of tokens of each title is kept in posts.title_tokens to score the candidates.
+
+        Args:
+            conn (sqlite3.Connection): The database connection.
+        """
+        self.conn = conn
+
+    def add_many(self, rows):
+        """
+        Add titles to the index. Must be called inside the transaction that inserts the posts.
+
+        Args:
+            rows (iterable): (post_id, author, title) tuples.
+        """
+        postings = []
+        sizes = []
+        for post_id, author, title in rows:
+            tokens = normalize_title(title)
+            postings.extend((author, token, post_id) for token in tokens)
+            sizes.append((post_id, len(tokens)))
+        self.conn.executemany("INSERT OR REPLACE INTO title_tokens (author, token, post_id) VALUES (?, ?, ?)", postings)
+        self.conn.executemany("UPDATE posts SET title_tokens = ? WHERE id = ?", [(size, post_id) for post_id, size in sizes])
+
+    def add(self, post_id: str, author: str, title: str):
+        """
+        Add a single title to the index.
+
+        Args:
+            post_id (str): The ID of the post.
+            author (str): The author of the post.
+            title (str): The post title.
+        """
+        self.add_many([(post_id, author, title)])
+
+    def remove(self, post_id: str = None):
+        """
+        Remove a post from the index, or every post if no ID is given.
+
+        Args:
+            post_id (str, optional): The ID of the post.
+        """
+        if post_id is None:
+            self.conn.execute("DELETE FROM title_tokens")
+        else:
+            self.conn.execute("DELETE FROM title_tokens WHERE post_id = ?", (post_id,))
+
+    def rebuild(self):
+        """
+        Rebuild the index from every post in the database.
+        """
+        self.remove()
+        self.add_many(self.conn.execute("SELECT id, author, title FROM posts").fetchall())
+
+    def candidates(self, title: str, author: str = None, threshold: float = TITLE_SIMILARITY_THRESHOLD):
+        """
+        Find stored posts whose titles are similar to a title.
+
+        Titles are compared with the overlap coefficient (shared tokens divided by the size of
+        the smaller title) rather than Jaccard similarity, because update titles usually contain
+        most of the original title plus extra words.
+
+        Args:
+            title (str): The title to match.
+            author (str, optional): Only match posts by this author.
+            threshold (float): The minimum overlap coefficient between the titles.
+
+        Returns:
+            list: (post_id, similarity) tuples, most similar first.
+        """
+        tokens = normalize_title(title)
+        if not tokens:
+            return []
+
+        placeholders = ",".join("?" * len(tokens))
+        params = list(tokens)
+        author_clause = ""
+        if author is not None:
+            author_clause = "AND t.author = ?"
+            params.append(author)
+        rows = self.conn.execute(
+            f"""SELECT t.post_id, COUNT(*), p.title_tokens FROM title_tokens t JOIN posts p ON p.id = t.post_id
+                WHERE t.token IN ({placeholders}) {author_clause}
+                GROUP BY t.post_id""", params)
+
+        matches = []
+        for post_id, shared, size in rows:
+            similarity = shared / min(len(tokens), size or len(tokens))
+            if similarity >= threshold:
+                matches.append((post_id, similarity))
+        return sorted(matches, key=lambda match: match[1], reverse=True)
@@ -0,0 +1,16 @@
+import os  # Provides functions for interacting with the operating system.
+import sys  # Used to import the top-level modules of the project.
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from censor import CensorEngine  # Custom module for censoring and rewriting post content.
+
+
+def test_phrase_replacement_is_censored():
+    engine = CensorEngine(["asshole"])
+    assert engine.filter("AITA for leaving?") == "Am I the a*****e for leaving?"
+
+
+def test_words_and_ages_are_rewritten():
+    engine = CensorEngine(["damn"])
+    assert engine.filter("My (M25) damn car") == "My (Male 25) d**n car"
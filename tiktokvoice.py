@@ -221,19 +221,21 @@ def get_duration(filename: str) -> float:
         return 0
 
 
-def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
+def merge_audio_files(output_file: str, delay: float = 0.1, directory: str = "temp") -> float:
     """
     Merge multiple mp3 audio files into a single audio file with a small delay between each file.
 
     Args:
+        output_file (str): The path of the merged WAV file.
         delay (int): The delay in milliseconds between each audio file. Default is 100 milliseconds.
+        directory (str): The directory holding the mp3 files, such as a job's workspace. Default is "temp".
 
     Returns:
         float: The duration of the merged audio in seconds.
     """
-    # Get all mp3 files in the temp directory
+    # Get all mp3 files in the directory
     mp3_files = [file for file in os.listdir(
-        "temp") if file.endswith(".mp3")]
+        directory) if file.endswith(".mp3")]
 
     # Sort the files in number order
     mp3_files.sort(key=lambda x: int(x.split("_")[2].split(".")[0]))
@@ -244,7 +246,7 @@ def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
    # Iterate over the mp3 files and append them to the merged_audio with a small delay
     with tqdm(total=len(mp3_files), desc="Merging Audio") as pbar:
         for i, file in enumerate(mp3_files):
-            audio = AudioSegment.from_file(os.path.join("temp", file), format="mp3")
+            audio = AudioSegment.from_file(os.path.join(directory, file), format="mp3")
             if i == 0:
                 merged_audio += audio
             else:
@@ -258,10 +260,10 @@ def merge_audio_files(output_file: str, delay: float = 0.1) -> float:
     # Export the merged audio as a single mp3 file
     merged_audio.export(output_file, format="wav")
 
-    # Remove all the mp3 files from the temp directory
+    # Remove all the mp3 files from the directory
     with tqdm(total=len(mp3_files), desc="Removing MP3 files") as pbar:
         for file in mp3_files:
-            os.remove(os.path.join("temp", file))
+            os.remove(os.path.join(directory, file))
             pbar.update(1)
 
     # Clearing the progress bar from the terminal